@@ -0,0 +1,60 @@
+"""paquete indices compuestos
+
+Revision ID: 2f7c9e1b4a68
+Revises: 5e9a7c3b2d41
+Create Date: 2026-10-19 17:20:44.815302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7c9e1b4a68'
+down_revision: Union[str, Sequence[str], None] = '5e9a7c3b2d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY: sin bloquear escrituras. Primero se crean los nuevos y luego se borran
+    # los que quedan cubiertos, así ninguna consulta se queda sin índice en medio.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expense_items_expense_id_cover', 'expense_items', ['expense_id'],
+                        unique=False, postgresql_include=['category_id', 'amount', 'quantity'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        # ingreso_items no tenía índice por ingreso_id: cada selectinload/borrado lo recorría entero
+        op.create_index('ix_ingreso_items_ingreso_id_cover', 'ingreso_items', ['ingreso_id'],
+                        unique=False, postgresql_include=['category_id', 'monto'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_audit_logs_user_id_timestamp', 'audit_logs', ['user_id', 'timestamp'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_audit_logs_timestamp', 'audit_logs', ['timestamp'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+        # Redundantes: expense_id lo cubre el índice nuevo; category_id es prefijo de (category_id, id)
+        op.drop_index('ix_expense_items_expense_id', table_name='expense_items',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_expense_items_category_id', table_name='expense_items',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expense_items_category_id', 'expense_items', ['category_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_expense_items_expense_id', 'expense_items', ['expense_id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+        op.drop_index('ix_audit_logs_timestamp', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_audit_logs_user_id_timestamp', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_ingreso_items_ingreso_id_cover', table_name='ingreso_items',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_expense_items_expense_id_cover', table_name='expense_items',
+                      postgresql_concurrently=True, if_exists=True)
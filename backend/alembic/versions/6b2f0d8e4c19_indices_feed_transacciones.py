@@ -0,0 +1,37 @@
+"""indices feed transacciones
+
+Revision ID: 6b2f0d8e4c19
+Revises: a41c7e9d2b58
+Create Date: 2026-10-19 14:21:05.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2f0d8e4c19'
+down_revision: Union[str, Sequence[str], None] = 'a41c7e9d2b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY: se construyen sin bloquear escrituras en tablas grandes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expenses_user_id_date', 'expenses', ['user_id', 'date', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_ingresos_user_id_fecha', 'ingresos', ['user_id', 'fecha', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ingresos_user_id_fecha', table_name='ingresos',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_expenses_user_id_date', table_name='expenses',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,66 @@
+"""directorio de usuarios
+
+Revision ID: 7b3e5d9a1c24
+Revises: 2f7c9e1b4a68
+Create Date: 2026-10-19 18:05:12.403918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e5d9a1c24'
+down_revision: Union[str, Sequence[str], None] = '2f7c9e1b4a68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Una fila por usuario con su actividad agregada. Se refresca en segundo plano
+    # (app/services/user_directory.py) con REFRESH ... CONCURRENTLY.
+    op.execute("""
+        CREATE MATERIALIZED VIEW user_directory AS
+        SELECT
+            u.id AS user_id,
+            u.email,
+            u.first_name,
+            u.last_name,
+            u.phone,
+            coalesce(u.is_active, true) AS is_active,
+            coalesce(u.is_superuser, false) AS is_superuser,
+            u.telegram_chat_id IS NOT NULL AS telegram_linked,
+            u.created_at,
+            u.last_login,
+            coalesce(e.expense_count, 0) AS expense_count,
+            coalesce(e.expense_total, 0)::numeric(14, 2) AS expense_total,
+            coalesce(i.income_count, 0) AS income_count,
+            coalesce(i.income_total, 0)::numeric(14, 2) AS income_total,
+            greatest(e.last_expense_at, i.last_income_at) AS last_activity_at,
+            now() AS refreshed_at
+        FROM users u
+        LEFT JOIN (
+            SELECT user_id, count(*) AS expense_count, sum(total) AS expense_total, max(date) AS last_expense_at
+            FROM expenses GROUP BY user_id
+        ) e ON e.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, count(*) AS income_count, sum(monto_total) AS income_total, max(fecha) AS last_income_at
+            FROM ingresos GROUP BY user_id
+        ) i ON i.user_id = u.id
+        WITH DATA
+    """)
+    # Obligatorio para REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ux_user_directory_user_id', 'user_directory', ['user_id'], unique=True)
+    # Órdenes con índice (keyset): los demás ordenan la vista entera, que tiene una fila por usuario
+    op.create_index('ix_user_directory_email', 'user_directory', ['email', 'user_id'], unique=False)
+    op.create_index('ix_user_directory_created_at', 'user_directory', ['created_at', 'user_id'], unique=False)
+    op.create_index('ix_user_directory_last_activity_at', 'user_directory',
+                    [sa.text('last_activity_at DESC NULLS LAST'), sa.text('user_id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS user_directory")
@@ -0,0 +1,37 @@
+"""huella duplicados gastos
+
+Revision ID: 8d4b2e6f1a93
+Revises: 3c8e5a1f7d20
+Create Date: 2026-10-19 16:10:27.604133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4b2e6f1a93'
+down_revision: Union[str, Sequence[str], None] = '3c8e5a1f7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Columna nullable sin default: no reescribe la tabla. Los gastos previos quedan sin huella.
+    op.add_column('expenses', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+    # CONCURRENTLY: se construye sin bloquear escrituras en tablas grandes
+    with op.get_context().autocommit_block():
+        op.create_index('ux_expenses_user_id_fingerprint', 'expenses', ['user_id', 'fingerprint'],
+                        unique=True, postgresql_where=sa.text('fingerprint IS NOT NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_expenses_user_id_fingerprint', table_name='expenses',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('expenses', 'fingerprint')
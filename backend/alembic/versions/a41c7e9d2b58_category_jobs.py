@@ -0,0 +1,63 @@
+"""category jobs
+
+Revision ID: a41c7e9d2b58
+Revises: fcd548b3f2c9
+Create Date: 2026-10-19 13:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9d2b58'
+down_revision: Union[str, Sequence[str], None] = 'fcd548b3f2c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'category_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('source_ids', postgresql.ARRAY(sa.UUID()), nullable=False),
+        sa.Column('target_id', sa.UUID(), nullable=False),
+        sa.Column('phase', sa.String(), nullable=False),
+        sa.Column('source_pos', sa.Integer(), nullable=False),
+        sa.Column('cursor', sa.UUID(), nullable=True),
+        sa.Column('moved_expenses', sa.Integer(), nullable=False),
+        sa.Column('moved_incomes', sa.Integer(), nullable=False),
+        sa.Column('chunks', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_category_jobs_status'), 'category_jobs', ['status'], unique=False)
+
+    # Índices de recorrido por categoría: CONCURRENTLY para no bloquear escrituras en tablas grandes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expense_items_category_id_id', 'expense_items', ['category_id', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_ingreso_items_category_id_id', 'ingreso_items', ['category_id', 'id'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ingreso_items_category_id_id', table_name='ingreso_items',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_expense_items_category_id_id', table_name='expense_items',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_index(op.f('ix_category_jobs_status'), table_name='category_jobs')
+    op.drop_table('category_jobs')
@@ -0,0 +1,53 @@
+"""bitacora estructurada
+
+Revision ID: c41d8a6e2f57
+Revises: 7b3e5d9a1c24
+Create Date: 2026-10-19 18:48:30.117264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8a6e2f57'
+down_revision: Union[str, Sequence[str], None] = '7b3e5d9a1c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Columna nullable sin default: solo cambia el catálogo, no reescribe la tabla.
+    # Las filas anteriores quedan con data NULL (su 'details' es texto libre).
+    op.add_column('audit_logs', sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_audit_logs_action_timestamp', 'audit_logs', ['action', 'timestamp'],
+                        unique=False, postgresql_ops={'action': 'varchar_pattern_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_audit_logs_source_timestamp', 'audit_logs', ['source', 'timestamp'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_audit_logs_data', 'audit_logs', ['data'],
+                        unique=False, postgresql_using='gin', postgresql_ops={'data': 'jsonb_path_ops'},
+                        postgresql_concurrently=True, if_not_exists=True)
+        # Cubierto por ix_audit_logs_action_timestamp (pattern_ops también resuelve '=')
+        op.drop_index('ix_audit_logs_action', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_audit_logs_action', 'audit_logs', ['action'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_audit_logs_data', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_audit_logs_source_timestamp', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_audit_logs_action_timestamp', table_name='audit_logs',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('audit_logs', 'data')
@@ -0,0 +1,100 @@
+"""normalizar telefono usuarios
+
+Revision ID: fcd548b3f2c9
+Revises: e7343b38bb0c
+Create Date: 2026-10-19 10:12:41.318502
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.phone import normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fcd548b3f2c9'
+down_revision: Union[str, Sequence[str], None] = 'e7343b38bb0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def _backfill_phone_normalized() -> None:
+    """
+    Rellena phone_normalized por lotes (keyset sobre id) para no bloquear la tabla.
+    Si dos usuarios normalizan al mismo teléfono la migración falla (el índice es único)
+    listando los ids en conflicto: hay que resolverlos a mano antes de reintentar.
+    """
+    conn = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.UUID()),
+        sa.column('phone', sa.String()),
+        sa.column('phone_normalized', sa.String()),
+    )
+    update_stmt = (
+        users.update()
+        .where(users.c.id == sa.bindparam('b_id'))
+        .values(phone_normalized=sa.bindparam('b_phone'))
+    )
+
+    owners = {}
+    conflicts = {}
+    last_id = None
+    while True:
+        query = (
+            sa.select(users.c.id, users.c.phone)
+            .where(users.c.phone.isnot(None))
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(users.c.id > last_id)
+
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            break
+
+        params = []
+        for user_id, phone in rows:
+            normalized = normalize_phone(phone)
+            if normalized is None:
+                continue
+            if normalized in owners:
+                conflicts.setdefault(normalized, [owners[normalized]]).append(user_id)
+                continue
+            owners[normalized] = user_id
+            params.append({'b_id': user_id, 'b_phone': normalized})
+
+        if params:
+            conn.execute(update_stmt, params)
+
+        last_id = rows[-1].id
+
+    if conflicts:
+        # La transacción de la migración se revierte: no queda ningún valor a medias
+        for normalized, user_ids in conflicts.items():
+            logger.error("Teléfono %s compartido por los usuarios: %s", normalized, ", ".join(map(str, user_ids)))
+        raise RuntimeError(
+            f"{len(conflicts)} teléfono(s) normalizados duplicados; "
+            "resuelve los usuarios listados antes de volver a migrar"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('phone_normalized', sa.String(), nullable=True))
+    _backfill_phone_normalized()
+    op.create_index(op.f('ix_users_phone_normalized'), 'users', ['phone_normalized'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_phone_normalized'), table_name='users')
+    op.drop_column('users', 'phone_normalized')
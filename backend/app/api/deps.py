@@ -10,23 +10,37 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import AsyncSessionLocal
 from app.models.user import User
 from app.core.config import settings
+from app.db.hooks import run_after_commit, run_after_rollback
+from app.services.audit import write_audit_after_rollback
+from app.services.token_revocation import revocation_list
 
 # 1. Configuración de OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login/access-token")
 
-# 2. Dependencia de Base de Datos (ASÍNCRONA)
+# 2. Dependencia de Base de Datos (ASÍNCRONA) = Unidad de trabajo por request
+#    - Los endpoints NO hacen commit: solo add/flush (y log_activity, que también solo agrega).
+#    - Al terminar el endpoint sin errores se hace UN commit; si algo falla, UN rollback.
+#    - Usar siempre con scope="function": así el commit ocurre ANTES de enviar la respuesta
+#      (un fallo al confirmar llega al cliente como error y no como un 200/201 falso).
+#      El scope forma parte de la caché de dependencias: mezclarlo abriría dos sesiones.
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            # En async, el commit se suele hacer explícito en los endpoints si modificas datos
-        finally:
-            # session.close() es automático al salir del contexto 'async with'
-            pass
+            if session.in_transaction():
+                await session.commit()
+            # Cachés e índices en memoria (app/db/hooks.py): solo con el cambio ya confirmado
+            run_after_commit(session)
+        except Exception:
+            await session.rollback()
+            run_after_rollback(session)
+            # Las entradas de bitácora de errores (keep_on_rollback) se guardan aparte
+            await write_audit_after_rollback(session)
+            raise
 
 # 3. Obtener usuario actual (ASÍNCRONO)
 async def get_current_user(
-    db: AsyncSession = Depends(get_db), 
+    db: AsyncSession = Depends(get_db, scope="function"),
     token: str = Depends(oauth2_scheme)
 ) -> User:
     """
@@ -48,6 +62,11 @@ async def get_current_user(
         
         if user_id is None:
             raise credentials_exception
+
+        # Revocación (logout / reuso de refresh token): consulta en memoria, sin ir a la BD.
+        # Tokens antiguos sin 'jti' siguen valiendo hasta expirar.
+        if revocation_list.is_revoked(payload.get("jti")):
+            raise credentials_exception
             
     except (JWTError, ValidationError):
         raise credentials_exception
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routers import users, expenses, auth, categories, telegram, incomes
+from app.api.routers import users, expenses, auth, categories, telegram, incomes, transactions, reports, insights
 
 api_router = APIRouter()
 
@@ -11,3 +11,6 @@ api_router.include_router(expenses.router, prefix="/expenses", tags=["expenses"]
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])  # ✅ CORREGIDO
 api_router.include_router(telegram.router, prefix="/telegram", tags=["telegram"])      # ✅ OK
 api_router.include_router(incomes.router, prefix="/incomes", tags=["incomes"])
+api_router.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(insights.router, prefix="/insights", tags=["insights"])
@@ -1,29 +1,30 @@
 #backend\app\api\routers\auth.py
-from datetime import timedelta
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status, Form # <-- Importamos Form
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Form # <-- Importamos Form
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 # Imports de tus archivos
-from app.api.deps import get_db
+from app.api.deps import get_db, get_current_user
 from app.core import security
-from app.core.config import settings
-from app.models.user import User
-from app.schemas.token import Token
+from app.models.user import User, RefreshToken
+from app.schemas.token import Token, RefreshRequest
+from app.services import sessions
+from app.services.audit import log_activity, audit_data
 
 router = APIRouter()
 
 @router.post("/login/access-token", response_model=Token)
 async def login_access_token(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     form_data: OAuth2PasswordRequestForm = Depends(),
     remember_me: bool = Form(False)  # <-- Nuevo parámetro opcional (default False)
 ) -> Any:
     """
-    Valida credenciales y devuelve un JWT.
-    Si 'remember_me' es True, el token dura mucho más tiempo (configurado en settings).
+    Valida credenciales y devuelve un access token (JWT corto) y un refresh token.
+    Si 'remember_me' es True, el refresh token dura mucho más tiempo (configurado en settings).
     """
     
     # 1. Buscamos al usuario por EMAIL
@@ -41,22 +42,85 @@ async def login_access_token(
     if not user.is_active:
          raise HTTPException(status_code=400, detail="Usuario inactivo")
 
-    # 3. Definir expiración según "remember_me"
-    if remember_me:
-        # Sesión extendida (ej. 7 días)
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES_LONG)
-    else:
-        # Sesión estándar (ej. 30 min)
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    # 4. Crear el token
-    access_token = security.create_access_token(
-        subject=str(user.id),
-        expires_delta=access_token_expires
-    )
-    
-    # 5. Devolver respuesta
+    # 3. Nueva sesión: access token corto + refresh token (más largo con "remember_me")
+    tokens = await sessions.start_session(db, user, remember_me=remember_me)
+
+    # 4. Devolver respuesta
     return {
-        "access_token": access_token,
+        "access_token": tokens.access_token,
         "token_type": "bearer",
+        "refresh_token": tokens.refresh_token,
+        "expires_in": tokens.expires_in,
     }
+
+
+@router.post("/refresh-token", response_model=Token)
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db, scope="function"),
+) -> Any:
+    """
+    Canjea un refresh token por un access token nuevo (y un refresh token nuevo: rotación).
+    Un refresh token ya usado no vuelve a servir; si reaparece se cierra toda la sesión.
+    """
+    try:
+        tokens = await sessions.rotate_session(db, body.refresh_token)
+    except sessions.RefreshError as e:
+        if e.reused:
+            await log_activity(
+                db=db, user_id=e.user_id,
+                action="REFRESH_TOKEN_REUSED", source="WEB_APP",
+                details="Refresh token reutilizado: sesión revocada",
+                data=audit_data("user", e.user_id)
+            )
+            # Se responde 401 SIN lanzar: la revocación de la familia debe confirmarse
+            return JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"detail": e.detail},
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=e.detail,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return {
+        "access_token": tokens.access_token,
+        "token_type": "bearer",
+        "refresh_token": tokens.refresh_token,
+        "expires_in": tokens.expires_in,
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db, scope="function"),
+) -> Response:
+    """
+    Cierra la sesión del refresh token dado (y revoca su último access token).
+    Idempotente: un token desconocido o ya revocado también responde 204.
+    """
+    row = (await db.execute(
+        select(RefreshToken).where(RefreshToken.token_hash == security.hash_refresh_token(body.refresh_token))
+    )).scalars().first()
+    if row is not None:
+        await sessions.revoke_family(db, row.family_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """Cierra todas las sesiones del usuario (todos los dispositivos)."""
+    closed = await sessions.revoke_user_sessions(db, current_user.id)
+    await log_activity(
+        db=db, user_id=current_user.id,
+        action="LOGOUT_ALL", source="WEB_APP",
+        details=f"Cerró {closed} sesión(es)",
+        data=audit_data("user", current_user.id, count=closed)
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
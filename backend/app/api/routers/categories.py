@@ -1,5 +1,5 @@
 # backend/app/api/routers/categories.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Request, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, update, delete, or_, and_
 from sqlalchemy.exc import IntegrityError
@@ -7,11 +7,15 @@ from typing import List, Optional, Literal
 from uuid import UUID
 
 from app.api import deps
-from app.models import Category, User, ExpenseItem, Expense
+from app.models import Category, User, ExpenseItem, Expense, CategoryJob
 from app.models.incomes import IngresoItem, Ingreso
-from app.schemas.gastos import CategoryCreate, CategoryResponse, CategoryUpdate, ExpenseItemResponse, CategoryMergeResponse
+from app.schemas.gastos import CategoryCreate, CategoryResponse, CategoryUpdate, ExpenseItemResponse, CategoryMergeResponse, CategoryCatalogItem, CategoryJobResponse, CategorySuggestion
 from app.schemas.income import IngresoItemResponse
-from app.services.audit import log_activity
+from app.services.audit import log_activity, audit_data
+from app.services.utils import get_global_others_id
+from app.services.category_catalog import category_catalog, mark_changed, filter_catalog
+from app.services.category_jobs import enqueue_job, start_job, restart_job, find_category_job
+from app.services.category_suggest import category_suggestions
 
 router = APIRouter()
 
@@ -69,26 +73,13 @@ def _map_results(rows):
         mapped.append(cat)
     return mapped
 
-async def get_or_create_global_others(db: AsyncSession) -> Category:
-    stmt = select(Category).where(Category.name.ilike("Otros"), Category.user_id == None)
-    result = await db.execute(stmt)
-    otros = result.scalars().first()
-    
-    if not otros:
-        otros = Category(name="Otros", user_id=None, is_active=True)
-        db.add(otros)
-        await db.commit()
-        await db.refresh(otros)
-    
-    return otros
-
 # ============================================================================
 # ENDPOINTS ADMIN
 # ============================================================================
 
 @router.get("/admin/all", response_model=List[CategoryResponse])
 async def read_all_categories_admin(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_active_superuser),
     skip: int = 0,
     limit: int = 100,
@@ -103,16 +94,23 @@ async def read_all_categories_admin(
         result = await db.execute(stmt)
         return _map_results(result.all())
     except Exception as e:
-        await log_activity(db, "system", "ERROR_READ_ADMIN_ALL", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_READ_ADMIN_ALL", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", requested_by=current_user.id), error=e)
         raise HTTPException(status_code=500, detail="Error interno recuperando categorías")
 
-@router.post("/admin/bulk-delete", status_code=status.HTTP_204_NO_CONTENT)
+@router.post("/admin/bulk-delete", response_model=Optional[CategoryJobResponse], status_code=status.HTTP_202_ACCEPTED)
 async def bulk_delete_categories(
+    background_tasks: BackgroundTasks,
     ids: List[UUID] = Body(...),
     target_category_id: Optional[UUID] = Query(None),
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_active_superuser),
 ):
+    """
+    Desactiva las categorías al instante y deja a un trabajo en segundo plano
+    la reasignación de sus items (por lotes) y el borrado final.
+    Devuelve el trabajo para consultar su progreso en /categories/jobs/{id}.
+    """
     try:
         target_id = None
         target_name_log = "Otros"
@@ -124,25 +122,30 @@ async def bulk_delete_categories(
             target_id = target_cat.id
             target_name_log = target_cat.name
         else:
-            otros = await get_or_create_global_others(db)
-            target_id = otros.id
+            target_id = await get_global_others_id(db)
 
-        ids_to_delete = [id for id in ids if id != target_id]
+        ids_to_delete = list(dict.fromkeys(id for id in ids if id != target_id))
         
-        if not ids_to_delete: return
+        if not ids_to_delete: return None
 
-        await db.execute(update(ExpenseItem).where(ExpenseItem.category_id.in_(ids_to_delete)).values(category_id=target_id))
-        await db.execute(update(IngresoItem).where(IngresoItem.category_id.in_(ids_to_delete)).values(category_id=target_id))
-        await db.execute(delete(Category).where(Category.id.in_(ids_to_delete)))
-        await db.commit()
+        # Desactivar ya (nadie puede usarlas); el trabajo las borra al terminar de mover items
+        await db.execute(update(Category).where(Category.id.in_(ids_to_delete)).values(is_active=False))
+        mark_changed(db)
+        job = await enqueue_job(db, "BULK_DELETE", ids_to_delete, target_id, current_user.id)
         
-        await log_activity(db, current_user.id, "HARD_DELETE_BULK", "ADMIN", f"Eliminó {len(ids_to_delete)} cats. Reasignó a: '{target_name_log}'")
+        await log_activity(db, current_user.id, "HARD_DELETE_BULK", "ADMIN", f"Eliminando {len(ids_to_delete)} cats (trabajo {job.id}). Reasigna a: '{target_name_log}'",
+                           data=audit_data("category", entity_ids=ids_to_delete, count=len(ids_to_delete),
+                                           target_id=target_id, job_id=job.id))
+        # Se lanza después del commit de la request
+        background_tasks.add_task(start_job, job.id)
+        return job
 
     except HTTPException as he:
         raise he
     except Exception as e:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_BULK_DELETE", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_BULK_DELETE", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", entity_ids=ids), error=e)
         raise HTTPException(status_code=500, detail="Error eliminando categorías masivamente")
 
 # ============================================================================
@@ -152,7 +155,8 @@ async def bulk_delete_categories(
 @router.post("/admin/create-global-merge", response_model=CategoryMergeResponse, status_code=status.HTTP_201_CREATED)
 async def create_global_category_with_merge(
     category_in: CategoryCreate,
-    db: AsyncSession = Depends(deps.get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_active_superuser), # 🔒 SOLO SUPERUSUARIO
 ):
     try:
@@ -174,27 +178,22 @@ async def create_global_category_with_merge(
         private_cats = (await db.execute(stmt_private)).scalars().all()
         private_ids = [cat.id for cat in private_cats]
 
-        expenses_moved = 0
-        incomes_moved = 0
-
+        job = None
         if private_ids:
-            # Contar
-            q_count_exp = select(func.count(ExpenseItem.id)).where(ExpenseItem.category_id.in_(private_ids))
-            expenses_moved = (await db.execute(q_count_exp)).scalar() or 0
-            
-            q_count_inc = select(func.count(IngresoItem.id)).where(IngresoItem.category_id.in_(private_ids))
-            incomes_moved = (await db.execute(q_count_inc)).scalar() or 0
-
-            # Mover y Desactivar
-            await db.execute(update(ExpenseItem).where(ExpenseItem.category_id.in_(private_ids)).values(category_id=new_global_cat.id))
-            await db.execute(update(IngresoItem).where(IngresoItem.category_id.in_(private_ids)).values(category_id=new_global_cat.id))
+            # Desactivar ya; los items se mueven por lotes en segundo plano
             await db.execute(update(Category).where(Category.id.in_(private_ids)).values(is_active=False))
+            job = await enqueue_job(db, "MERGE", private_ids, new_global_cat.id, current_user.id)
+            background_tasks.add_task(start_job, job.id)
 
-        await db.commit()
+        mark_changed(db)
 
         # Log
-        log_msg = f"Creó Global '{new_global_cat.name}'. Fusionó {len(private_ids)} privadas. Movió {expenses_moved} gastos, {incomes_moved} ingresos."
-        await log_activity(db, current_user.id, "GLOBAL_MERGE_CREATE", "ADMIN", details=log_msg)
+        log_msg = f"Creó Global '{new_global_cat.name}'. Fusionó {len(private_ids)} privadas."
+        if job:
+            log_msg += f" Moviendo sus items (trabajo {job.id})."
+        await log_activity(db, current_user.id, "GLOBAL_MERGE_CREATE", "ADMIN", details=log_msg,
+                           data=audit_data("category", new_global_cat.id, merged_ids=private_ids,
+                                           count=len(private_ids), job_id=job.id if job else None))
 
         return CategoryMergeResponse(
             **new_global_cat.__dict__,
@@ -202,24 +201,64 @@ async def create_global_category_with_merge(
             incomes_count=0,
             total_items_count=0,
             merged_private_categories=len(private_ids),
-            moved_expenses=expenses_moved,
-            moved_incomes=incomes_moved
+            # Sin privadas no hay nada que mover; con ellas el conteo lo lleva el trabajo
+            moved_expenses=None if job else 0,
+            moved_incomes=None if job else 0,
+            job_id=job.id if job else None
         )
 
     except HTTPException as he:
         raise he
     except Exception as e:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_GLOBAL_MERGE", "ADMIN", details=str(e))
+        await log_activity(db, "system", "ERROR_GLOBAL_MERGE", "ADMIN", details=str(e), keep_on_rollback=True,
+                           data=audit_data("category"), error=e)
         raise HTTPException(status_code=500, detail="Error creando categoría global con fusión.")
 
+# ============================================================================
+# TRABAJOS EN SEGUNDO PLANO (fusiones / reasignaciones)
+# ============================================================================
+
+async def _get_job_or_404(db: AsyncSession, job_id: UUID, current_user: User) -> CategoryJob:
+    job = await db.get(CategoryJob, job_id)
+    if not job or (job.created_by != current_user.id and not current_user.is_superuser):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=CategoryJobResponse)
+async def read_category_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Progreso de un trabajo: fase, categoría origen en curso y items movidos."""
+    return await _get_job_or_404(db, job_id, current_user)
+
+@router.post("/jobs/{job_id}/restart", response_model=CategoryJobResponse)
+async def restart_category_job(
+    job_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Reanuda un trabajo fallido o huérfano desde su último lote confirmado.
+    Idempotente: si ya terminó o sigue vivo, solo devuelve su estado.
+    """
+    job = await _get_job_or_404(db, job_id, current_user)
+    if await restart_job(db, job):
+        await log_activity(db, current_user.id, "RESTART_CATEGORY_JOB", "WEB", details=f"Reanudó trabajo {job.id}",
+                           data=audit_data("category_job", job.id))
+        background_tasks.add_task(start_job, job.id)
+    return job
+
 # ============================================================================
 # ENDPOINTS USUARIO (CRUD Normal)
 # ============================================================================
 
 @router.get("/", response_model=List[CategoryResponse])
 async def read_categories(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user), 
     skip: int = 0,
     limit: int = 100,
@@ -235,13 +274,56 @@ async def read_categories(
         result = await db.execute(stmt)
         return _map_results(result.all())
     except Exception as e:
-        await log_activity(db, "system", "ERROR_READ_CATEGORIES", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_READ_CATEGORIES", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", requested_by=current_user.id), error=e)
         raise HTTPException(status_code=500, detail="Error cargando tus categorías")
 
+@router.get("/catalog", response_model=List[CategoryCatalogItem])
+async def read_category_catalog(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+    status: Literal["active", "inactive", "all"] = "active",
+    search: Optional[str] = None
+):
+    """
+    Catálogo ligero para selectores (id, nombre, estado), servido desde la caché en memoria.
+    Sin contadores: para eso está GET /categories/.
+    Devuelve ETag; con If-None-Match igual responde 304 sin cuerpo.
+    """
+    catalog, digest = await category_catalog.for_user(db, current_user.id)
+    etag = f'W/"{digest}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return filter_catalog(catalog.values(), status, search)
+
+@router.get("/suggest-for-item", response_model=List[CategorySuggestion])
+async def suggest_category_for_item(
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+    name: str = Query(..., min_length=1, description="Nombre/descripción del item."),
+    type: Literal["expense", "income"] = "expense",
+    limit: int = Query(3, ge=1, le=10),
+):
+    """
+    Categorías probables para un item según el historial del usuario (sus nombres de
+    items y a qué categoría fueron). Se resuelve con el índice en memoria, sin consultar
+    gastos ni ingresos (salvo la primera vez, al construirlo).
+    """
+    suggestions = await category_suggestions.suggest(db, current_user.id, type, name, limit)
+    catalog, _ = await category_catalog.for_user(db, current_user.id)
+    return [
+        CategorySuggestion(id=s.category_id, name=catalog[s.category_id].name, score=s.score)
+        for s in suggestions
+    ]
+
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
 async def create_category(
     category_in: CategoryCreate,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ):
     try:
@@ -255,15 +337,17 @@ async def create_category(
         if existing:
             status_str = "inactiva" if not existing.is_active else "activa"
             msg = f"Ya existe una categoría '{status_str}' con este nombre."
-            await log_activity(db, current_user.id, "CREATE_CATEGORY_FAIL", "WEB", details=f"Intento duplicado: {category_in.name}")
+            await log_activity(db, current_user.id, "CREATE_CATEGORY_FAIL", "WEB", details=f"Intento duplicado: {category_in.name}", keep_on_rollback=True,
+                               data=audit_data("category", existing.id, name=category_in.name))
             raise HTTPException(status_code=400, detail=msg)
 
         db_obj = Category(name=category_in.name, user_id=current_user.id, is_active=True)
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
+        mark_changed(db, current_user.id)
         
-        await log_activity(db, current_user.id, "CREATE_CATEGORY", "WEB", details=f"Creó: {db_obj.name}")
+        await log_activity(db, current_user.id, "CREATE_CATEGORY", "WEB", details=f"Creó: {db_obj.name}",
+                           data=audit_data("category", db_obj.id, name=db_obj.name))
 
         db_obj.expenses_count = 0
         db_obj.incomes_count = 0
@@ -274,18 +358,20 @@ async def create_category(
         raise he 
     except IntegrityError:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_CREATE_CATEGORY_INTEGRITY", "SYSTEM", details=f"Race: {category_in.name}")
+        await log_activity(db, "system", "ERROR_CREATE_CATEGORY_INTEGRITY", "SYSTEM", details=f"Race: {category_in.name}", keep_on_rollback=True,
+                           data=audit_data("category", name=category_in.name, error_class="IntegrityError"))
         raise HTTPException(status_code=400, detail="Error: Categoría duplicada.")
     except Exception as e:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_CREATE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_CREATE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", name=category_in.name), error=e)
         raise HTTPException(status_code=500, detail="No se pudo crear la categoría")
 
 @router.put("/{category_id}", response_model=CategoryResponse)
 async def update_category(
     category_id: UUID,
     category_in: CategoryUpdate,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ):
     try:
@@ -312,10 +398,11 @@ async def update_category(
         if category_in.is_active is not None:
             cat.is_active = category_in.is_active
 
-        await db.commit()
-        await db.refresh(cat)
+        await db.flush()
+        mark_changed(db, cat.user_id)
         
-        await log_activity(db, current_user.id, "UPDATE_CATEGORY", "WEB", details=f"Actualizó ID {category_id}")
+        await log_activity(db, current_user.id, "UPDATE_CATEGORY", "WEB", details=f"Actualizó ID {category_id}",
+                           data=audit_data("category", category_id))
 
         cat.expenses_count = 0 
         cat.incomes_count = 0 
@@ -329,23 +416,34 @@ async def update_category(
         raise HTTPException(status_code=409, detail="Nombre en uso.")
     except Exception as e:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_UPDATE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_UPDATE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", category_id), error=e)
         raise HTTPException(status_code=500, detail="Error actualizando categoría")
 
-@router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{category_id}", response_model=CategoryJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def soft_delete_category(
     category_id: UUID,
+    background_tasks: BackgroundTasks,
     target_category_id: Optional[UUID] = Query(None),
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ):
     try:
-        cat = await db.get(Category, category_id)
+        # FOR UPDATE: dos DELETE simultáneos se serializan y el segundo ve el trabajo del primero
+        cat = await db.get(Category, category_id, with_for_update=True)
         if not cat: raise HTTPException(404, "Categoría no encontrada")
             
         if cat.user_id != current_user.id and not current_user.is_superuser: 
             raise HTTPException(403, "Solo puedes eliminar tus categorías privadas")
 
+        # Idempotente: si ya hay un trabajo en marcha para la categoría (o ya está desactivada),
+        # se devuelve ese trabajo; uno fallido u huérfano se reanuda en lugar de encolar otro
+        job = await find_category_job(db, category_id, include_finished=not cat.is_active)
+        if job:
+            if await restart_job(db, job):
+                background_tasks.add_task(start_job, job.id)
+            return job
+
         final_target_id = None
         target_name_log = "Otros"
 
@@ -362,39 +460,44 @@ async def soft_delete_category(
             final_target_id = target_cat.id
             target_name_log = target_cat.name
         else:
-            otros = await get_or_create_global_others(db)
-            final_target_id = otros.id
-
-        await db.execute(update(ExpenseItem).where(ExpenseItem.category_id == category_id).values(category_id=final_target_id))
-        await db.execute(update(IngresoItem).where(IngresoItem.category_id == category_id).values(category_id=final_target_id))
+            final_target_id = await get_global_others_id(db)
 
         cat.is_active = False
-        await db.commit()
+        await db.flush()
+        mark_changed(db, cat.user_id)
+        # Los items se mueven por lotes en segundo plano (se lanza tras el commit)
+        job = await enqueue_job(db, "SOFT_DELETE", [category_id], final_target_id, current_user.id)
+        background_tasks.add_task(start_job, job.id)
         
         actor = "ADMIN" if current_user.is_superuser else "WEB"
-        await log_activity(db, current_user.id, "SOFT_DELETE", actor, details=f"Desactivó '{cat.name}'. Movió a: '{target_name_log}'")
+        await log_activity(db, current_user.id, "SOFT_DELETE", actor, details=f"Desactivó '{cat.name}'. Mueve a: '{target_name_log}' (trabajo {job.id})",
+                           data=audit_data("category", category_id, target_id=final_target_id, job_id=job.id))
+        return job
 
     except HTTPException as he:
         raise he
     except Exception as e:
         await db.rollback()
-        await log_activity(db, "system", "ERROR_DELETE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_DELETE_CATEGORY", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", category_id), error=e)
         raise HTTPException(status_code=500, detail="Error eliminando categoría")
 
 @router.get("/{category_id}/expenses", response_model=List[ExpenseItemResponse])
-async def read_category_expenses(category_id: UUID, db: AsyncSession = Depends(deps.get_db), current_user: User = Depends(deps.get_current_user)):
+async def read_category_expenses(category_id: UUID, db: AsyncSession = Depends(deps.get_db, scope="function"), current_user: User = Depends(deps.get_current_user)):
     try:
         stmt = select(ExpenseItem).join(Expense).where(ExpenseItem.category_id == category_id, Expense.user_id == current_user.id)
         return (await db.execute(stmt)).scalars().all()
     except Exception as e:
-        await log_activity(db, "system", "ERROR_READ_CAT_EXPENSES", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_READ_CAT_EXPENSES", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", category_id, requested_by=current_user.id), error=e)
         raise HTTPException(status_code=500, detail="Error leyendo items")
 
 @router.get("/{category_id}/incomes", response_model=List[IngresoItemResponse])
-async def read_category_incomes(category_id: UUID, db: AsyncSession = Depends(deps.get_db), current_user: User = Depends(deps.get_current_user)):
+async def read_category_incomes(category_id: UUID, db: AsyncSession = Depends(deps.get_db, scope="function"), current_user: User = Depends(deps.get_current_user)):
     try:
         stmt = select(IngresoItem).join(Ingreso).where(IngresoItem.category_id == category_id, Ingreso.user_id == current_user.id)
         return (await db.execute(stmt)).scalars().all()
     except Exception as e:
-        await log_activity(db, "system", "ERROR_READ_CAT_INCOMES", "SYSTEM", details=f"Error 500: {str(e)}")
+        await log_activity(db, "system", "ERROR_READ_CAT_INCOMES", "SYSTEM", details=f"Error 500: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("category", category_id, requested_by=current_user.id), error=e)
         raise HTTPException(status_code=500, detail="Error leyendo ingresos")
@@ -1,89 +1,236 @@
 # backend\app\api\routers\expenses.py
+from datetime import datetime, timezone
 from typing import List, Any, Optional
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
 from app.models import Expense, ExpenseItem, User
-from app.schemas import ExpenseCreate, ExpenseResponse
-from app.services.audit import log_activity 
+from app.schemas import ExpenseCreate, ExpenseResponse, ExpenseSummaryResponse, ExpenseBatchCreate
+from app.schemas.batch import BatchIdsRequest, BatchDeleteResponse
+from app.services.audit import log_activity, audit_data
+from app.services.report_cache import mark_changed
+from app.services.category_suggest import auto_category, record as record_item
+from app.services.idempotency import IDEMPOTENCY_HEADER, request_hash, replay_or_lock, remember_response
+from app.services.expense_dedupe import DuplicatePolicy, InsertOutcome, expense_fingerprint, insert_expenses, refresh_fingerprint
 # Importamos helpers reutilizables
-from app.services.utils import get_or_create_category_by_name, validate_categories_availability 
+from app.services.utils import get_global_others_id, validate_categories_availability, parse_list_projection
 
 router = APIRouter()
 
+# Columnas disponibles en el listado resumido (?fields=)
+EXPENSE_SUMMARY_FIELDS = ["user_id", "date", "total", "notes", "items_count"]
+
+def _expense_summary_columns():
+    """Mapa campo -> expresión SQL para el select proyectado del listado."""
+    items_count = (
+        select(func.count(ExpenseItem.id))
+        .where(ExpenseItem.expense_id == Expense.id)
+        .correlate(Expense)
+        .scalar_subquery()
+    )
+    return {
+        "user_id": Expense.user_id,
+        "date": Expense.date,
+        "total": Expense.total,
+        "notes": Expense.notes,
+        "items_count": items_count.label("items_count"),
+    }
+
+def _expense_row(user_id: UUID, expense_in: ExpenseCreate) -> dict:
+    """Cabecera lista para insert_expenses (id, fecha y huella se fijan aquí)."""
+    when = expense_in.date or datetime.now(timezone.utc)
+    return {
+        "id": uuid4(),
+        "user_id": user_id,
+        "date": when,
+        "total": sum(item.amount * item.quantity for item in expense_in.items),
+        "notes": expense_in.notes,
+        "fingerprint": expense_fingerprint(user_id, when, expense_in.items),
+    }
+
+async def _add_items(db: AsyncSession, user_id: UUID, expense_id: UUID, items: list, default_cat_id: Optional[UUID] = None) -> Optional[UUID]:
+    """
+    Agrega los items de un gasto resolviendo su categoría.
+    Devuelve el ID de "Otros" si se resolvió (caché para el siguiente gasto del lote).
+    """
+    for item_in in items:
+        final_cat_id = item_in.category_id
+
+        # ✅ Categoría explícita: alimenta el índice de sugerencias
+        if final_cat_id:
+            record_item(db, user_id, "expense", item_in.name, final_cat_id)
+        else:
+            # Sin categoría: sugerencia por historial (si está activa) o "Otros"
+            final_cat_id = await auto_category(db, user_id, "expense", item_in.name)
+        if not final_cat_id:
+            if not default_cat_id:
+                default_cat_id = await get_global_others_id(db)
+            final_cat_id = default_cat_id
+
+        db.add(ExpenseItem(
+            expense_id=expense_id,
+            category_id=final_cat_id,
+            name=item_in.name,
+            amount=item_in.amount,
+            quantity=item_in.quantity
+        ))
+    return default_cat_id
+
+def _with_duplicate(expense: Expense, outcome: InsertOutcome) -> ExpenseResponse:
+    return ExpenseResponse.model_validate(expense).model_copy(update={"duplicate_of": outcome.duplicate_of})
+
 # ============================================================================
 # 1. CREATE (POST)
 # ============================================================================
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
 async def create_expense(
     *,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     expense_in: ExpenseCreate,
+    response: Response,
+    on_duplicate: DuplicatePolicy = Query("warn", description="Si ya existe un gasto idéntico: skip | warn | allow."),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
     Crea un nuevo Gasto. 
     - Valida categorías activas antes de guardar.
     - Asigna 'Otros' si no hay categoría.
+    - Duplicados (misma huella): con skip devuelve el existente (200), con warn lo crea
+      y lo señala en 'duplicate_of'.
+    - Con Idempotency-Key, repetir la petición devuelve la respuesta original sin escribir.
     """
+    req_hash = request_hash("POST /expenses/", expense_in, on_duplicate)
+    replay = await replay_or_lock(db, current_user.id, idempotency_key, req_hash)
+    if replay:
+        return replay
+
     # 🔍 Validar Categorías explícitas usando helper compartido
     await validate_categories_availability(db, expense_in.items, current_user.id)
 
     # 1. Calcular total en memoria
     calculated_total = sum(item.amount * item.quantity for item in expense_in.items)
 
-    # 2. Instanciar Cabecera
-    db_expense = Expense(
-        user_id=current_user.id,
-        notes=expense_in.notes,
-        total=calculated_total,
-        date=expense_in.date 
-    )
-    db.add(db_expense)
-    
     try:
-        # Caché local para el ID de "Otros" en esta petición
-        default_cat_id = None
-
-        # 3. Instanciar Items
-        for item_in in expense_in.items:
-            
-            final_cat_id = item_in.category_id
-
-            # ✅ Lógica de asignación automática a "Otros"
-            if not final_cat_id:
-                if not default_cat_id:
-                    default_cat_id = await get_or_create_category_by_name(db, "Otros")
-                final_cat_id = default_cat_id
-
-            db_item = ExpenseItem(
-                expense=db_expense,
-                category_id=final_cat_id,
-                name=item_in.name,
-                amount=item_in.amount,
-                quantity=item_in.quantity
-            )
-            db.add(db_item)
-        
-        # 4. COMMIT ÚNICO
-        await db.commit()
+        # 2. Insertar Cabecera (la detección de duplicados va en el mismo INSERT)
+        outcome, = await insert_expenses(db, [_expense_row(current_user.id, expense_in)], on_duplicate)
+
+        if outcome.created:
+            # 3. Instanciar Items
+            await _add_items(db, current_user.id, outcome.expense_id, expense_in.items)
+
+            # 4. FLUSH (el commit único lo hace la unidad de trabajo de la request)
+            await db.flush()
+            mark_changed(db, current_user.id)
+        else:
+            response.status_code = status.HTTP_200_OK
         
         # 5. Refresh con items
         stmt = (
             select(Expense)
             .options(selectinload(Expense.items))
-            .where(Expense.id == db_expense.id)
+            .where(Expense.id == outcome.expense_id)
         )
         result = await db.execute(stmt)
         db_expense = result.scalars().first()
 
+        if outcome.created:
+            await log_activity(
+                db=db, user_id=current_user.id, action="CREATE_EXPENSE", source="WEB",
+                details=f"Gasto creado por ${calculated_total:.2f} con {len(expense_in.items)} ítems.",
+                data=audit_data("expense", outcome.expense_id, amount=calculated_total, count=len(expense_in.items),
+                                duplicate_of=outcome.duplicate_of)
+            )
+        else:
+            await log_activity(
+                db=db, user_id=current_user.id, action="SKIP_DUPLICATE_EXPENSE", source="WEB",
+                details=f"Gasto duplicado de {outcome.duplicate_of} omitido (${calculated_total:.2f}).",
+                data=audit_data("expense", outcome.duplicate_of, amount=calculated_total)
+            )
+
+    except HTTPException as he:
+        await db.rollback()
+        raise he
+    except Exception as e:
+        await db.rollback()
+        await log_activity(db, current_user.id, "CREATE_EXPENSE_FAILED", "WEB", f"Error: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("expense"), error=e)
+        raise HTTPException(status_code=400, detail=f"Error procesando el gasto: {str(e)}")
+
+    created = _with_duplicate(db_expense, outcome)
+    await remember_response(
+        db, current_user.id, idempotency_key, req_hash, response.status_code or status.HTTP_201_CREATED, created
+    )
+    return created
+
+
+# ============================================================================
+# 1.1 CREATE BATCH (POST)
+# ============================================================================
+@router.post("/batch", response_model=List[ExpenseResponse], status_code=status.HTTP_201_CREATED)
+async def create_expenses_batch(
+    *,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    batch_in: ExpenseBatchCreate,
+    on_duplicate: DuplicatePolicy = Query("warn", description="Si ya existe un gasto idéntico: skip | warn | allow."),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Crea varios Gastos en una sola transacción (todo o nada).
+    - Una validación de categorías para todo el lote.
+    - Un solo INSERT para todas las cabeceras (con la detección de duplicados).
+    - Un único commit (al cerrar la request) y una sola entrada de bitácora.
+    - Devuelve los gastos en el mismo orden en que llegaron; con skip, los duplicados
+      se devuelven como el gasto existente (con 'duplicate_of').
+    - Con Idempotency-Key, repetir el lote devuelve la respuesta original sin escribir.
+    """
+    req_hash = request_hash("POST /expenses/batch", batch_in, on_duplicate)
+    replay = await replay_or_lock(db, current_user.id, idempotency_key, req_hash)
+    if replay:
+        return replay
+
+    all_items = [item for expense_in in batch_in.expenses for item in expense_in.items]
+    await validate_categories_availability(db, all_items, current_user.id)
+
+    try:
+        rows = [_expense_row(current_user.id, expense_in) for expense_in in batch_in.expenses]
+        outcomes = await insert_expenses(db, rows, on_duplicate)
+
+        default_cat_id = None
+        created = 0
+        grand_total = 0.0
+        for expense_in, row, outcome in zip(batch_in.expenses, rows, outcomes):
+            if not outcome.created:
+                continue
+            default_cat_id = await _add_items(db, current_user.id, outcome.expense_id, expense_in.items, default_cat_id)
+            created += 1
+            grand_total += row["total"]
+
+        if created:
+            await db.flush()
+            mark_changed(db, current_user.id)
+
+        ids = [outcome.expense_id for outcome in outcomes]
+        stmt = (
+            select(Expense)
+            .options(selectinload(Expense.items))
+            .where(Expense.id.in_(set(ids)))
+        )
+        result = await db.execute(stmt)
+        by_id = {expense.id: expense for expense in result.scalars().all()}
+
+        skipped = len(outcomes) - created
         await log_activity(
-            db=db, user_id=current_user.id, action="CREATE_EXPENSE", source="WEB",
-            details=f"Gasto creado por ${calculated_total:.2f} con {len(expense_in.items)} ítems."
+            db=db, user_id=current_user.id, action="CREATE_EXPENSE_BATCH", source=batch_in.source,
+            details=f"{created} gastos creados por ${grand_total:.2f}."
+                    + (f" {skipped} duplicados omitidos." if skipped else ""),
+            data=audit_data("expense", entity_ids=[o.expense_id for o in outcomes if o.created],
+                            amount=grand_total, count=created, skipped=skipped)
         )
 
     except HTTPException as he:
@@ -91,25 +238,43 @@ async def create_expense(
         raise he
     except Exception as e:
         await db.rollback()
-        await log_activity(db, current_user.id, "CREATE_EXPENSE_FAILED", "WEB", f"Error: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Error procesando el gasto: {str(e)}")
+        await log_activity(db, current_user.id, "CREATE_EXPENSE_BATCH_FAILED", batch_in.source, f"Error: {str(e)}", keep_on_rollback=True,
+                           data=audit_data("expense", count=len(batch_in.expenses)), error=e)
+        raise HTTPException(status_code=400, detail=f"Error procesando el lote: {str(e)}")
 
-    return db_expense
+    created_expenses = [_with_duplicate(by_id[outcome.expense_id], outcome) for outcome in outcomes]
+    await remember_response(db, current_user.id, idempotency_key, req_hash, status.HTTP_201_CREATED, created_expenses)
+    return created_expenses
 
 
 # ============================================================================
 # 2. READ ALL (GET LIST)
 # ============================================================================
-@router.get("/", response_model=List[ExpenseResponse])
+@router.get("/", response_model=List[ExpenseSummaryResponse], response_model_exclude_unset=True)
 async def read_expenses(
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     skip: int = 0,
     limit: Optional[int] = Query(100, description="Límite de registros. 0 para 'sin límite'."),
+    fields: Optional[str] = Query(None, description="Columnas de resumen separadas por coma (ej: date,total)."),
+    include: Optional[str] = Query(None, description="'items' para incluir el detalle de cada gasto."),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
+    """
+    Lista los gastos del usuario.
+    - Por defecto devuelve solo cabeceras (id, fecha, total, notas, nº de ítems).
+    - Con ?include=items se cargan los ítems completos.
+    """
+    selected_fields, with_items = parse_list_projection(fields, include, EXPENSE_SUMMARY_FIELDS)
+
+    if with_items:
+        stmt = select(Expense).options(selectinload(Expense.items))
+    else:
+        # Select proyectado: solo las columnas pedidas, sin instanciar ORM
+        columns = _expense_summary_columns()
+        stmt = select(Expense.id, *[columns[name] for name in selected_fields])
+
     stmt = (
-        select(Expense)
-        .options(selectinload(Expense.items))
+        stmt
         .where(Expense.user_id == current_user.id)
         .order_by(Expense.date.desc())
         .offset(skip)
@@ -120,16 +285,92 @@ async def read_expenses(
         stmt = stmt.limit(limit)
     
     result = await db.execute(stmt)
+
+    if with_items:
+        return result.scalars().all()
+    return [dict(row._mapping) for row in result.all()]
+
+
+# ============================================================================
+# 2.1 BATCH GET / BATCH DELETE (multi-selección)
+# ============================================================================
+@router.post("/batch-get", response_model=List[ExpenseResponse])
+async def batch_get_expenses(
+    batch_in: BatchIdsRequest,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Devuelve varios gastos (con ítems) en una sola consulta.
+    Los IDs que no existen o no son del usuario simplemente no aparecen.
+    """
+    stmt = (
+        select(Expense)
+        .options(selectinload(Expense.items))
+        .where(Expense.id.in_(set(batch_in.ids)), Expense.user_id == current_user.id)
+        .order_by(Expense.date.desc())
+    )
+    result = await db.execute(stmt)
     return result.scalars().all()
 
 
+@router.post("/batch-delete", response_model=BatchDeleteResponse)
+async def batch_delete_expenses(
+    batch_in: BatchIdsRequest,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Elimina varios gastos en una sola transacción (todo o nada).
+    - La propiedad se valida en el mismo DELETE ... RETURNING.
+    - Se escribe una sola entrada de bitácora por lote.
+    """
+    requested_ids = set(batch_in.ids)
+    owned_ids = (
+        select(Expense.id)
+        .where(Expense.id.in_(requested_ids), Expense.user_id == current_user.id)
+    )
+
+    try:
+        await db.execute(delete(ExpenseItem).where(ExpenseItem.expense_id.in_(owned_ids)))
+        result = await db.execute(
+            delete(Expense)
+            .where(Expense.id.in_(requested_ids), Expense.user_id == current_user.id)
+            .returning(Expense.id)
+        )
+        deleted_ids = list(result.scalars().all())
+
+        # Si falta alguno: no existe o no es del usuario -> no se borra nada
+        if len(deleted_ids) != len(requested_ids):
+            await db.rollback()
+            missing = requested_ids - set(deleted_ids)
+            raise HTTPException(
+                status_code=404,
+                detail=f"Gastos no encontrados o sin permiso: {', '.join(str(i) for i in missing)}"
+            )
+
+        mark_changed(db, current_user.id)
+        await log_activity(
+            db, current_user.id, "DELETE_EXPENSE_BATCH", "WEB",
+            f"{len(deleted_ids)} gastos eliminados.",
+            data=audit_data("expense", entity_ids=deleted_ids, count=len(deleted_ids))
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"No se pudo eliminar el lote: {str(e)}")
+
+    return BatchDeleteResponse(deleted=len(deleted_ids), ids=deleted_ids)
+
+
 # ============================================================================
 # 3. READ ONE (GET BY ID)
 # ============================================================================
 @router.get("/{expense_id}", response_model=ExpenseResponse)
 async def read_expense_by_id(
     expense_id: UUID,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     stmt = (
@@ -155,7 +396,7 @@ async def read_expense_by_id(
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_expense(
     expense_id: UUID,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ):
     stmt = select(Expense).where(Expense.id == expense_id)
@@ -169,9 +410,12 @@ async def delete_expense(
         raise HTTPException(status_code=403, detail="No tienes permiso para borrar este gasto")
 
     try:
-        await db.delete(expense)
-        await db.commit()
-        await log_activity(db, current_user.id, "DELETE_EXPENSE", "WEB", f"Gasto {expense_id} eliminado.")
+        # Borrado set-based: evita cargar los ítems solo para aplicar el cascade del ORM
+        await db.execute(delete(ExpenseItem).where(ExpenseItem.expense_id == expense_id))
+        await db.execute(delete(Expense).where(Expense.id == expense_id))
+        mark_changed(db, current_user.id)
+        await log_activity(db, current_user.id, "DELETE_EXPENSE", "WEB", f"Gasto {expense_id} eliminado.",
+                           data=audit_data("expense", expense_id, amount=expense.total))
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=f"No se pudo eliminar: {str(e)}")
@@ -186,7 +430,7 @@ async def delete_expense(
 async def update_expense(
     expense_id: UUID,
     expense_in: ExpenseCreate, 
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     # 1. Obtener Gasto existente
@@ -217,29 +461,14 @@ async def update_expense(
         # 4. Gestión de Ítems (Wipe & Replace)
         await db.execute(delete(ExpenseItem).where(ExpenseItem.expense_id == expense_id))
         
-        default_cat_id = None
+        await _add_items(db, current_user.id, expense.id, expense_in.items)
 
-        for item_in in expense_in.items:
-            
-            final_cat_id = item_in.category_id
-
-            # ✅ Lógica de asignación automática a "Otros"
-            if not final_cat_id:
-                if not default_cat_id:
-                    default_cat_id = await get_or_create_category_by_name(db, "Otros")
-                final_cat_id = default_cat_id
-
-            db_item = ExpenseItem(
-                expense_id=expense.id,
-                category_id=final_cat_id,
-                name=item_in.name,
-                amount=item_in.amount,
-                quantity=item_in.quantity
-            )
-            db.add(db_item)
-
-        # 5. COMMIT
-        await db.commit()
+        # 5. FLUSH (el commit lo hace la unidad de trabajo de la request)
+        await db.flush()
+        await refresh_fingerprint(
+            db, expense.id, current_user.id, expense_fingerprint(current_user.id, expense.date, expense_in.items)
+        )
+        mark_changed(db, current_user.id)
         
         # 6. Refresh
         stmt_refresh = (
@@ -252,7 +481,8 @@ async def update_expense(
 
         await log_activity(
             db=db, user_id=current_user.id, action="UPDATE_EXPENSE", source="WEB",
-            details=f"Actualizado. Total: ${new_total:.2f}"
+            details=f"Actualizado. Total: ${new_total:.2f}",
+            data=audit_data("expense", expense_id, amount=new_total, count=len(expense_in.items))
         )
 
     except HTTPException as he:
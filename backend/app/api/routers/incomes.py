@@ -1,55 +1,173 @@
 # backend\app\api\routers\incomes.py
-from typing import List, Any
+import logging
+from typing import List, Any, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.orm import selectinload
 
 from app.api import deps 
 from app.models.user import User
 from app.models.incomes import Ingreso, IngresoItem
-from app.schemas.income import IngresoCreate, IngresoUpdate, IngresoResponse
-from app.services.audit import log_activity
+from app.schemas.income import IngresoCreate, IngresoUpdate, IngresoResponse, IngresoSummaryResponse
+from app.schemas.batch import BatchIdsRequest, BatchDeleteResponse
+from app.services.audit import log_activity, audit_data
+from app.services.report_cache import mark_changed
+from app.services.category_suggest import auto_category, record as record_item
+from app.services.idempotency import IDEMPOTENCY_HEADER, request_hash, replay_or_lock, remember_response
 
 # ✅ Importamos los helpers centralizados (DRY)
-from app.services.utils import get_or_create_category_by_name, validate_categories_availability
+from app.services.utils import get_global_others_id, validate_categories_availability, parse_list_projection
 
 from datetime import timezone
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Columnas disponibles en el listado resumido (?fields=)
+INGRESO_SUMMARY_FIELDS = [
+    "user_id", "descripcion", "fecha", "fuente", "monto_total",
+    "created_at", "updated_at", "items_count",
+]
+
+def _ingreso_summary_columns():
+    """Mapa campo -> expresión SQL para el select proyectado del listado."""
+    items_count = (
+        select(func.count(IngresoItem.id))
+        .where(IngresoItem.ingreso_id == Ingreso.id)
+        .correlate(Ingreso)
+        .scalar_subquery()
+    )
+    return {
+        "user_id": Ingreso.user_id,
+        "descripcion": Ingreso.descripcion,
+        "fecha": Ingreso.fecha,
+        "fuente": Ingreso.fuente,
+        "monto_total": Ingreso.monto_total,
+        "created_at": Ingreso.created_at,
+        "updated_at": Ingreso.updated_at,
+        "items_count": items_count.label("items_count"),
+    }
 
 # -----------------------------------------------------------------------------
 # 1. READ ALL (GET LIST)
 # -----------------------------------------------------------------------------
-@router.get("/", response_model=List[IngresoResponse])
+@router.get("/", response_model=List[IngresoSummaryResponse], response_model_exclude_unset=True)
 async def read_ingresos(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(deps.get_db),
+    fields: Optional[str] = Query(None, description="Columnas de resumen separadas por coma (ej: fecha,monto_total)."),
+    include: Optional[str] = Query(None, description="'items' para incluir el detalle de cada ingreso."),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user),
 ):
+    # Por defecto solo cabeceras + conteo; el detalle es opt-in (?include=items)
+    selected_fields, with_items = parse_list_projection(fields, include, INGRESO_SUMMARY_FIELDS)
+
+    if with_items:
+        query = select(Ingreso).options(selectinload(Ingreso.items))
+    else:
+        columns = _ingreso_summary_columns()
+        query = select(Ingreso.id, *[columns[name] for name in selected_fields])
+
     query = (
-        select(Ingreso)
+        query
         .where(Ingreso.user_id == current_user.id)
-        .options(selectinload(Ingreso.items)) 
         .order_by(Ingreso.fecha.desc())
         .offset(skip)
         .limit(limit)
     )
     result = await db.execute(query)
+
+    if with_items:
+        return result.scalars().all()
+    return [dict(row._mapping) for row in result.all()]
+
+
+# -----------------------------------------------------------------------------
+# 1.1 BATCH GET / BATCH DELETE (multi-selección)
+# -----------------------------------------------------------------------------
+@router.post("/batch-get", response_model=List[IngresoResponse])
+async def batch_get_ingresos(
+    batch_in: BatchIdsRequest,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+):
+    # Una sola consulta; los IDs ajenos o inexistentes se omiten
+    query = (
+        select(Ingreso)
+        .where(Ingreso.id.in_(set(batch_in.ids)), Ingreso.user_id == current_user.id)
+        .options(selectinload(Ingreso.items))
+        .order_by(Ingreso.fecha.desc())
+    )
+    result = await db.execute(query)
     return result.scalars().all()
 
 
+@router.post("/batch-delete", response_model=BatchDeleteResponse)
+async def batch_delete_ingresos(
+    batch_in: BatchIdsRequest,
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+):
+    requested_ids = set(batch_in.ids)
+    owned_ids = (
+        select(Ingreso.id)
+        .where(Ingreso.id.in_(requested_ids), Ingreso.user_id == current_user.id)
+    )
+
+    try:
+        # Borrado set-based: la propiedad se valida en el propio DELETE ... RETURNING
+        await db.execute(delete(IngresoItem).where(IngresoItem.ingreso_id.in_(owned_ids)))
+        result = await db.execute(
+            delete(Ingreso)
+            .where(Ingreso.id.in_(requested_ids), Ingreso.user_id == current_user.id)
+            .returning(Ingreso.id)
+        )
+        deleted_ids = list(result.scalars().all())
+
+        # Todo o nada: si falta alguno, deshacemos
+        if len(deleted_ids) != len(requested_ids):
+            await db.rollback()
+            missing = requested_ids - set(deleted_ids)
+            raise HTTPException(
+                status_code=404,
+                detail=f"Ingresos no encontrados: {', '.join(str(i) for i in missing)}"
+            )
+
+        mark_changed(db, current_user.id)
+        await log_activity(
+            db=db, user_id=current_user.id, action="DELETE_INGRESO_BATCH", source="WEB",
+            details=f"Deleted {len(deleted_ids)} Ingresos",
+            data=audit_data("income", entity_ids=deleted_ids, count=len(deleted_ids))
+        )
+
+        return BatchDeleteResponse(deleted=len(deleted_ids), ids=deleted_ids)
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error borrando lote: {str(e)}")
+
+
 # -----------------------------------------------------------------------------
 # 2. CREATE (POST)
 # -----------------------------------------------------------------------------
 @router.post("/", response_model=IngresoResponse, status_code=status.HTTP_201_CREATED)
 async def create_ingreso(
     ingreso_in: IngresoCreate,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
     current_user: User = Depends(deps.get_current_user),
 ):
+    # 0. Idempotency-Key: una petición repetida devuelve la respuesta original sin escribir
+    req_hash = request_hash("POST /incomes/", ingreso_in)
+    replay = await replay_or_lock(db, current_user.id, idempotency_key, req_hash)
+    if replay:
+        return replay
+
     # 1. Validaciones previas (lectura, no requiere transacción)
     await validate_categories_availability(db, ingreso_in.items, current_user.id)
 
@@ -77,9 +195,14 @@ async def create_ingreso(
         for item_in in ingreso_in.items:
             final_cat_id = item_in.category_id
             
+            if final_cat_id:
+                record_item(db, current_user.id, "income", item_in.descripcion, final_cat_id)
+            else:
+                # Sin categoría: sugerencia por historial (si está activa) o "Otros"
+                final_cat_id = await auto_category(db, current_user.id, "income", item_in.descripcion)
             if not final_cat_id:
                 if not default_cat_id:
-                    default_cat_id = await get_or_create_category_by_name(db, "Otros")
+                    default_cat_id = await get_global_others_id(db)
                 final_cat_id = default_cat_id
 
             new_item = IngresoItem(
@@ -96,25 +219,29 @@ async def create_ingreso(
         try:
             await log_activity(
                 db=db, user_id=current_user.id, action="CREATE_INGRESO", source="WEB",
-                details=f"Ingreso creado. Total: {total_amount}"
+                details=f"Ingreso creado. Total: {total_amount}",
+                data=audit_data("income", new_ingreso.id, amount=total_amount, count=len(ingreso_in.items))
             )
         except Exception as log_error:
-            # Aquí podrías loguear a consola que falló el registro de auditoría
-            print(f"Fallo al auditar: {log_error}")
+            logger.warning("Fallo al auditar CREATE_INGRESO: %s", log_error, extra={"event": "audit.failed"})
 
-        # 3. COMMIT FINAL (Todo o nada)
-        await db.commit()
+        # 3. FLUSH FINAL (el commit "todo o nada" lo hace la unidad de trabajo de la request)
+        await db.flush()
+        mark_changed(db, current_user.id)
         # --- FIN BLOQUE TRANSACCIONAL ---
 
         # 4. Refresh para devolver datos completos
         query = select(Ingreso).where(Ingreso.id == new_ingreso.id).options(selectinload(Ingreso.items))
         result = await db.execute(query)
-        return result.scalars().first()
+        created = IngresoResponse.model_validate(result.scalars().first())
 
     except Exception as e:
         await db.rollback() # Ahora sí limpia todo si algo falla antes del commit
         raise HTTPException(status_code=400, detail=f"Error creando ingreso: {str(e)}")
 
+    await remember_response(db, current_user.id, idempotency_key, req_hash, status.HTTP_201_CREATED, created)
+    return created
+
 
 # -----------------------------------------------------------------------------
 # 3. READ ONE (GET BY ID)
@@ -122,7 +249,7 @@ async def create_ingreso(
 @router.get("/{id}", response_model=IngresoResponse)
 async def read_ingreso(
     id: UUID,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user),
 ):
     query = (
@@ -146,7 +273,7 @@ async def read_ingreso(
 async def update_ingreso(
     id: UUID,
     ingreso_in: IngresoUpdate,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user),
 ):
     # 1. Cargar Ingreso con sus Items existentes
@@ -193,9 +320,14 @@ async def update_ingreso(
             
             # Lógica de Categoría (Compartida para Crear y Actualizar)
             final_cat_id = item_in.category_id
+            if final_cat_id:
+                record_item(db, current_user.id, "income", item_in.descripcion, final_cat_id)
+            else:
+                # Sin categoría: sugerencia por historial (si está activa) o "Otros"
+                final_cat_id = await auto_category(db, current_user.id, "income", item_in.descripcion)
             if not final_cat_id:
                 if not default_cat_id:
-                    default_cat_id = await get_or_create_category_by_name(db, "Otros")
+                    default_cat_id = await get_global_others_id(db)
                 final_cat_id = default_cat_id
 
             # CASO 1: ACTUALIZAR (Tiene ID y existe en el mapa)
@@ -227,9 +359,10 @@ async def update_ingreso(
         # C. Recalcular Total (Basado en la entrada, que es la fuente de verdad)
         ingreso.monto_total = sum(item.monto for item in ingreso_in.items)
 
-        # D. Commit Atómico
+        # D. Flush (el commit atómico lo hace la unidad de trabajo de la request)
         # Si algo falla arriba, nada se guarda.
-        await db.commit()
+        await db.flush()
+        mark_changed(db, current_user.id)
 
         # E. Refresh final
         # Necesario para que el objeto 'ingreso' tenga los nuevos items con sus IDs generados
@@ -243,7 +376,8 @@ async def update_ingreso(
         try:
             await log_activity(
                 db=db, user_id=current_user.id, action="UPDATE_INGRESO", source="WEB",
-                details=f"Ingreso actualizado ID: {id}. Items procesados: {len(ingreso_in.items)}"
+                details=f"Ingreso actualizado ID: {id}. Items procesados: {len(ingreso_in.items)}",
+                data=audit_data("income", id, amount=ingreso_refreshed.monto_total, count=len(ingreso_in.items))
             )
         except: pass
 
@@ -260,23 +394,26 @@ async def update_ingreso(
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_ingreso(
     id: UUID,
-    db: AsyncSession = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
     current_user: User = Depends(deps.get_current_user),
 ):
-    query = select(Ingreso).where(Ingreso.id == id, Ingreso.user_id == current_user.id)
+    # Solo verificamos existencia/propiedad; no hace falta cargar los items
+    query = select(Ingreso.id).where(Ingreso.id == id, Ingreso.user_id == current_user.id)
     result = await db.execute(query)
-    ingreso = result.scalars().first()
+    ingreso_id = result.scalar_one_or_none()
     
-    if not ingreso:
+    if not ingreso_id:
         raise HTTPException(status_code=404, detail="Ingreso no encontrado")
     
     try:
-        await db.delete(ingreso)
-        await db.commit()
+        await db.execute(delete(IngresoItem).where(IngresoItem.ingreso_id == ingreso_id))
+        await db.execute(delete(Ingreso).where(Ingreso.id == ingreso_id))
+        mark_changed(db, current_user.id)
         
         await log_activity(
             db=db, user_id=current_user.id, action="DELETE_INGRESO", source="WEB",
-            details=f"Deleted Ingreso ID: {id}"
+            details=f"Deleted Ingreso ID: {id}",
+            data=audit_data("income", ingreso_id)
         )
         
         return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,113 @@
+#backend\app\api\routers\insights.py
+from datetime import datetime
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.models.user import User
+from app.models.gastos import Expense, ExpenseItem
+from app.schemas.insights import InsightsResponse, TrendPoint, CategoryInsightResponse, AnomalyResponse
+from app.services.category_catalog import category_catalog
+from app.services.insights import CategoryInsight, load_history, compute_insights
+from app.services.report_cache import report_cache
+from app.services.utils import resolve_timezone
+
+router = APIRouter()
+
+
+def _category_response(insight: CategoryInsight, name: Optional[str]) -> CategoryInsightResponse:
+    delta = insight.month_to_date - insight.same_period_last_year
+    pct = round(delta / insight.same_period_last_year * 100, 1) if insight.same_period_last_year else None
+    return CategoryInsightResponse(
+        category_id=insight.category_id,
+        name=name,
+        avg_daily_7=round(insight.avg_daily_7, 2),
+        avg_daily_30=round(insight.avg_daily_30, 2),
+        month_to_date=round(insight.month_to_date, 2),
+        projected_month_end=round(insight.projected_month_end, 2),
+        same_period_last_year=round(insight.same_period_last_year, 2),
+        yoy_delta=round(delta, 2),
+        yoy_pct=pct,
+    )
+
+
+@router.get("/", response_model=InsightsResponse)
+async def read_insights(
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+    tz: Optional[str] = Query(None, description="Zona horaria IANA (ej. America/Mexico_City)."),
+) -> Any:
+    """
+    Tendencias (medias móviles), proyección a fin de mes, comparación interanual
+    y gastos anómalos del usuario. El historial se carga en una consulta y se
+    analiza con NumPy; el resultado se cachea y se invalida al escribir gastos.
+    """
+    tz = resolve_timezone(tz)
+    today = datetime.now(ZoneInfo(tz)).date()
+
+    # Catálogo en memoria: da los nombres y el orden de columnas de la matriz
+    catalog, _ = await category_catalog.for_user(db, current_user.id)
+
+    key = ("insights", tz, today)
+    cached = report_cache.get(current_user.id, key)
+    if cached is None:
+        version = report_cache.version(current_user.id)
+        history = await load_history(db, current_user.id, tz, today, list(catalog))
+        result = compute_insights(history)
+
+        # Detalle solo de los pocos items señalados
+        details = {}
+        if result.anomalies:
+            rows = await db.execute(
+                select(ExpenseItem.id, ExpenseItem.expense_id, ExpenseItem.name, Expense.date)
+                .join(Expense, Expense.id == ExpenseItem.expense_id)
+                .where(ExpenseItem.id.in_([a.item_id for a in result.anomalies]))
+            )
+            details = {row.id: row for row in rows}
+        cached = (result, details)
+        report_cache.put(db, current_user.id, key, cached, version)
+    result, details = cached
+
+    # Nombres al responder: un renombrado no invalida los insights
+    def name_of(category_id) -> Optional[str]:
+        entry = catalog.get(category_id) if category_id else None
+        return entry.name if entry else None
+
+    trend = [
+        TrendPoint(day=day, total=round(total, 2), ma7=round(ma7, 2), ma30=round(ma30, 2))
+        for day, total, ma7, ma30 in zip(
+            result.trend_days.tolist(), result.trend_total.tolist(), result.trend_ma7.tolist(), result.trend_ma30.tolist()
+        )
+    ]
+    categories = sorted(
+        (_category_response(c, name_of(c.category_id)) for c in result.categories),
+        key=lambda c: -c.month_to_date,
+    )
+    anomalies = [
+        AnomalyResponse(
+            item_id=a.item_id,
+            expense_id=details[a.item_id].expense_id,
+            name=details[a.item_id].name,
+            date=details[a.item_id].date,
+            category_id=a.category_id,
+            category_name=name_of(a.category_id),
+            amount=round(a.amount, 2),
+            category_mean=round(a.category_mean, 2),
+            z_score=round(a.z_score, 2),
+        )
+        for a in result.anomalies if a.item_id in details
+    ]
+
+    return InsightsResponse(
+        as_of=result.today,
+        timezone=tz,
+        days_in_month=result.days_in_month,
+        trend=trend,
+        totals=_category_response(result.totals, None),
+        categories=categories,
+        anomalies=anomalies,
+    )
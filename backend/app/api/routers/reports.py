@@ -0,0 +1,213 @@
+#backend\app\api\routers\reports.py
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Literal, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, union_all, literal, literal_column, func, cast, Float, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.models.user import User
+from app.models.gastos import Expense, ExpenseItem
+from app.models.incomes import Ingreso, IngresoItem
+from app.schemas.reports import TimeSeriesResponse, TimeSeriesPoint, TimeSeriesTotals, TimeSeriesCategoryAmount
+from app.services.category_catalog import category_catalog
+from app.services.report_cache import report_cache
+from app.services.utils import resolve_timezone
+
+router = APIRouter()
+
+Granularity = Literal["day", "week", "month"]
+
+# ============================================================================
+#  RANGO
+# ============================================================================
+
+def _default_from(granularity: str, date_to: date) -> date:
+    """Rango por defecto: 30 días, 12 semanas o 12 meses hasta 'date_to'."""
+    if granularity == "day":
+        return date_to - timedelta(days=29)
+    if granularity == "week":
+        return date_to - timedelta(weeks=11, days=date_to.weekday())
+    month = date_to.month - 11
+    year = date_to.year + (month - 1) // 12
+    return date(year, (month - 1) % 12 + 1, 1)
+
+def _bucket_count(granularity: str, date_from: date, date_to: date) -> int:
+    if granularity == "day":
+        return (date_to - date_from).days + 1
+    if granularity == "week":
+        return (date_to - date_from).days // 7 + 2
+    return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+
+# ============================================================================
+#  CONSULTA (una sola sentencia)
+# ============================================================================
+
+def _timeseries_query(user_id: UUID, granularity: str, tz: str, date_from: date, date_to: date, category_id: Optional[UUID]):
+    """
+    - Filtra por el rango en UTC (usa los índices (user_id, fecha, id)).
+    - Agrupa en SQL con date_trunc sobre la fecha local ('tz').
+    - generate_series rellena los intervalos sin movimientos.
+    - Los acumulados salen de funciones ventana sobre la serie completa.
+    """
+    zone = ZoneInfo(tz)
+    start = datetime.combine(date_from, time(), tzinfo=zone)
+    end = datetime.combine(date_to + timedelta(days=1), time(), tzinfo=zone)
+
+    def bucket_of(col):
+        return func.date_trunc(granularity, func.timezone(tz, col)).label("bucket")
+
+    expense_rows = (
+        select(
+            bucket_of(Expense.date),
+            ExpenseItem.category_id.label("category_id"),
+            (ExpenseItem.amount * ExpenseItem.quantity).label("amount"),
+        )
+        .join(ExpenseItem, ExpenseItem.expense_id == Expense.id)
+        .where(Expense.user_id == user_id, Expense.date >= start, Expense.date < end)
+    )
+    income_rows = (
+        select(
+            bucket_of(Ingreso.fecha),
+            IngresoItem.category_id.label("category_id"),
+            cast(IngresoItem.monto, Float).label("amount"),
+        )
+        .join(IngresoItem, IngresoItem.ingreso_id == Ingreso.id)
+        .where(Ingreso.user_id == user_id, Ingreso.fecha >= start, Ingreso.fecha < end)
+    )
+    if category_id:
+        expense_rows = expense_rows.where(ExpenseItem.category_id == category_id)
+        income_rows = income_rows.where(IngresoItem.category_id == category_id)
+
+    # Agregado por (intervalo, tipo, categoría); se agrupa sobre la subconsulta para no repetir date_trunc
+    branches = []
+    for kind, rows in (("expense", expense_rows.subquery()), ("income", income_rows.subquery())):
+        branches.append(
+            select(rows.c.bucket, literal(kind).label("type"), rows.c.category_id, func.sum(rows.c.amount).label("amount"))
+            .group_by(rows.c.bucket, rows.c.category_id)
+        )
+    movements = union_all(*branches).subquery("movements")
+
+    step = literal_column(f"interval '1 {granularity}'")
+    first = func.date_trunc(granularity, cast(literal(datetime.combine(date_from, time())), DateTime))
+    last = func.date_trunc(granularity, cast(literal(datetime.combine(date_to, time())), DateTime))
+    buckets = select(func.generate_series(first, last, step).label("bucket")).subquery("buckets")
+
+    expenses = func.coalesce(func.sum(movements.c.amount).filter(movements.c.type == "expense"), 0.0)
+    incomes = func.coalesce(func.sum(movements.c.amount).filter(movements.c.type == "income"), 0.0)
+    per_category = func.coalesce(
+        func.json_agg(
+            func.json_build_object("type", movements.c.type, "category_id", movements.c.category_id, "amount", movements.c.amount)
+        ).filter(movements.c.type.is_not(None)),
+        literal_column("'[]'::json"),
+    )
+    per_bucket = (
+        select(
+            buckets.c.bucket,
+            expenses.label("expenses"),
+            incomes.label("incomes"),
+            per_category.label("categories"),
+        )
+        .select_from(buckets.outerjoin(movements, movements.c.bucket == buckets.c.bucket))
+        .group_by(buckets.c.bucket)
+        .subquery("per_bucket")
+    )
+
+    net = per_bucket.c.incomes - per_bucket.c.expenses
+    return (
+        select(
+            per_bucket.c.bucket,
+            per_bucket.c.expenses,
+            per_bucket.c.incomes,
+            net.label("net"),
+            func.sum(net).over(order_by=per_bucket.c.bucket).label("balance"),
+            per_bucket.c.categories,
+        )
+        .order_by(per_bucket.c.bucket)
+    )
+
+# ============================================================================
+#  ENDPOINT
+# ============================================================================
+
+@router.get("/timeseries", response_model=TimeSeriesResponse)
+async def read_timeseries(
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+    granularity: Granularity = "day",
+    tz: Optional[str] = Query(None, description="Zona horaria IANA (ej. America/Mexico_City)."),
+    date_from: Optional[date] = Query(None, description="Desde (fecha local, inclusive)."),
+    date_to: Optional[date] = Query(None, description="Hasta (fecha local, inclusive)."),
+    category_id: Optional[UUID] = Query(None, description="Solo items de esta categoría."),
+) -> Any:
+    """
+    Totales de gastos e ingresos por día/semana/mes, con desglose por categoría
+    y saldo acumulado. Todo se calcula en la BD en una sola consulta; el resultado
+    se cachea por usuario y se invalida al escribir gastos o ingresos.
+    """
+    tz = resolve_timezone(tz)
+    date_to = date_to or datetime.now(ZoneInfo(tz)).date()
+    date_from = date_from or _default_from(granularity, date_to)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from no puede ser posterior a date_to")
+    if _bucket_count(granularity, date_from, date_to) > settings.REPORT_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Rango demasiado amplio para '{granularity}' (máx. {settings.REPORT_MAX_BUCKETS} intervalos)"
+        )
+
+    key = ("timeseries", granularity, tz, date_from, date_to, category_id)
+    rows = report_cache.get(current_user.id, key)
+    if rows is None:
+        version = report_cache.version(current_user.id)
+        result = await db.execute(_timeseries_query(current_user.id, granularity, tz, date_from, date_to, category_id))
+        rows = [tuple(r) for r in result.all()]
+        report_cache.put(db, current_user.id, key, rows, version)
+
+    # Nombres desde el catálogo en memoria (un renombrado no invalida el reporte)
+    catalog, _ = await category_catalog.for_user(db, current_user.id)
+
+    def amount_item(kind: str, cid: Optional[str], amount: float) -> TimeSeriesCategoryAmount:
+        uid = UUID(cid) if cid else None
+        entry = catalog.get(uid) if uid else None
+        return TimeSeriesCategoryAmount(
+            category_id=uid, name=entry.name if entry else None, type=kind, amount=round(amount, 2)
+        )
+
+    points = []
+    by_category = defaultdict(float)
+    for bucket, expenses, incomes, net, balance, categories in rows:
+        for c in categories:
+            by_category[(c["type"], c["category_id"])] += c["amount"]
+        points.append(TimeSeriesPoint(
+            bucket=bucket.date(),
+            expenses=round(expenses, 2),
+            incomes=round(incomes, 2),
+            net=round(net, 2),
+            balance=round(balance, 2),
+            categories=[amount_item(c["type"], c["category_id"], c["amount"]) for c in categories],
+        ))
+
+    total_expenses = round(sum(p.expenses for p in points), 2)
+    total_incomes = round(sum(p.incomes for p in points), 2)
+    return TimeSeriesResponse(
+        granularity=granularity,
+        timezone=tz,
+        date_from=date_from,
+        date_to=date_to,
+        points=points,
+        totals=TimeSeriesTotals(
+            expenses=total_expenses,
+            incomes=total_incomes,
+            net=round(total_incomes - total_expenses, 2),
+        ),
+        categories=sorted(
+            (amount_item(kind, cid, amount) for (kind, cid), amount in by_category.items()),
+            key=lambda c: -c.amount,
+        ),
+    )
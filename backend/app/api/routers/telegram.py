@@ -1,7 +1,7 @@
 #backend\app\api\routers\telegram.py
+import logging
 from typing import Any
 from datetime import timedelta
-import re
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, and_
@@ -11,56 +11,50 @@ from app.api.deps import get_db # Importa el get_db asíncrono (deps.py)
 from app.models.user import User
 from app.core import security
 from app.core.config import settings
+from app.core.phone import normalize_phone
 from app.schemas.telegram import (
     TelegramAuthStep1,
     TelegramAuthStep2,
     TelegramLoginRequest,
     TelegramAuthResponse
 )
-from app.services.audit import log_activity 
-
-def normalize_phone(phone: str | None) -> str | None:
-    """Normaliza cualquier número mexicano -> formato E.164 sin '+' (ej: 528468996046)"""
-    if not phone: return None
-    digits = re.sub(r"\D", "", phone.strip())
-    if digits.startswith(("044", "045")): digits = digits[3:]
-    digits = digits.lstrip("0")
-    if digits.startswith("52") and len(digits) == 12: return digits
-    if len(digits) == 10: return "52" + digits
-    if digits.startswith("521") and len(digits) == 12: return digits
-    if digits.startswith("521") and len(digits) == 13: return "52" + digits[2:]
-    return digits if len(digits) >= 10 else None
+from app.services.audit import log_activity, audit_data
 
 router = APIRouter(tags=["telegram"])
+logger = logging.getLogger(__name__)
+
+
+def _mask_phone(phone: str) -> str:
+    """Solo los últimos 4 dígitos en los logs."""
+    return f"***{phone[-4:]}" if phone else ""
 
 @router.post("/check-phone")
 async def check_phone_exists(
     data: TelegramAuthStep1,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ) -> dict[str, bool]:
     raw_phone = data.phone.strip() if data.phone else ""
     phone_normalized = normalize_phone(raw_phone)
-    print(f"📱 Check Phone: '{raw_phone}' -> '{phone_normalized}'")
-    
     if not phone_normalized:
+        logger.info("Check phone: teléfono inválido", extra={"event": "telegram.check_phone", "found": False})
         return {"exists": False}
     
-    stmt = select(User).where(User.phone == phone_normalized)
+    # Búsqueda por índice único sobre la columna normalizada
+    stmt = select(User.email).where(User.phone_normalized == phone_normalized)
     result = await db.execute(stmt)
-    user = result.scalars().first()
+    user_email = result.scalar_one_or_none()
     
-    if user:
-        print(f"✅ Usuario encontrado: {user.email}")
-        return {"exists": True}
-    
-    print("❌ Teléfono no encontrado en BD")
-    return {"exists": False}
+    logger.info(
+        "Check phone %s: %s", _mask_phone(phone_normalized), "encontrado" if user_email else "no encontrado",
+        extra={"event": "telegram.check_phone", "found": bool(user_email)}
+    )
+    return {"exists": bool(user_email)}
 
 
 @router.post("/login-secure", response_model=TelegramAuthResponse)
 async def login_telegram_secure(
     data: TelegramAuthStep2,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ) -> TelegramAuthResponse:
     phone_normalized = normalize_phone(data.phone)
     email_normalized = data.email.lower().strip()
@@ -68,34 +62,39 @@ async def login_telegram_secure(
     if not phone_normalized:
         raise HTTPException(status_code=400, detail="Número de teléfono inválido")
 
-    print(f"🔐 Login Seguro Intentando: Phone: {phone_normalized} | Email: {email_normalized}")
-
     stmt = select(User).where(
-        and_(User.phone == phone_normalized, User.email == email_normalized)
+        and_(User.phone_normalized == phone_normalized, User.email == email_normalized)
     )
     result = await db.execute(stmt)
     user = result.scalars().first()
 
     if not user:
-        print("❌ Fallo de autenticación")
+        logger.warning(
+            "Login seguro fallido para %s", _mask_phone(phone_normalized),
+            extra={"event": "telegram.login_secure", "ok": False}
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="El email no coincide con el teléfono registrado"
         )
 
     if data.telegram_chat_id and user.telegram_chat_id != data.telegram_chat_id:
-        print(f"🔗 Vinculando nuevo Chat ID: {data.telegram_chat_id}")
+        logger.info(
+            "Vinculando nuevo chat %s al usuario %s", data.telegram_chat_id, user.id,
+            extra={"event": "telegram.link_chat", "user_id": str(user.id)}
+        )
         user.telegram_chat_id = data.telegram_chat_id
         db.add(user)
-        await db.commit()
-        await db.refresh(user)
+        # Se confirma junto con la bitácora al final de la request (deps.get_db)
 
     access_token = security.create_access_token(
         subject=str(user.id),
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta=timedelta(minutes=settings.TELEGRAM_ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
-    print(f"✅ Login Exitoso: {user.first_name}")
+    logger.info(
+        "Login seguro exitoso", extra={"event": "telegram.login_secure", "ok": True, "user_id": str(user.id)}
+    )
 
     await log_activity(
         db=db,
@@ -103,7 +102,8 @@ async def login_telegram_secure(
         action="LOGIN",
         source="TELEGRAM",
         details=f"Login seguro via Bot (Phone: {phone_normalized})",
-        update_last_login=True
+        update_last_login=True,
+        data=audit_data("user", user.id)
     )
 
     return TelegramAuthResponse(
@@ -116,16 +116,17 @@ async def login_telegram_secure(
 @router.post("/login-silent", response_model=TelegramAuthResponse)
 async def login_by_telegram_id(
     data: TelegramLoginRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ) -> TelegramAuthResponse:
-    print(f"🤫 Login Silencioso ID: {data.telegram_chat_id}")
-    
     stmt = select(User).where(User.telegram_chat_id == data.telegram_chat_id)
     result = await db.execute(stmt)
     user = result.scalars().first()
 
     if not user:
-        print("❌ ID de Telegram no reconocido")
+        logger.info(
+            "Login silencioso: chat %s no vinculado", data.telegram_chat_id,
+            extra={"event": "telegram.login_silent", "ok": False}
+        )
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Este Telegram no está vinculado"
@@ -133,7 +134,7 @@ async def login_by_telegram_id(
 
     access_token = security.create_access_token(
         subject=str(user.id),
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta=timedelta(minutes=settings.TELEGRAM_ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
     await log_activity(
@@ -142,10 +143,13 @@ async def login_by_telegram_id(
         action="LOGIN_SILENT",
         source="TELEGRAM",
         details="Reconexión automática",
-        update_last_login=True
+        update_last_login=True,
+        data=audit_data("user", user.id)
     )
 
-    print(f"✅ Login Silencioso Exitoso: {user.first_name}")
+    logger.info(
+        "Login silencioso exitoso", extra={"event": "telegram.login_silent", "ok": True, "user_id": str(user.id)}
+    )
     return TelegramAuthResponse(
         access_token=access_token,
         token_type="bearer",
@@ -157,12 +161,12 @@ async def login_by_telegram_id(
 @router.post("/unlink", status_code=200)
 async def unlink_telegram_bot(
     data: TelegramLoginRequest, # Reutilizamos este schema porque trae 'telegram_chat_id'
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db, scope="function")
 ) -> dict:
     """
     Permite al usuario desvincularse usando un comando en el bot (ej: /logout).
     """
-    print(f"✂️ Intentando desvincular Chat ID: {data.telegram_chat_id}")
+    logger.info("Desvinculando chat %s", data.telegram_chat_id, extra={"event": "telegram.unlink"})
     
     stmt = select(User).where(User.telegram_chat_id == data.telegram_chat_id)
     result = await db.execute(stmt)
@@ -176,14 +180,14 @@ async def unlink_telegram_bot(
     user.phone = None
     
     db.add(user)
-    await db.commit()
     
     await log_activity(
         db=db,
         user_id=user.id,
         action="UNLINK_TELEGRAM",
         source="TELEGRAM_BOT",
-        details="Desvinculación solicitada vía comando Bot"
+        details="Desvinculación solicitada vía comando Bot",
+        data=audit_data("user", user.id)
     )
     
     return {"message": "Cuenta desvinculada correctamente. Deberás registrarte de nuevo para usar el bot."}
@@ -0,0 +1,149 @@
+#backend\app\api\routers\transactions.py
+import base64
+from datetime import datetime
+from typing import Any, Literal, Optional, Tuple
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, union_all, literal, cast, exists, and_, or_, tuple_, Float, String
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.models.user import User
+from app.models.gastos import Expense, ExpenseItem
+from app.models.incomes import Ingreso, IngresoItem
+from app.schemas.transactions import TransactionPage, TransactionItem, TransactionTotals
+
+router = APIRouter()
+
+# ============================================================================
+#  CURSOR (keyset sobre fecha DESC, tipo DESC, id DESC)
+# ============================================================================
+
+def _encode_cursor(date: datetime, kind: str, id: UUID) -> str:
+    raw = f"{date.isoformat()}|{kind}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, kind, id_str = base64.urlsafe_b64decode(padded).decode().split("|")
+        if kind not in ("expense", "income"):
+            raise ValueError(kind)
+        return datetime.fromisoformat(date_str), kind, UUID(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _after_cursor(kind: str, date_col, id_col, cursor: Tuple[datetime, str, UUID]):
+    """
+    Condición "viene después del cursor" para una rama del UNION.
+    El tipo es constante en cada rama, así que la comparación (fecha, tipo, id) se
+    simplifica a algo que el índice (user_id, fecha, id) resuelve con un rango.
+    """
+    c_date, c_kind, c_id = cursor
+    if kind < c_kind:
+        return date_col <= c_date
+    if kind > c_kind:
+        return date_col < c_date
+    return tuple_(date_col, id_col) < tuple_(c_date, c_id)
+
+# ============================================================================
+#  ENDPOINT
+# ============================================================================
+
+@router.get("/", response_model=TransactionPage)
+async def read_transactions(
+    db: AsyncSession = Depends(deps.get_db, scope="function"),
+    current_user: User = Depends(deps.get_current_user),
+    type: Literal["all", "expense", "income"] = "all",
+    category_id: Optional[UUID] = Query(None, description="Solo movimientos con algún item de esta categoría."),
+    date_from: Optional[datetime] = Query(None, description="Desde (inclusive)."),
+    date_to: Optional[datetime] = Query(None, description="Hasta (inclusive)."),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior."),
+) -> Any:
+    """
+    Feed cronológico unificado de gastos e ingresos (más recientes primero).
+
+    - UNION ALL de las cabeceras; cada rama ya viene filtrada, ordenada y limitada
+      por su índice (user_id, fecha, id), así que la profundidad no afecta al coste.
+    - Paginación por cursor (keyset), no por offset.
+    - 'totals' resume la página devuelta.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    page_size = limit + 1  # uno de más para saber si hay siguiente página
+
+    branches = []
+
+    if type in ("all", "expense"):
+        stmt = select(
+            Expense.id.label("id"),
+            literal("expense").label("type"),
+            Expense.date.label("date"),
+            cast(Expense.total, Float).label("amount"),
+            Expense.notes.label("description"),
+            cast(literal(None), String).label("source"),
+        ).where(Expense.user_id == current_user.id)
+        if category_id:
+            stmt = stmt.where(exists().where(
+                ExpenseItem.expense_id == Expense.id, ExpenseItem.category_id == category_id
+            ))
+        if date_from:
+            stmt = stmt.where(Expense.date >= date_from)
+        if date_to:
+            stmt = stmt.where(Expense.date <= date_to)
+        if after:
+            stmt = stmt.where(_after_cursor("expense", Expense.date, Expense.id, after))
+        branches.append(stmt.order_by(Expense.date.desc(), Expense.id.desc()).limit(page_size))
+
+    if type in ("all", "income"):
+        stmt = select(
+            Ingreso.id.label("id"),
+            literal("income").label("type"),
+            Ingreso.fecha.label("date"),
+            cast(Ingreso.monto_total, Float).label("amount"),
+            Ingreso.descripcion.label("description"),
+            Ingreso.fuente.label("source"),
+        ).where(Ingreso.user_id == current_user.id)
+        if category_id:
+            stmt = stmt.where(exists().where(
+                IngresoItem.ingreso_id == Ingreso.id, IngresoItem.category_id == category_id
+            ))
+        if date_from:
+            stmt = stmt.where(Ingreso.fecha >= date_from)
+        if date_to:
+            stmt = stmt.where(Ingreso.fecha <= date_to)
+        if after:
+            stmt = stmt.where(_after_cursor("income", Ingreso.fecha, Ingreso.id, after))
+        branches.append(stmt.order_by(Ingreso.fecha.desc(), Ingreso.id.desc()).limit(page_size))
+
+    # Cada rama entre paréntesis (lleva su propio ORDER BY/LIMIT)
+    feed = union_all(*[b.subquery().select() for b in branches]).subquery("feed")
+    query = (
+        select(feed)
+        .order_by(feed.c.date.desc(), feed.c.type.desc(), feed.c.id.desc())
+        .limit(page_size)
+    )
+    rows = (await db.execute(query)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [TransactionItem(**row._mapping) for row in rows]
+    expenses_total = round(sum(i.amount for i in items if i.type == "expense"), 2)
+    incomes_total = round(sum(i.amount for i in items if i.type == "income"), 2)
+
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = _encode_cursor(last.date, last.type, last.id)
+
+    return TransactionPage(
+        items=items,
+        totals=TransactionTotals(
+            expenses=expenses_total,
+            incomes=incomes_total,
+            net=round(incomes_total - expenses_total, 2),
+        ),
+        next_cursor=next_cursor,
+    )
@@ -1,32 +1,57 @@
 #backend\app\api\routers\users.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, and_, tuple_
 from sqlalchemy.orm import selectinload
-from typing import List, Annotated, Optional
+from typing import Any, List, Annotated, Literal, Optional, Tuple
 
 from app.api.deps import get_db, get_current_user, get_current_active_superuser 
 from app.models.user import User, AuditLog
+from app.models.user_directory import user_directory
 from app.schemas.user import (
     UserResponse, 
     UserResponseAdmin, 
     UserCreate, 
     UserUpdate,      
-    UserSignup
+    UserSignup,
+    UserDirectoryEntry,
+    UserDirectoryPage,
 )
-from app.schemas.audit import AuditLogResponse
+from app.schemas.audit import AuditLogResponse, AuditLogPage
 from app.core.security import get_password_hash, verify_password
-from app.services.audit import log_activity
+from app.core.phone import normalize_phone
+from app.services.audit import log_activity, audit_data
+from app.services import user_directory as directory_service
 
 router = APIRouter()
 
+
+async def _ensure_phone_available(db: AsyncSession, phone: Optional[str], exclude_user_id=None):
+    """Evita que dos cuentas compartan el mismo teléfono (normalizado)."""
+    phone_normalized = normalize_phone(phone)
+    if not phone_normalized:
+        return
+
+    stmt = select(User.id).where(User.phone_normalized == phone_normalized)
+    if exclude_user_id is not None:
+        stmt = stmt.where(User.id != exclude_user_id)
+
+    if (await db.execute(stmt)).first():
+        raise HTTPException(status_code=400, detail="El teléfono ya está registrado en otra cuenta.")
+
 # ========== CREATE (Crear) ==========
 
 # 1. Crear usuario (Admin)
 @router.post("/", response_model=UserResponseAdmin, status_code=status.HTTP_201_CREATED)
 async def create_user(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserCreate,
     current_user: User = Depends(get_current_active_superuser) 
 ):
@@ -37,6 +62,8 @@ async def create_user(
     if user:
         raise HTTPException(status_code=400, detail="El usuario con este email ya existe.")
     
+    await _ensure_phone_available(db, user_in.phone)
+
     hashed_password = get_password_hash(user_in.password)
     db_user = User(
         email=user_in.email,
@@ -50,15 +77,15 @@ async def create_user(
     db.add(db_user)
 
     try:
-        await db.commit()
-        await db.refresh(db_user)
+        await db.flush()
 
         await log_activity(
             db=db,
             user_id=current_user.id,
             action="CREATE_USER",
             source="WEB_APP",
-            details=f"Creó usuario {db_user.email}"
+            details=f"Creó usuario {db_user.email}",
+            data=audit_data("user", db_user.id)
         )
     except Exception as e:
         await db.rollback()
@@ -66,7 +93,9 @@ async def create_user(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="CREATE_USER_FAILED", source="WEB_APP", 
-                details=f"Falló creando {user_in.email}: {str(e)}"
+                details=f"Falló creando {user_in.email}: {str(e)}",
+                keep_on_rollback=True,
+                data=audit_data("user", email=user_in.email), error=e
             )
         except: pass
         raise HTTPException(status_code=400, detail=f"Error creando usuario: {str(e)}")
@@ -78,7 +107,7 @@ async def create_user(
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserSignup,
 ):
     stmt = select(User).where(User.email == user_in.email)
@@ -88,6 +117,8 @@ async def register_user(
     if user:
         raise HTTPException(status_code=400, detail="El email ya está registrado.")
 
+    await _ensure_phone_available(db, user_in.phone)
+
     hashed_password = get_password_hash(user_in.password)
     db_user = User(
         email=user_in.email,
@@ -101,15 +132,15 @@ async def register_user(
     db.add(db_user)
 
     try:
-        await db.commit()
-        await db.refresh(db_user)
+        await db.flush()
 
         await log_activity(
             db=db,
             user_id=db_user.id,
             action="SIGNUP",
             source="WEB_APP",
-            details="Registro público exitoso"
+            details="Registro público exitoso",
+            data=audit_data("user", db_user.id)
         )
     except Exception as e:
         await db.rollback()
@@ -125,7 +156,7 @@ async def register_user(
 async def read_users(
     skip: int = 0, 
     limit: int = 100, 
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_active_superuser) 
 ):
     stmt = select(User).offset(skip).limit(limit)
@@ -133,6 +164,124 @@ async def read_users(
     return result.scalars().all()
 
 
+# 3b. Directorio de usuarios con actividad (Admin)
+#
+# Lee la vista materializada user_directory: una sola consulta, sin agregar gastos/ingresos
+# por request. Paginación keyset sobre (campo de orden, user_id) con cursor opaco.
+
+# campo -> (columna, tipo del valor en el cursor, admite NULL)
+_DIRECTORY_SORTS = {
+    "email": (user_directory.c.email, "str", False),
+    "created_at": (user_directory.c.created_at, "datetime", False),
+    "last_login": (user_directory.c.last_login, "datetime", True),
+    "last_activity": (user_directory.c.last_activity_at, "datetime", True),
+    "expense_count": (user_directory.c.expense_count, "int", False),
+    "expense_total": (user_directory.c.expense_total, "decimal", False),
+    "income_count": (user_directory.c.income_count, "int", False),
+    "income_total": (user_directory.c.income_total, "decimal", False),
+}
+DirectorySort = Literal[
+    "email", "created_at", "last_login", "last_activity",
+    "expense_count", "expense_total", "income_count", "income_total",
+]
+_CURSOR_PARSERS = {"str": str, "datetime": datetime.fromisoformat, "int": int, "decimal": Decimal}
+
+
+def _encode_directory_cursor(sort: str, order: str, value: Any, user_id: UUID) -> str:
+    raw_value = value.isoformat() if isinstance(value, datetime) else (None if value is None else str(value))
+    raw = json.dumps([sort, order, raw_value, str(user_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_directory_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        c_sort, c_order, raw_value, id_str = json.loads(base64.urlsafe_b64decode(padded).decode())
+        if (c_sort, c_order) != (sort, order):
+            raise ValueError(c_sort)
+        value = None if raw_value is None else _CURSOR_PARSERS[_DIRECTORY_SORTS[sort][1]](raw_value)
+        return value, UUID(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _after_directory_cursor(col, nullable: bool, desc: bool, value: Any, user_id: UUID):
+    """
+    Condición "viene después del cursor" para ORDER BY col [DESC] NULLS LAST, user_id.
+    Los NULL (p. ej. nunca inició sesión) van al final en ambos sentidos.
+    """
+    id_col = user_directory.c.user_id
+    if value is None:
+        return and_(col.is_(None), id_col < user_id if desc else id_col > user_id)
+    # Comparación de tupla: el índice (col, user_id) la resuelve con un rango
+    key, cursor_key = tuple_(col, id_col), tuple_(value, user_id)
+    after = key < cursor_key if desc else key > cursor_key
+    return or_(after, col.is_(None)) if nullable else after
+
+
+@router.get("/directory", response_model=UserDirectoryPage)
+async def read_user_directory(
+    search: Optional[str] = Query(None, max_length=100, description="Busca en email, nombre y apellido"),
+    is_active: Optional[bool] = None,
+    sort: DirectorySort = "last_activity",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    col, _, nullable = _DIRECTORY_SORTS[sort]
+    desc = order == "desc"
+    id_col = user_directory.c.user_id
+
+    stmt = select(user_directory)
+    if search:
+        # autoescape: '%' y '_' del texto se buscan literalmente (como en /logs/search)
+        term = search.strip()
+        stmt = stmt.where(or_(
+            user_directory.c.email.icontains(term, autoescape=True),
+            user_directory.c.first_name.icontains(term, autoescape=True),
+            user_directory.c.last_name.icontains(term, autoescape=True),
+        ))
+    if is_active is not None:
+        stmt = stmt.where(user_directory.c.is_active == is_active)
+    if cursor:
+        value, after_id = _decode_directory_cursor(cursor, sort, order)
+        stmt = stmt.where(_after_directory_cursor(col, nullable, desc, value, after_id))
+
+    # NULLS LAST explícito solo en columnas con NULL (así el resto puede recorrer su índice al revés)
+    col_order = col.desc() if desc else col.asc()
+    if nullable:
+        col_order = col_order.nulls_last()
+    stmt = stmt.order_by(col_order, id_col.desc() if desc else id_col.asc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_directory_cursor(sort, order, last[col.name], last["user_id"])
+
+    return UserDirectoryPage(
+        items=[UserDirectoryEntry(id=row["user_id"], **{k: v for k, v in row.items() if k not in ("user_id", "refreshed_at")}) for row in rows],
+        next_cursor=next_cursor,
+        refreshed_at=rows[0]["refreshed_at"] if rows else None,
+    )
+
+
+# 3c. Refrescar el directorio ahora (Admin)
+@router.post("/directory/refresh")
+async def refresh_user_directory(
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    refreshed = await directory_service.refresh(db)
+    # False: otro worker lo está refrescando en este momento
+    return {"refreshed": refreshed}
+
+
 # 4. Perfil propio
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(
@@ -145,7 +294,7 @@ async def read_users_me(
 @router.get("/{user_id}", response_model=UserResponseAdmin)
 async def read_user_by_id(
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_active_superuser)
 ):
     stmt = select(User).where(User.id == user_id)
@@ -163,7 +312,7 @@ async def read_user_by_id(
 @router.put("/me", response_model=UserResponse)
 async def update_user_me(
     *,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_user)
 ):
@@ -171,6 +320,9 @@ async def update_user_me(
     
     if "password" in update_data and update_data["password"]:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+
+    if "phone" in update_data:
+        await _ensure_phone_available(db, update_data["phone"], exclude_user_id=current_user.id)
     
     for field, value in update_data.items():
         setattr(current_user, field, value)
@@ -178,15 +330,15 @@ async def update_user_me(
     db.add(current_user)
     
     try:
-        await db.commit()
-        await db.refresh(current_user)
+        await db.flush()
 
         await log_activity(
             db=db,
             user_id=current_user.id,
             action="UPDATE_PROFILE",
             source="WEB_APP",
-            details="Actualizó su perfil"
+            details="Actualizó su perfil",
+            data=audit_data("user", current_user.id, fields=sorted(update_data))
         )
     except Exception as e:
         await db.rollback()
@@ -194,7 +346,9 @@ async def update_user_me(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="UPDATE_PROFILE_FAILED", source="WEB_APP", 
-                details=f"Error actualizando perfil: {str(e)}"
+                details=f"Error actualizando perfil: {str(e)}",
+                keep_on_rollback=True,
+                data=audit_data("user", fields=sorted(update_data)), error=e
             )
         except: pass
         raise HTTPException(status_code=400, detail=f"Error actualizando perfil: {str(e)}")
@@ -207,7 +361,7 @@ async def update_user_me(
 async def update_user(
     *,
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_superuser)
 ):
@@ -222,6 +376,9 @@ async def update_user(
     
     if "password" in update_data and update_data["password"]:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+
+    if "phone" in update_data:
+        await _ensure_phone_available(db, update_data["phone"], exclude_user_id=user.id)
     
     for field, value in update_data.items():
         setattr(user, field, value)
@@ -229,15 +386,15 @@ async def update_user(
     db.add(user)
 
     try:
-        await db.commit()
-        await db.refresh(user)
+        await db.flush()
 
         await log_activity(
             db=db,
             user_id=current_user.id,
             action="UPDATE_USER",
             source="WEB_APP",
-            details=f"Actualizó usuario {user.email}"
+            details=f"Actualizó usuario {user.email}",
+            data=audit_data("user", user.id, fields=sorted(update_data))
         )
     except Exception as e:
         await db.rollback()
@@ -245,7 +402,9 @@ async def update_user(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="UPDATE_USER_FAILED", source="WEB_APP", 
-                details=f"Error actualizando usuario {user.email}: {str(e)}"
+                details=f"Error actualizando usuario {user.email}: {str(e)}",
+                keep_on_rollback=True,
+                data=audit_data("user", user_id, fields=sorted(update_data)), error=e
             )
         except: pass
         raise HTTPException(status_code=400, detail=f"Error actualizando usuario: {str(e)}")
@@ -260,7 +419,7 @@ async def update_user(
 async def delete_user(
     *,
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_active_superuser)
 ):
     stmt = select(User).where(User.id == user_id)
@@ -275,7 +434,9 @@ async def delete_user(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="DELETE_USER_DENIED", source="WEB_APP", 
-                details="Intento de auto-eliminación"
+                details="Intento de auto-eliminación",
+                keep_on_rollback=True,
+                data=audit_data("user", user.id)
             )
         except: pass
         raise HTTPException(status_code=400, detail="No puedes eliminarte a ti mismo")
@@ -287,14 +448,15 @@ async def delete_user(
     db.add(user)
     
     try:
-        await db.commit()
+        await db.flush()
 
         await log_activity(
             db=db,
             user_id=current_user.id,
             action="DELETE_USER",
             source="WEB_APP",
-            details=f"Eliminó/desactivó usuario {user_email}"
+            details=f"Eliminó/desactivó usuario {user_email}",
+            data=audit_data("user", user.id)
         )
     except Exception as e:
         await db.rollback()
@@ -302,7 +464,9 @@ async def delete_user(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="DELETE_USER_FAILED", source="WEB_APP", 
-                details=f"Error eliminando {user_email}: {str(e)}"
+                details=f"Error eliminando {user_email}: {str(e)}",
+                keep_on_rollback=True,
+                data=audit_data("user", user_id), error=e
             )
         except: pass
         raise HTTPException(status_code=400, detail=f"Error eliminando usuario: {str(e)}")
@@ -317,7 +481,7 @@ async def delete_user(
 async def read_user_logs(
     skip: int = 0,
     limit: int = 50,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     stmt = (
@@ -336,7 +500,7 @@ async def read_user_logs(
 async def read_all_logs(
     skip: int = 0,
     limit: int = 100,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_active_superuser)
 ):
     stmt = (
@@ -350,10 +514,93 @@ async def read_all_logs(
     return result.scalars().all()
 
 
+# 10b. Búsqueda en la bitácora (Admin)
+#
+# Filtros combinables, todos con índice: acción exacta o por prefijo (action + timestamp),
+# fuente (source + timestamp), usuario (user_id + timestamp), entidad / error_class
+# (GIN sobre data) y rango de fechas. Keyset sobre (timestamp DESC, id DESC).
+
+def _encode_audit_cursor(timestamp: datetime, id: UUID) -> str:
+    raw = f"{timestamp.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_audit_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts_str, id_str = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(ts_str), UUID(id_str)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _as_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # audit_logs.timestamp se guarda en UTC sin zona (datetime.utcnow)
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/logs/search", response_model=AuditLogPage)
+async def search_logs(
+    action: Optional[List[str]] = Query(None, description="Acción exacta (se puede repetir)"),
+    action_prefix: Optional[str] = Query(None, min_length=1, max_length=50, description="Ej: ERROR_"),
+    source: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[UUID] = None,
+    error_class: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db, scope="function"),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    stmt = select(AuditLog).options(selectinload(AuditLog.user))
+
+    if action:
+        stmt = stmt.where(AuditLog.action.in_(action))
+    if action_prefix:
+        stmt = stmt.where(AuditLog.action.startswith(action_prefix, autoescape=True))
+    if source:
+        stmt = stmt.where(AuditLog.source == source)
+    if user_id:
+        stmt = stmt.where(AuditLog.user_id == user_id)
+
+    # Contención (@>) sobre data: la resuelve ix_audit_logs_data (GIN jsonb_path_ops)
+    contains = audit_data(entity_type, error_class=error_class)
+    if entity_id:
+        # Una entidad aparece sola (entity_id) o dentro de un lote (entity_ids)
+        stmt = stmt.where(or_(
+            AuditLog.data.contains({**contains, "entity_id": str(entity_id)}),
+            AuditLog.data.contains({**contains, "entity_ids": [str(entity_id)]}),
+        ))
+    elif contains:
+        stmt = stmt.where(AuditLog.data.contains(contains))
+
+    if since:
+        stmt = stmt.where(AuditLog.timestamp >= _as_utc_naive(since))
+    if until:
+        stmt = stmt.where(AuditLog.timestamp < _as_utc_naive(until))
+    if cursor:
+        c_ts, c_id = _decode_audit_cursor(cursor)
+        stmt = stmt.where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(c_ts, c_id))
+
+    stmt = stmt.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1)
+    logs = (await db.execute(stmt)).scalars().all()
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = _encode_audit_cursor(logs[-1].timestamp, logs[-1].id)
+    return AuditLogPage(items=logs, next_cursor=next_cursor)
+
+
 # 11. Desvincular Telegram
 @router.post("/me/unlink-telegram", response_model=UserResponse)
 async def unlink_telegram_web(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_db, scope="function"),
     current_user: User = Depends(get_current_user)
 ):
     if not current_user.telegram_chat_id:
@@ -366,15 +613,15 @@ async def unlink_telegram_web(
     db.add(current_user)
     
     try:
-        await db.commit()
-        await db.refresh(current_user)
+        await db.flush()
         
         await log_activity(
             db=db,
             user_id=current_user.id,
             action="UNLINK_TELEGRAM",
             source="WEB_APP",
-            details=f"Desvinculación (Chat ID: {old_chat_id})"
+            details=f"Desvinculación (Chat ID: {old_chat_id})",
+            data=audit_data("user", current_user.id)
         )
     except Exception as e:
         await db.rollback()
@@ -382,7 +629,9 @@ async def unlink_telegram_web(
             await log_activity(
                 db=db, user_id=current_user.id, 
                 action="UNLINK_TELEGRAM_FAILED", source="WEB_APP", 
-                details=f"Error desvinculando: {str(e)}"
+                details=f"Error desvinculando: {str(e)}",
+                keep_on_rollback=True,
+                data=audit_data("user"), error=e
             )
         except: pass
         raise HTTPException(status_code=400, detail=f"Error desvinculando: {str(e)}")
@@ -1,5 +1,6 @@
 #backend\app\core\config.py
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -15,9 +16,98 @@ class Settings(BaseSettings):
     # === BACKEND API / SEGURIDAD ===
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    ACCESS_TOKEN_EXPIRE_MINUTES_LONG: int = 10080
+    # Access token (JWT) de vida corta; la sesión la mantiene el refresh token
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # JWT del bot (login-secure / login-silent): sin refresh token, el bot lo reutiliza hasta
+    # que está por vencer y entonces repite el login (last_login + bitácora en cada uno)
+    TELEGRAM_ACCESS_TOKEN_EXPIRE_MINUTES: int = 240
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 1
+    # Con "recordarme"
+    REFRESH_TOKEN_EXPIRE_DAYS_LONG: int = 30
+    # Re-canjear un refresh token recién rotado dentro de este margen (s) no cuenta como reuso
+    # (dos pestañas renovando a la vez). 0 = cualquier reuso revoca la sesión
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 30
+    # Cada cuánto cada proceso relee los jti revocados por otros procesos
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 10
     
+    # === TELEGRAM (Notificaciones salientes) ===
+    TELEGRAM_TOKEN: Optional[str] = None
+    # Permite apuntar a un Bot API falso/local para pruebas y benchmarks
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+    # Límites de Telegram: ~30 msg/s globales y ~1 msg/s por chat (con margen)
+    TELEGRAM_GLOBAL_RATE: float = 25.0
+    TELEGRAM_PER_CHAT_INTERVAL: float = 1.1
+    TELEGRAM_SEND_CONCURRENCY: int = 50
+    DIGEST_BATCH_SIZE: int = 500
+
+    # === CACHÉ DEL CATÁLOGO DE CATEGORÍAS ===
+    # Segundos que un worker confía en su copia sin releer (acota desfases entre procesos)
+    CATEGORY_CACHE_TTL: float = 300.0
+    CATEGORY_CACHE_MAX_USERS: int = 5000
+
+    # === SUGERENCIA DE CATEGORÍAS (índice token -> categoría por usuario) ===
+    # Reconstrucción periódica desde el historial (corrige borrados/ediciones)
+    CATEGORY_SUGGEST_TTL: float = 3600.0
+    CATEGORY_SUGGEST_MAX_USERS: int = 2000
+    # Items sin categoría: usar la sugerencia si su score llega al mínimo (si no, "Otros")
+    CATEGORY_AUTO_ASSIGN: bool = False
+    CATEGORY_AUTO_ASSIGN_MIN_SCORE: float = 0.6
+
+    # === TRABAJOS DE CATEGORÍAS (fusiones / reasignaciones en segundo plano) ===
+    CATEGORY_JOB_CHUNK_SIZE: int = 1000
+    # Pausa entre lotes (s) para no acaparar la BD
+    CATEGORY_JOB_CHUNK_PAUSE: float = 0.05
+    # Un trabajo 'running' sin latido en este tiempo se considera huérfano y se retoma
+    CATEGORY_JOB_STALE_SECONDS: int = 60
+
+    # === REPORTES (series temporales) ===
+    # Zona horaria para agrupar por día/semana/mes si la request no indica 'tz'
+    REPORT_DEFAULT_TIMEZONE: str = "UTC"
+    # Máximo de intervalos por serie (acota generate_series)
+    REPORT_MAX_BUCKETS: int = 400
+    REPORT_CACHE_TTL: float = 300.0
+    REPORT_CACHE_MAX_ENTRIES: int = 2000
+
+    # === INSIGHTS (anomalías de gasto) ===
+    # Un item es anómalo si su z-score dentro de su categoría supera este umbral
+    INSIGHTS_ANOMALY_Z: float = 3.0
+    # Categorías con menos items no tienen estadística fiable
+    INSIGHTS_ANOMALY_MIN_ITEMS: int = 8
+    INSIGHTS_ANOMALY_LOOKBACK_DAYS: int = 30
+    INSIGHTS_MAX_ANOMALIES: int = 20
+
+    # === DUPLICADOS DE GASTOS (huella al crear) ===
+    # Tamaño del intervalo de fecha de la huella: mismo usuario + mismo intervalo + mismo
+    # total + mismos items = duplicado (reintentos del bot, CSV importado dos veces)
+    EXPENSE_FINGERPRINT_BUCKET_SECONDS: int = 60
+
+    # === IDEMPOTENCY-KEY (altas reintentables) ===
+    # Cuánto se recuerda la respuesta de una clave
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    # LRU en memoria por worker delante de la tabla idempotency_keys
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = 5000
+    # Cada cuánto se purgan las claves vencidas
+    IDEMPOTENCY_PRUNE_SECONDS: int = 600
+
+    # === DIRECTORIO DE USUARIOS (vista materializada del admin) ===
+    # Cada cuánto se refresca user_directory (conteos, totales y última actividad por usuario)
+    USER_DIRECTORY_REFRESH_SECONDS: int = 300
+
+    # === POLÍTICA DE BITÁCORA (ver app/services/audit_policy.py) ===
+    # Regla por acción (exacta o prefijo con '*'): always | sample:<fracción> | coalesce:<ventana s>
+    # coalesce = una fila por usuario y ventana con un contador. Sin regla = always.
+    AUDIT_POLICY: str = "LOGIN_SILENT=coalesce:3600,ERROR_READ_*=coalesce:60"
+    # Cada cuánto se vuelcan a la BD los contadores de los eventos agrupados
+    AUDIT_COALESCE_FLUSH_SECONDS: int = 10
+
+    # === LOGGING (JSON por línea, ver app/core/logs.py) ===
+    LOG_LEVEL: str = "INFO"
+    # Niveles por módulo: "sqlalchemy.engine=INFO,app.api.routers.telegram=DEBUG"
+    # (sqlalchemy.engine=INFO equivale al antiguo echo=True)
+    LOG_LEVELS: str = "uvicorn.access=WARNING"
+    # Muestreo de eventos ruidosos por 'event': "telegram.check_phone=0.1"
+    LOG_SAMPLE_RATES: str = ""
+
     # Admin Inicial (Para el script)
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
@@ -0,0 +1,203 @@
+#backend\app\core\logs.py
+"""
+Logging del backend: líneas JSON escritas fuera del event loop.
+
+- Los módulos usan logging.getLogger(__name__) como siempre.
+- El root solo tiene un QueueHandler (encolar es O(1) y no hace I/O);
+  un QueueListener en su propio hilo da formato JSON y escribe en stdout.
+- Cada línea lleva el request_id de la request en curso (contextvar puesto por
+  RequestContextMiddleware), que también registra método, ruta, status y duración.
+- Niveles por módulo (LOG_LEVELS) y muestreo de eventos ruidosos (LOG_SAMPLE_RATES)
+  por el campo 'event' del extra.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# ID de la request en curso (None fuera de una request: tareas de fondo, scripts)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Atributos estándar de LogRecord: lo demás viene de 'extra' y va al JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _parse_pairs(raw: str) -> Dict[str, str]:
+    """'a=1,b=2' -> {'a': '1', 'b': '2'} (ignora entradas mal formadas)."""
+    pairs = {}
+    for part in (raw or "").split(","):
+        key, sep, value = part.partition("=")
+        if sep and key.strip() and value.strip():
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro. Corre en el hilo del QueueListener."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if data.get("request_id") is None:
+            data.pop("request_id", None)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Añade el request_id del contexto. Corre en el hilo que loguea (antes de encolar)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción de los eventos ruidosos (por 'event' del extra).
+    WARNING o superior nunca se muestrea. El registro lleva 'sample_rate' para reescalar conteos.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class _LoopSafeQueueHandler(QueueHandler):
+    """
+    QueueHandler que no da formato al encolar (el stdlib lo hace en prepare()).
+    Solo resuelve el mensaje con sus args; el JSON y la traza se generan en el listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging() -> None:
+    """Configura el root logger una sola vez por proceso (idempotente ante recargas)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    queue_handler = _LoopSafeQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    rates = {}
+    for event, value in _parse_pairs(settings.LOG_SAMPLE_RATES).items():
+        try:
+            rates[event] = float(value)
+        except ValueError:
+            pass
+    queue_handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    for name, level in _parse_pairs(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Vacía la cola y detiene el hilo del listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI puro: asigna el request_id (respeta X-Request-ID entrante si es válido),
+    lo devuelve en la respuesta y registra una línea 'http.request' con status y duración.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("app.http")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = None
+        for key, value in scope.get("headers", []):
+            if key == REQUEST_ID_HEADER:
+                incoming = value.decode("latin-1")
+                break
+        request_id = incoming if incoming and _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            level = logging.ERROR if status_code >= 500 else logging.INFO
+            self.logger.log(
+                level,
+                "%s %s %s",
+                scope.get("method"), scope.get("path"), status_code,
+                extra={
+                    "event": "http.request",
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status_code,
+                    "duration_ms": duration_ms,
+                },
+            )
+            request_id_var.reset(token)
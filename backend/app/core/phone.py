@@ -0,0 +1,14 @@
+#backend\app\core\phone.py
+import re
+
+def normalize_phone(phone: str | None) -> str | None:
+    """Normaliza cualquier número mexicano -> formato E.164 sin '+' (ej: 528468996046)"""
+    if not phone: return None
+    digits = re.sub(r"\D", "", phone.strip())
+    if digits.startswith(("044", "045")): digits = digits[3:]
+    digits = digits.lstrip("0")
+    if digits.startswith("52") and len(digits) == 12: return digits
+    if len(digits) == 10: return "52" + digits
+    if digits.startswith("521") and len(digits) == 12: return digits
+    if digits.startswith("521") and len(digits) == 13: return "52" + digits[2:]
+    return digits if len(digits) >= 10 else None
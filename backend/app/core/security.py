@@ -1,5 +1,8 @@
+import hashlib
+import secrets
+import uuid
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -7,9 +10,16 @@ from app.core.config import settings
 # Configuración del contexto de encriptación (Bcrypt)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    jti: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> str:
     """
     Genera un JWT (JSON Web Token) firmado.
+    Siempre lleva 'jti' (ID único del token) para poder revocarlo; 'sid' identifica
+    la sesión de refresh tokens que lo emitió (si la hay).
     """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -17,7 +27,9 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     # 'sub' (subject) es un claim estándar de JWT para identificar al usuario (usualmente el ID)
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": jti or uuid.uuid4().hex}
+    if session_id:
+        to_encode["sid"] = str(session_id)
     
     encoded_jwt = jwt.encode(
         to_encode, 
@@ -37,3 +49,15 @@ def get_password_hash(password: str) -> str:
     Genera el hash de una contraseña para almacenarla en la BD.
     """
     return pwd_context.hash(password)
+
+def new_refresh_token() -> str:
+    """Refresh token opaco: 256 bits aleatorios (no es un JWT)."""
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash con el que se guarda/busca el refresh token.
+    SHA-256 y no bcrypt: el token ya es aleatorio de 256 bits (no hay diccionario que
+    frenar) y el hash determinista permite buscarlo por índice.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -0,0 +1,35 @@
+#backend\app\db\hooks.py
+from typing import Callable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Efectos en memoria que solo deben ocurrir si la transacción se confirma
+# (cachés, índices, contadores). Cada servicio anota lo pendiente en session.info
+# y registra aquí, al importarse, cómo aplicarlo tras el commit y cómo descartarlo
+# tras el rollback. get_db (y quien gestione su propia sesión) corre un solo bucle.
+SessionHook = Callable[[AsyncSession], None]
+
+_after_commit: List[SessionHook] = []
+_after_rollback: List[SessionHook] = []
+
+
+def after_commit(hook: SessionHook) -> SessionHook:
+    """Decorador: registra 'hook' para después de cada commit exitoso."""
+    _after_commit.append(hook)
+    return hook
+
+
+def after_rollback(hook: SessionHook) -> SessionHook:
+    """Decorador: registra 'hook' para después de cada rollback."""
+    _after_rollback.append(hook)
+    return hook
+
+
+def run_after_commit(session: AsyncSession) -> None:
+    for hook in _after_commit:
+        hook(session)
+
+
+def run_after_rollback(session: AsyncSession) -> None:
+    for hook in _after_rollback:
+        hook(session)
@@ -12,7 +12,7 @@ SQLALCHEMY_DATABASE_URL = str(settings.DATABASE_URL).replace(
 # 1. Crear el motor asíncrono
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    echo=True,  # Pon False en producción
+    echo=False,  # Para ver el SQL: LOG_LEVELS=sqlalchemy.engine=INFO (sale por el logging JSON)
     future=True
 )
 
@@ -1,12 +1,53 @@
 #backend\app\main.py
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.logs import setup_logging, stop_logging, RequestContextMiddleware
 from app.api.main import api_router
+from app.db.session import AsyncSessionLocal
+from app.services.category_jobs import supervise_jobs
+from app.services.token_revocation import revocation_list
+from app.services.idempotency import run_prune_loop as prune_idempotency_keys
+from app.services.user_directory import run_refresh_loop as refresh_user_directory
+from app.services.audit_policy import audit_coalescer, run_flush_loop as flush_audit_coalescer
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    # Retoma trabajos de categorías pendientes o huérfanos (p. ej. tras un reinicio)
+    supervisor = asyncio.create_task(supervise_jobs())
+    # Lista de access tokens revocados: carga inicial y resincronización periódica
+    async with AsyncSessionLocal() as db:
+        await revocation_list.sync(db)
+    revocation_sync = asyncio.create_task(revocation_list.run_sync_loop())
+    # Purga de respuestas Idempotency-Key vencidas
+    idempotency_prune = asyncio.create_task(prune_idempotency_keys())
+    # Refresco periódico del directorio de usuarios (vista materializada)
+    directory_refresh = asyncio.create_task(refresh_user_directory())
+    # Volcado de los eventos de bitácora agrupados (AUDIT_POLICY coalesce)
+    audit_flush = asyncio.create_task(flush_audit_coalescer())
+    yield
+    supervisor.cancel()
+    revocation_sync.cancel()
+    idempotency_prune.cancel()
+    directory_refresh.cancel()
+    audit_flush.cancel()
+    # Lo agrupado desde el último volcado
+    try:
+        await audit_coalescer.flush()
+    except Exception as e:
+        logger.warning("Volcado final de bitácora agrupada falló: %s", e, extra={"event": "audit.coalesce_flush_error"})
+    stop_logging()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"/api/v1/openapi.json"
+    openapi_url=f"/api/v1/openapi.json",
+    lifespan=lifespan
 )
 
 origins = [
@@ -21,8 +62,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Idempotent-Replayed"],
 )
 
+# request_id + línea de log por request (va por fuera de CORS para medir la request completa)
+app.add_middleware(RequestContextMiddleware)
+
 # Incluir el router principal
 app.include_router(api_router, prefix="/api/v1")
 
@@ -1,3 +1,5 @@
 from .user import User
 from .gastos import Category, Expense, ExpenseItem
-from .incomes import Ingreso
\ No newline at end of file
+from .incomes import Ingreso
+from .jobs import CategoryJob
+from .idempotency import IdempotencyKey
@@ -44,15 +44,30 @@ class Expense(Base):
     date = Column(DateTime(timezone=True), server_default=func.now())
     total = Column(Float, default=0.0)
     notes = Column(String, nullable=True)
+    # Huella normalizada (ver services/expense_dedupe.py); NULL = sin deduplicar
+    fingerprint = Column(String(64), nullable=True)
 
     items = relationship("ExpenseItem", back_populates="expense", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Listados y feed de movimientos por usuario ordenados por fecha (keyset fecha+id)
+        Index('ix_expenses_user_id_date', 'user_id', 'date', 'id'),
+        # Detección de duplicados al insertar (ON CONFLICT sobre este índice)
+        Index(
+            'ux_expenses_user_id_fingerprint',
+            'user_id',
+            'fingerprint',
+            unique=True,
+            postgresql_where=text("fingerprint IS NOT NULL")
+        ),
+    )
+
 class ExpenseItem(Base):
     __tablename__ = "expense_items"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    expense_id = Column(UUID(as_uuid=True), ForeignKey("expenses.id"), nullable=False, index=True)
-    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True, index=True)
+    expense_id = Column(UUID(as_uuid=True), ForeignKey("expenses.id"), nullable=False)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True)
 
     name = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
@@ -62,6 +77,13 @@ class ExpenseItem(Base):
     category = relationship("Category", back_populates="expense_items")
 
     __table_args__ = (
-        Index('ix_expense_items_expense_id', 'expense_id'),
-        Index('ix_expense_items_category_id', 'category_id'),
+        # Items de un gasto (selectinload, borrados) y reportes: cubre categoría e importe
+        # para que los joins gasto -> items sean index-only
+        Index(
+            'ix_expense_items_expense_id_cover',
+            'expense_id',
+            postgresql_include=['category_id', 'amount', 'quantity']
+        ),
+        # Filtro por categoría y recorrido por lotes (keyset sobre id) en las reasignaciones
+        Index('ix_expense_items_category_id_id', 'category_id', 'id'),
     )
\ No newline at end of file
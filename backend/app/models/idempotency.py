@@ -0,0 +1,30 @@
+#backend\app\models\idempotency.py
+import uuid
+from typing import Any
+from datetime import datetime
+from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.session import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada de un POST enviado con cabecera Idempotency-Key.
+    Se escribe en la misma transacción que el alta: si la fila existe, el alta existe.
+    Las filas vencen en IDEMPOTENCY_KEY_TTL_HOURS y se purgan en segundo plano.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    # SHA-256 de endpoint + parámetros + cuerpo: la misma clave con otra petición es un error
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    response: Mapped[Any] = mapped_column(JSONB, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
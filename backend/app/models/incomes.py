@@ -2,7 +2,7 @@
 import uuid
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import String, Numeric, DateTime, ForeignKey
+from sqlalchemy import String, Numeric, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.session import Base
@@ -29,8 +29,12 @@ class Ingreso(Base):
     items: Mapped[List["IngresoItem"]] = relationship(
         "IngresoItem", 
         back_populates="ingreso", 
-        cascade="all, delete-orphan",
-        lazy="selectin"
+        cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # Listados y feed de movimientos por usuario ordenados por fecha (keyset fecha+id)
+        Index('ix_ingresos_user_id_fecha', 'user_id', 'fecha', 'id'),
     )
 
 class IngresoItem(Base):
@@ -48,3 +52,10 @@ class IngresoItem(Base):
     
     # ✅ AGREGADO: back_populates apunta al nombre definido en models/gastos.py
     category = relationship("Category", back_populates="income_items")
+
+    __table_args__ = (
+        # Items de un ingreso (selectinload, borrados) y reportes: cubre categoría e importe
+        Index('ix_ingreso_items_ingreso_id_cover', 'ingreso_id', postgresql_include=['category_id', 'monto']),
+        # Filtro por categoría y recorrido por lotes (keyset sobre id) en las reasignaciones
+        Index('ix_ingreso_items_category_id_id', 'category_id', 'id'),
+    )
@@ -0,0 +1,43 @@
+#backend\app\models\jobs.py
+import uuid
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.session import Base
+
+
+class CategoryJob(Base):
+    """
+    Trabajo en segundo plano que reasigna los items de unas categorías origen a una destino
+    (fusión global, borrado masivo, borrado suave). Guarda su avance para poder reanudarse.
+    """
+    __tablename__ = "category_jobs"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # MERGE | BULK_DELETE | SOFT_DELETE
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    # pending | running | done | failed
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending", index=True)
+    created_by: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+
+    source_ids: Mapped[List[uuid.UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)), nullable=False)
+    target_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+
+    # Punto de reanudación: fase (expenses -> incomes -> finalize), categoría origen en curso
+    # y último item movido de esa categoría (keyset sobre id)
+    phase: Mapped[str] = mapped_column(String, nullable=False, default="expenses")
+    source_pos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cursor: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+
+    moved_expenses: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    moved_incomes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Latido: se actualiza en cada lote; si se queda viejo, otro proceso puede retomar el trabajo
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
@@ -1,9 +1,10 @@
 #backend\app\models\user.py
 import uuid
-from sqlalchemy import Boolean, Column, String, BigInteger, DateTime, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Boolean, Column, String, BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.db.session import Base
+from app.core.phone import normalize_phone
 from typing import Optional, List # Importar List
 from datetime import datetime
 
@@ -16,6 +17,9 @@ class User(Base):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     phone = Column(String, nullable=True)
+    # Teléfono en formato canónico (E.164 sin '+'), usado para las búsquedas del bot.
+    # Se rellena automáticamente cada vez que se asigna 'phone'.
+    phone_normalized = Column(String, unique=True, index=True, nullable=True)
 
     telegram_chat_id: Mapped[Optional[int]] = mapped_column(
         BigInteger, 
@@ -37,6 +41,12 @@ class User(Base):
     #Relación con "Ingreso"
     ingresos = relationship("Ingreso", back_populates="user")
 
+    @validates("phone")
+    def _sync_phone_normalized(self, key, value):
+        # Mantiene phone_normalized al día en cualquier escritura (create, signup, update, unlink)
+        self.phone_normalized = normalize_phone(value)
+        return value
+
 # --- NUEVA TABLA DE BITÁCORA ---
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -47,16 +57,73 @@ class AuditLog(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     
     # Qué hizo (Ej: "LOGIN", "CREATE_EXPENSE", "UPDATE_PROFILE")
-    action = Column(String, index=True, nullable=False)
+    action = Column(String, nullable=False)
     
     # Desde dónde (Ej: "WEB", "TELEGRAM", "MOBILE")
     source = Column(String, nullable=False)
     
-    # Detalles extra (Opcional, para guardar JSON o texto breve)
+    # Detalles extra (Opcional, texto breve para mostrar)
     details = Column(String, nullable=True)
+
+    # Detalles estructurados para filtrar: entity_type, entity_id/entity_ids, amount, error_class...
+    # (ver services/audit.audit_data)
+    data = Column(JSONB, nullable=True)
     
     # Cuándo
     timestamp: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     # Relación inversa
     user: Mapped["User"] = relationship("User", back_populates="logs")
+
+    __table_args__ = (
+        # Actividad de un usuario (más reciente primero)
+        Index('ix_audit_logs_user_id_timestamp', 'user_id', 'timestamp'),
+        # Bitácora global del admin (más reciente primero)
+        Index('ix_audit_logs_timestamp', 'timestamp'),
+        # Acción exacta o por prefijo (LIKE 'ERROR\_%'): pattern_ops sirve para ambos
+        Index('ix_audit_logs_action_timestamp', 'action', 'timestamp',
+              postgresql_ops={'action': 'varchar_pattern_ops'}),
+        Index('ix_audit_logs_source_timestamp', 'source', 'timestamp'),
+        # Contención sobre data (@>): entidad, error_class, ...
+        Index('ix_audit_logs_data', 'data', postgresql_using='gin',
+              postgresql_ops={'data': 'jsonb_path_ops'}),
+    )
+
+
+# --- SESIONES: REFRESH TOKENS ---
+class RefreshToken(Base):
+    """
+    Refresh token de una sesión (se guarda solo su hash SHA-256).
+    Cada refresh lo rota: el usado queda revocado y apunta a su reemplazo. Todos los
+    tokens de una misma sesión comparten 'family_id'; reusar uno ya rotado revoca la familia.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+
+    # Último access token emitido con este refresh (para revocarlo junto con la sesión)
+    access_jti = Column(String, nullable=False)
+    access_expires_at: Mapped[datetime] = mapped_column(nullable=False)
+
+    remember_me = Column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    replaced_by = Column(UUID(as_uuid=True), nullable=True)
+
+
+# --- ACCESS TOKENS REVOCADOS (por jti) ---
+class RevokedToken(Base):
+    """
+    jti de access tokens revocados antes de expirar. Cada proceso mantiene una copia
+    en memoria (services/token_revocation.py), así que validar un token no consulta la BD.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, index=True)
@@ -0,0 +1,26 @@
+#backend\app\models\user_directory.py
+from sqlalchemy import Table, MetaData, Column, String, Boolean, BigInteger, Numeric, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+
+# Vista materializada (creada en la migración 7b3e5d9a1c24), solo lectura.
+# MetaData propio: fuera de Base.metadata para que autogenerate no intente crearla como tabla.
+user_directory = Table(
+    "user_directory",
+    MetaData(),
+    Column("user_id", UUID(as_uuid=True), primary_key=True),
+    Column("email", String),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("phone", String),
+    Column("is_active", Boolean),
+    Column("is_superuser", Boolean),
+    Column("telegram_linked", Boolean),
+    Column("created_at", DateTime),
+    Column("last_login", DateTime),
+    Column("expense_count", BigInteger),
+    Column("expense_total", Numeric(14, 2)),
+    Column("income_count", BigInteger),
+    Column("income_total", Numeric(14, 2)),
+    Column("last_activity_at", DateTime(timezone=True)),
+    Column("refreshed_at", DateTime(timezone=True)),
+)
@@ -1,6 +1,6 @@
 #backend\app\schemas\audit.py
 from pydantic import BaseModel, ConfigDict, computed_field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -17,6 +17,8 @@ class AuditLogBase(BaseModel):
     action: str
     source: str
     details: Optional[str] = None
+    # Detalles estructurados (entity_type, entity_id, amount, error_class...)
+    data: Optional[Dict[str, Any]] = None
     timestamp: datetime
 
 class AuditLogResponse(AuditLogBase):
@@ -42,3 +44,9 @@ class AuditLogResponse(AuditLogBase):
         return self.user.phone if self.user else None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLogResponse]
+    # Cursor opaco para la siguiente página (None = no hay más)
+    next_cursor: Optional[str] = None
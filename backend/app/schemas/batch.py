@@ -0,0 +1,14 @@
+# backend\app\schemas\batch.py
+from typing import List
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+# --- Schemas para operaciones en lote (multi-selección) ---
+
+class BatchIdsRequest(BaseModel):
+    # Límite superior para no generar IN (...) gigantes en una sola petición
+    ids: List[UUID] = Field(..., min_length=1, max_length=500)
+
+class BatchDeleteResponse(BaseModel):
+    deleted: int
+    ids: List[UUID]
@@ -1,5 +1,5 @@
 #backend\app\schemas\gastos.py
-from typing import List, Optional
+from typing import List, Optional, Literal
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict, computed_field
@@ -32,10 +32,50 @@ class CategoryResponse(CategoryBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class CategoryCatalogItem(CategoryBase):
+    """Entrada ligera del catálogo (sin contadores), servida desde la caché en memoria."""
+    id: UUID
+    user_id: Optional[UUID] = None
+    is_active: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    def is_global(self) -> bool:
+        return self.user_id is None
+
+class CategorySuggestion(BaseModel):
+    """Categoría sugerida para un item (score 0..1 según el historial del usuario)."""
+    id: UUID
+    name: str
+    score: float
+
 class CategoryMergeResponse(CategoryResponse):
     merged_private_categories: int # Cuántas categorías privadas se desactivaron
-    moved_expenses: int            # Cuántos gastos se movieron
+    # Con trabajo en curso aún no se sabe (None): el avance está en GET /categories/jobs/{job_id}
+    moved_expenses: Optional[int] = None
+    moved_incomes: Optional[int] = None
+    job_id: Optional[UUID] = None  # Trabajo en segundo plano que mueve los items (si hay privadas)
+
+
+class CategoryJobResponse(BaseModel):
+    """Estado/progreso de un trabajo de reasignación de categorías."""
+    id: UUID
+    kind: str
+    status: str
+    source_ids: List[UUID]
+    target_id: UUID
+    phase: str
+    source_pos: int
+    moved_expenses: int
     moved_incomes: int
+    chunks: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 # --- Schemas para ExpenseItem ---
@@ -66,12 +106,34 @@ class ExpenseBase(BaseModel):
 class ExpenseCreate(ExpenseBase):
     items: List[ExpenseItemCreate]
 
+class ExpenseBatchCreate(BaseModel):
+    # Varios gastos en una sola transacción (ej: ráfagas desde el bot)
+    expenses: List[ExpenseCreate] = Field(..., min_length=1, max_length=100)
+    source: Literal["WEB", "TELEGRAM"] = "WEB"
+
 class ExpenseResponse(ExpenseBase):
     id: UUID
     user_id: UUID
     total: float
     date: datetime
     items: List[ExpenseItemResponse] = []
+    # Al crear: gasto existente con la misma huella (ver ?on_duplicate=)
+    duplicate_of: Optional[UUID] = None
 
     class Config:
         from_attributes = True
+
+class ExpenseSummaryResponse(BaseModel):
+    """
+    Fila de listado. Por defecto solo trae la cabecera + conteo de ítems;
+    'items' solo viaja cuando se pide ?include=items.
+    """
+    id: UUID
+    user_id: Optional[UUID] = None
+    date: Optional[datetime] = None
+    total: Optional[float] = None
+    notes: Optional[str] = None
+    items_count: Optional[int] = None
+    items: Optional[List[ExpenseItemResponse]] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -54,4 +54,22 @@ class IngresoResponse(IngresoBase):
     # Devolvemos los detalles anidados
     items: List[IngresoItemResponse]
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+# --- SCHEMA DE LISTADO (Resumen) ---
+
+class IngresoSummaryResponse(BaseModel):
+    # Cabecera + conteo; 'items' solo con ?include=items
+    id: UUID
+    user_id: Optional[UUID] = None
+    descripcion: Optional[str] = None
+    fecha: Optional[datetime] = None
+    fuente: Optional[str] = None
+    monto_total: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    items_count: Optional[int] = None
+    items: Optional[List[IngresoItemResponse]] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,46 @@
+#backend\app\schemas\insights.py
+from typing import List, Optional
+from uuid import UUID
+from datetime import date, datetime
+from pydantic import BaseModel
+
+# --- Insights de gasto (tendencias, proyecciones, anomalías) ---
+
+class TrendPoint(BaseModel):
+    day: date
+    total: float
+    ma7: float    # media móvil 7 días
+    ma30: float   # media móvil 30 días
+
+class CategoryInsightResponse(BaseModel):
+    category_id: Optional[UUID] = None   # None en 'totals' (todas las categorías)
+    name: Optional[str] = None
+    avg_daily_7: float
+    avg_daily_30: float
+    month_to_date: float
+    # Gastado en el mes + ritmo de los últimos 30 días por los días que faltan
+    projected_month_end: float
+    # Mismo tramo del mes, un año antes
+    same_period_last_year: float
+    yoy_delta: float
+    yoy_pct: Optional[float] = None      # None si el año pasado no hubo gasto
+
+class AnomalyResponse(BaseModel):
+    item_id: UUID
+    expense_id: UUID
+    name: str
+    date: datetime
+    category_id: Optional[UUID] = None
+    category_name: Optional[str] = None
+    amount: float
+    category_mean: float
+    z_score: float
+
+class InsightsResponse(BaseModel):
+    as_of: date
+    timezone: str
+    days_in_month: int
+    trend: List[TrendPoint]
+    totals: CategoryInsightResponse
+    categories: List[CategoryInsightResponse]
+    anomalies: List[AnomalyResponse]
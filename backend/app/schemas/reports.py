@@ -0,0 +1,37 @@
+#backend\app\schemas\reports.py
+from typing import List, Literal, Optional
+from uuid import UUID
+from datetime import date
+from pydantic import BaseModel
+
+# --- Series temporales (totales por día / semana / mes) ---
+
+class TimeSeriesCategoryAmount(BaseModel):
+    category_id: Optional[UUID] = None   # None = items sin categoría
+    name: Optional[str] = None
+    type: Literal["expense", "income"]
+    amount: float
+
+class TimeSeriesPoint(BaseModel):
+    bucket: date                         # inicio del intervalo en la zona horaria pedida
+    expenses: float
+    incomes: float
+    net: float
+    # Saldo acumulado (ingresos - gastos) desde el inicio del rango
+    balance: float
+    categories: List[TimeSeriesCategoryAmount]
+
+class TimeSeriesTotals(BaseModel):
+    expenses: float
+    incomes: float
+    net: float
+
+class TimeSeriesResponse(BaseModel):
+    granularity: Literal["day", "week", "month"]
+    timezone: str
+    date_from: date
+    date_to: date
+    points: List[TimeSeriesPoint]
+    totals: TimeSeriesTotals
+    # Totales del rango por categoría (mayor importe primero)
+    categories: List[TimeSeriesCategoryAmount]
@@ -0,0 +1,27 @@
+#backend\app\schemas\transactions.py
+from typing import List, Literal, Optional
+from uuid import UUID
+from datetime import datetime
+from pydantic import BaseModel
+
+# --- Feed unificado de movimientos (gastos + ingresos) ---
+
+class TransactionItem(BaseModel):
+    id: UUID
+    type: Literal["expense", "income"]
+    date: datetime
+    amount: float
+    description: Optional[str] = None   # notes (gasto) / descripcion (ingreso)
+    source: Optional[str] = None        # fuente (solo ingresos)
+
+class TransactionTotals(BaseModel):
+    """Totales de la página devuelta (no del histórico completo)."""
+    expenses: float
+    incomes: float
+    net: float
+
+class TransactionPage(BaseModel):
+    items: List[TransactionItem]
+    totals: TransactionTotals
+    # Cursor opaco para la siguiente página (None = no hay más)
+    next_cursor: Optional[str] = None
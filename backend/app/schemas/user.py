@@ -1,6 +1,6 @@
 #backend\app\schemas\user.py
 from pydantic import BaseModel, EmailStr, ConfigDict, computed_field
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -64,3 +64,29 @@ class UserSignup(BaseModel):
     last_name: Optional[str] = None
     phone: Optional[str] = None
 
+
+# --- Directorio de usuarios (admin, vista materializada user_directory) ---
+
+class UserDirectoryEntry(BaseModel):
+    id: UUID
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    is_active: bool
+    is_superuser: bool
+    telegram_linked: bool
+    created_at: datetime
+    last_login: Optional[datetime] = None
+    expense_count: int
+    expense_total: float
+    income_count: int
+    income_total: float
+    last_activity_at: Optional[datetime] = None
+
+class UserDirectoryPage(BaseModel):
+    items: List[UserDirectoryEntry]
+    # Cursor opaco para la siguiente página (None = no hay más)
+    next_cursor: Optional[str] = None
+    # Momento del último refresco de la vista (los datos pueden ir hasta USER_DIRECTORY_REFRESH_SECONDS atrasados)
+    refreshed_at: Optional[datetime] = None
@@ -1,10 +1,46 @@
 #backend\app\services\audit.py
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from datetime import datetime
+from decimal import Decimal
+from app.db.hooks import after_commit, after_rollback
 from app.models.user import User, AuditLog
+from app.services.audit_policy import audit_policy, audit_coalescer, CoalescedEvent
 import uuid
-from typing import Union  # <-- Necesario para el tipado
+from typing import Any, Optional, Union  # <-- Necesario para el tipado
+
+logger = logging.getLogger(__name__)
+
+# Clave en session.info donde se guardan las entradas que deben sobrevivir a un rollback
+AUDIT_ON_ROLLBACK_KEY = "audit_on_rollback"
+# Clave en session.info con los eventos agrupados (coalesce) de la request; cuentan tras el commit
+AUDIT_COALESCE_PENDING_KEY = "audit_coalesce_pending"
+# Largo máximo del mensaje de error guardado en data["error"]
+_MAX_ERROR_LENGTH = 500
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        return [_json_value(v) for v in value]
+    return value
+
+
+def audit_data(entity_type: Optional[str] = None, entity_id: Any = None, **fields: Any) -> dict:
+    """
+    Detalles estructurados de una entrada (AuditLog.data). Claves habituales:
+    entity_type, entity_id (o entity_ids en lotes), amount, count, error_class.
+    Los UUID/Decimal se pasan a JSON y las claves con None se omiten.
+    """
+    data = dict(entity_type=entity_type, entity_id=entity_id, **fields)
+    return {key: _json_value(value) for key, value in data.items() if value is not None}
+
 
 async def log_activity(
     db: AsyncSession,
@@ -12,56 +48,117 @@ async def log_activity(
     action: str,
     source: str,
     details: str = None,
-    update_last_login: bool = False
+    update_last_login: bool = False,
+    keep_on_rollback: bool = False,
+    data: Optional[dict] = None,
+    error: Optional[BaseException] = None,
 ):
     """
     Registra una actividad en la bitácora (Versión Async).
     Soporta user_id="system" buscando al usuario 'Sistema System'.
+
+    NO hace commit: la entrada se agrega a la transacción de la request y se confirma
+    junto con el cambio de negocio en deps.get_db (un solo commit por request).
+    Con keep_on_rollback=True (registros de errores) la entrada se guarda aunque la
+    request termine en rollback.
+
+    'details' es el texto para la bitácora; 'data' (ver audit_data) es lo que se filtra
+    en /users/logs/search. Con 'error' se añaden error_class y el mensaje a 'data'.
+
+    Cada acción sigue su regla de AUDIT_POLICY (ver services/audit_policy.py):
+    always (una fila), sample (solo una fracción) o coalesce (un contador por usuario y
+    ventana, volcado en segundo plano). last_login se actualiza siempre.
     """
-    
+    rule = audit_policy.rule_for(action)
+    if audit_policy.sampled_out(rule):
+        if update_last_login and user_id != "system":
+            await _touch_last_login(db, user_id)
+        return
+
     final_user_id = user_id
 
     # 1. Lógica especial para "system"
     if user_id == "system":
         # Buscamos al usuario sistema por nombre y apellido
-        query = select(User).where(
+        query = select(User.id).where(
             User.first_name == "Sistema",
             User.last_name == "System"
         )
         result = await db.execute(query)
-        system_user = result.scalars().first()
+        final_user_id = result.scalars().first()
 
-        if system_user:
-            final_user_id = system_user.id
-        else:
+        if not final_user_id:
             # Si no existe el usuario sistema, logueamos el error y salimos
             # para evitar romper la BD intentando insertar el string "system"
-            print(f"❌ Error AuditLog: No se encontró el usuario 'Sistema System' en la BD.")
+            logger.error("AuditLog: no se encontró el usuario 'Sistema System' en la BD", extra={"event": "audit.no_system_user", "action": action})
             return
 
     # 2. Crear registro de log con el ID resuelto
-    new_log = AuditLog(
+    if error is not None:
+        data = {**(data or {}), "error_class": type(error).__name__, "error": str(error)[:_MAX_ERROR_LENGTH]}
+    if rule.mode == "sample":
+        data = {**(data or {}), "sample_rate": rule.rate}
+
+    if rule.mode == "coalesce":
+        event = CoalescedEvent(final_user_id, action, source, details, data, datetime.utcnow(), rule.window)
+        if keep_on_rollback:
+            # Se registra pase lo que pase con la request
+            audit_coalescer.add(event)
+        else:
+            db.info.setdefault(AUDIT_COALESCE_PENDING_KEY, []).append(event)
+        if update_last_login and final_user_id:
+            await _touch_last_login(db, final_user_id)
+        return
+
+    entry = dict(
         user_id=final_user_id,
         action=action,
         source=source,
         details=details,
+        data=data or None,
         timestamp=datetime.utcnow()
     )
-    db.add(new_log)
+    db.add(AuditLog(**entry))
+    if keep_on_rollback:
+        db.info.setdefault(AUDIT_ON_ROLLBACK_KEY, []).append(entry)
 
     # 3. Actualizar last_login si se requiere
     if update_last_login and final_user_id:
-        # Reutilizamos final_user_id por si vino de "system"
-        result = await db.execute(select(User).where(User.id == final_user_id))
-        user = result.scalars().first()
-        
-        if user:
-            user.last_login = datetime.utcnow()
-            db.add(user)
-
-    # 4. Guardar cambios
+        await _touch_last_login(db, final_user_id)
+
+
+async def _touch_last_login(db: AsyncSession, user_id: Union[uuid.UUID, str]) -> None:
+    # UPDATE directo: no hace falta cargar al usuario
+    await db.execute(
+        update(User).where(User.id == user_id).values(last_login=datetime.utcnow())
+    )
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso: los eventos agrupados de la request cuentan."""
+    for event in db.info.pop(AUDIT_COALESCE_PENDING_KEY, None) or []:
+        audit_coalescer.add(event)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback."""
+    db.info.pop(AUDIT_COALESCE_PENDING_KEY, None)
+
+
+async def write_audit_after_rollback(db: AsyncSession):
+    """
+    Tras el rollback de una request fallida, guarda (en su propia transacción)
+    las entradas marcadas con keep_on_rollback.
+    """
+    entries = db.info.pop(AUDIT_ON_ROLLBACK_KEY, [])
+    if not entries:
+        return
+
+    db.add_all([AuditLog(**entry) for entry in entries])
     try:
         await db.commit()
     except Exception as e:
-        print(f"❌ Error escribiendo bitácora: {e}")
+        logger.exception("Error escribiendo bitácora tras rollback", extra={"event": "audit.write_failed", "entries": len(entries)})
         await db.rollback()
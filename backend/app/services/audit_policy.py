@@ -0,0 +1,213 @@
+#backend\app\services\audit_policy.py
+import asyncio
+import logging
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Literal, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.user import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# always: una fila por evento
+# sample: solo una fracción 'rate' de los eventos (la fila lleva sample_rate para reescalar)
+# coalesce: una fila por (usuario, acción, ventana de 'window' s) con un contador
+AuditMode = Literal["always", "sample", "coalesce"]
+
+# Espacio de nombres de los ids deterministas de las filas agrupadas
+_COALESCE_NAMESPACE = uuid.UUID("6f1c3a52-8e0b-4d7a-9a61-2b9f4c7d8e13")
+# Filas por INSERT al volcar (7 parámetros por fila; asyncpg admite 32767)
+_FLUSH_CHUNK = 1000
+
+
+@dataclass(frozen=True)
+class AuditRule:
+    mode: AuditMode = "always"
+    rate: float = 1.0
+    window: int = 0
+
+
+ALWAYS = AuditRule()
+
+
+def parse_policy(raw: str) -> Dict[str, AuditRule]:
+    """
+    'LOGIN_SILENT=coalesce:3600,ERROR_READ_*=coalesce:60,UPDATE_X=sample:0.1,Y=always'
+    -> {acción o prefijo*: regla}. Las entradas mal formadas se ignoran.
+    """
+    rules = {}
+    for part in (raw or "").split(","):
+        pattern, sep, spec = part.partition("=")
+        pattern, spec = pattern.strip(), spec.strip()
+        if not (sep and pattern and spec):
+            continue
+        mode, _, arg = spec.partition(":")
+        try:
+            if mode == "always":
+                rules[pattern] = ALWAYS
+            elif mode == "sample" and 0 <= float(arg) <= 1:
+                rules[pattern] = AuditRule("sample", rate=float(arg))
+            elif mode == "coalesce" and int(arg) > 0:
+                rules[pattern] = AuditRule("coalesce", window=int(arg))
+        except ValueError:
+            continue
+    return rules
+
+
+class AuditPolicy:
+    """
+    Regla de cada acción: coincidencia exacta o, si no, el prefijo ('ERROR_*') más largo.
+    Sin regla = always. La resolución se memoriza por acción (hay pocas acciones distintas).
+    """
+
+    def __init__(self, rules: Dict[str, AuditRule]):
+        self._exact = {k: v for k, v in rules.items() if not k.endswith("*")}
+        self._prefixes = sorted(
+            ((k[:-1], v) for k, v in rules.items() if k.endswith("*")), key=lambda kv: -len(kv[0])
+        )
+        self._resolved: Dict[str, AuditRule] = {}
+
+    def rule_for(self, action: str) -> AuditRule:
+        rule = self._resolved.get(action)
+        if rule is None:
+            rule = self._exact.get(action) or next(
+                (r for prefix, r in self._prefixes if action.startswith(prefix)), ALWAYS
+            )
+            self._resolved[action] = rule
+        return rule
+
+    def sampled_out(self, rule: AuditRule) -> bool:
+        return rule.mode == "sample" and random.random() >= rule.rate
+
+
+# ============================================================================
+#  AGRUPACIÓN (coalesce)
+# ============================================================================
+
+@dataclass
+class _Bucket:
+    source: str
+    details: Optional[str]
+    data: dict
+    first_at: datetime
+    last_at: datetime
+    window: int
+    count: int = 0
+
+
+@dataclass(frozen=True)
+class CoalescedEvent:
+    user_id: Optional[uuid.UUID]
+    action: str
+    source: str
+    details: Optional[str]
+    data: Optional[dict]
+    at: datetime
+    window: int
+
+
+def _upsert(rows: list):
+    # Conflicto = otro volcado (de este u otro worker) ya creó la fila de esa ventana: se suma
+    stmt = pg_insert(AuditLog).values(rows)
+    count = AuditLog.data["count"].as_integer() + stmt.excluded.data["count"].as_integer()
+    return stmt.on_conflict_do_update(
+        index_elements=[AuditLog.id],
+        set_={"data": AuditLog.data.op("||")(
+            func.jsonb_build_object("count", count, "last_at", stmt.excluded.data["last_at"])
+        )},
+    )
+
+
+class AuditCoalescer:
+    """
+    Contadores en memoria del worker; un bucle de fondo los vuelca cada
+    AUDIT_COALESCE_FLUSH_SECONDS en un solo INSERT ... ON CONFLICT DO UPDATE.
+
+    - El id de la fila es determinista (usuario, acción, inicio de ventana): todos los
+      workers suman sobre la misma fila, así que hay una fila por ventana aunque haya varios.
+    - La fila guarda el primer evento (timestamp, source, details, data) y en data
+      count, window_start, window_seconds y last_at.
+    - Escrituras a la BD por ventana = nº de volcados, no nº de eventos.
+      Un reinicio sin volcado pierde como mucho AUDIT_COALESCE_FLUSH_SECONDS de conteos.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[Optional[uuid.UUID], str, datetime], _Bucket] = {}
+        self._lock = asyncio.Lock()
+
+    def add(self, event: CoalescedEvent) -> None:
+        epoch = int((event.at - datetime(1970, 1, 1)).total_seconds())
+        window_start = datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % event.window)
+        key = (event.user_id, event.action, window_start)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(
+                event.source, event.details, event.data or {}, event.at, event.at, event.window
+            )
+        bucket.last_at = max(bucket.last_at, event.at)
+        bucket.count += 1
+
+    def _merge(self, buckets: Dict[Tuple[Optional[uuid.UUID], str, datetime], _Bucket]) -> None:
+        # Volcado fallido: los conteos vuelven a la memoria para el próximo intento
+        for key, old in buckets.items():
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = old
+                continue
+            bucket.first_at, bucket.source, bucket.details, bucket.data = old.first_at, old.source, old.details, old.data
+            bucket.last_at = max(bucket.last_at, old.last_at)
+            bucket.count += old.count
+
+    async def flush(self) -> int:
+        """Vuelca los contadores pendientes; devuelve cuántas filas tocó."""
+        async with self._lock:
+            buckets, self._buckets = self._buckets, {}
+            if not buckets:
+                return 0
+            rows = []
+            for (user_id, action, window_start), bucket in buckets.items():
+                rows.append(dict(
+                    id=uuid.uuid5(_COALESCE_NAMESPACE, f"{user_id}|{action}|{window_start.isoformat()}"),
+                    user_id=user_id,
+                    action=action,
+                    source=bucket.source,
+                    details=bucket.details,
+                    timestamp=bucket.first_at,
+                    data={
+                        **bucket.data,
+                        "count": bucket.count,
+                        "window_start": window_start.isoformat(),
+                        "window_seconds": bucket.window,
+                        "last_at": bucket.last_at.isoformat(),
+                    },
+                ))
+            try:
+                async with AsyncSessionLocal() as db:
+                    for start in range(0, len(rows), _FLUSH_CHUNK):
+                        await db.execute(_upsert(rows[start:start + _FLUSH_CHUNK]))
+                    await db.commit()
+            except Exception:
+                self._merge(buckets)
+                raise
+            return len(rows)
+
+
+async def run_flush_loop() -> None:
+    """Bucle de fondo del proceso: vuelca los eventos agrupados."""
+    while True:
+        await asyncio.sleep(settings.AUDIT_COALESCE_FLUSH_SECONDS)
+        try:
+            await audit_coalescer.flush()
+        except Exception as e:
+            logger.warning("Volcado de bitácora agrupada falló: %s", e, extra={"event": "audit.coalesce_flush_error"})
+
+
+audit_policy = AuditPolicy(parse_policy(settings.AUDIT_POLICY))
+audit_coalescer = AuditCoalescer()
@@ -0,0 +1,191 @@
+#backend\app\services\category_catalog.py
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.hooks import after_commit, after_rollback
+from app.models import Category
+
+# Clave en session.info con los cambios de categorías pendientes de confirmar
+CATALOG_CHANGES_KEY = "category_catalog_changes"
+# Marca "cambió algo global" (afecta al catálogo de todos los usuarios)
+_ALL = "__all__"
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    id: UUID
+    name: str
+    user_id: Optional[UUID]
+    is_active: bool
+
+    @property
+    def is_global(self) -> bool:
+        return self.user_id is None
+
+
+@dataclass
+class _Snapshot:
+    version: Tuple[int, int]
+    loaded_at: float
+    entries: Dict[UUID, CatalogEntry]
+    digest: str
+
+
+def _digest(entries: Dict[UUID, CatalogEntry]) -> str:
+    h = hashlib.sha1()
+    for e in sorted(entries.values(), key=lambda e: str(e.id)):
+        h.update(f"{e.id}|{e.name}|{e.is_active};".encode())
+    return h.hexdigest()[:16]
+
+
+class CategoryCatalogCache:
+    """
+    Catálogo de categorías en memoria (globales + privadas de cada usuario).
+
+    - Las globales se guardan una sola vez y se comparten entre usuarios.
+    - Las privadas se guardan por usuario (LRU acotado).
+    - Cada parte lleva un número de versión: los endpoints de categories.py marcan
+      el cambio en la sesión (mark_changed) y la versión sube SOLO tras el commit
+      (deps.get_db -> apply_changes). Una carga que empezó antes de la subida queda
+      guardada con la versión vieja y se descarta en la siguiente lectura.
+    - El TTL acota lo desactualizado que puede estar otro worker/proceso.
+    """
+
+    def __init__(self, ttl: float, max_users: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._global_version = 0
+        self._user_versions: Dict[UUID, int] = {}
+        self._globals: Optional[_Snapshot] = None
+        self._users: "OrderedDict[UUID, _Snapshot]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _fresh(self, snap: Optional[_Snapshot], version: Tuple[int, int]) -> bool:
+        return bool(snap) and snap.version == version and time.monotonic() - snap.loaded_at < self.ttl
+
+    async def _load(self, db: AsyncSession, user_id: Optional[UUID], version: Tuple[int, int]) -> _Snapshot:
+        scope = Category.user_id.is_(None) if user_id is None else Category.user_id == user_id
+        stmt = select(Category.id, Category.name, Category.user_id, Category.is_active).where(scope)
+        entries = {row.id: CatalogEntry(row.id, row.name, row.user_id, row.is_active) for row in await db.execute(stmt)}
+        return _Snapshot(version, time.monotonic(), entries, _digest(entries))
+
+    async def _global_snapshot(self, db: AsyncSession, refresh: bool) -> _Snapshot:
+        version = (self._global_version, 0)
+        if not refresh and self._fresh(self._globals, version):
+            return self._globals
+        snap = await self._load(db, None, version)
+        # Si la sesión trae cambios de categorías sin confirmar, no se cachea lo leído
+        if not db.info.get(CATALOG_CHANGES_KEY):
+            self._globals = snap
+        return snap
+
+    async def _user_snapshot(self, db: AsyncSession, user_id: UUID, refresh: bool) -> _Snapshot:
+        # Un cambio global (fusión, borrado masivo) también invalida las privadas
+        version = (self._global_version, self._user_versions.get(user_id, 0))
+        snap = self._users.get(user_id)
+        if not refresh and self._fresh(snap, version):
+            self._users.move_to_end(user_id)
+            return snap
+        snap = await self._load(db, user_id, version)
+        if not db.info.get(CATALOG_CHANGES_KEY):
+            self._users[user_id] = snap
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return snap
+
+    async def global_entries(self, db: AsyncSession) -> Dict[UUID, CatalogEntry]:
+        return (await self._global_snapshot(db, refresh=False)).entries
+
+    async def for_user(self, db: AsyncSession, user_id: UUID, refresh: bool = False) -> Tuple[Dict[UUID, CatalogEntry], str]:
+        """
+        Catálogo visible para el usuario (globales + privadas) y su huella (para ETag).
+        refresh=True fuerza la relectura de ambas partes.
+        """
+        globals_ = await self._global_snapshot(db, refresh)
+        private = await self._user_snapshot(db, user_id, refresh)
+        return {**globals_.entries, **private.entries}, f"{globals_.digest}-{private.digest}"
+
+    async def lookup(self, db: AsyncSession, user_id: UUID, ids: Iterable[UUID]) -> Dict[UUID, CatalogEntry]:
+        """
+        Resuelve 'ids' contra el catálogo del usuario.
+        Si falta alguno se relee una vez de BD (p. ej. una categoría recién creada
+        en otro worker) antes de darlo por inexistente.
+        """
+        wanted = set(ids)
+        catalog, _ = await self.for_user(db, user_id)
+        if not wanted.issubset(catalog):
+            catalog, _ = await self.for_user(db, user_id, refresh=True)
+        return {cid: catalog[cid] for cid in wanted if cid in catalog}
+
+    # ------------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------------
+
+    def invalidate(self, user_ids: Optional[Iterable[UUID]] = None) -> None:
+        """Sube versiones: de los usuarios dados o, sin argumentos, de todo el catálogo."""
+        if user_ids is None:
+            self._global_version += 1
+            self._users.clear()
+            return
+        for uid in user_ids:
+            self._user_versions[uid] = self._user_versions.get(uid, 0) + 1
+            self._users.pop(uid, None)
+
+
+def mark_changed(db: AsyncSession, user_id: Optional[UUID] = None) -> None:
+    """
+    Anota en la sesión que cambiaron categorías (user_id=None: globales o de varios usuarios).
+    La invalidación se aplica tras el commit de la request (ver apply_changes).
+    """
+    db.info.setdefault(CATALOG_CHANGES_KEY, set()).add(user_id if user_id is not None else _ALL)
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso: invalida lo que la request modificó."""
+    changes = db.info.pop(CATALOG_CHANGES_KEY, None)
+    if not changes:
+        return
+    if _ALL in changes:
+        category_catalog.invalidate()
+    else:
+        category_catalog.invalidate(changes)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback: los cambios nunca existieron."""
+    db.info.pop(CATALOG_CHANGES_KEY, None)
+
+
+def find_global_by_name(entries: Dict[UUID, CatalogEntry], name: str) -> Optional[CatalogEntry]:
+    for entry in entries.values():
+        if entry.name == name:
+            return entry
+    return None
+
+
+def filter_catalog(entries: Iterable[CatalogEntry], status_filter: str = "active", search: Optional[str] = None) -> List[CatalogEntry]:
+    """Mismo criterio que el listado de categorías (estado + búsqueda parcial), ordenado por nombre."""
+    term = (search or "").strip().lower()
+    result = [
+        e for e in entries
+        if (status_filter == "all" or e.is_active == (status_filter == "active"))
+        and (not term or term in e.name.lower())
+    ]
+    return sorted(result, key=lambda e: e.name)
+
+
+category_catalog = CategoryCatalogCache(settings.CATEGORY_CACHE_TTL, settings.CATEGORY_CACHE_MAX_USERS)
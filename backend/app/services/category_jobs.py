@@ -0,0 +1,257 @@
+#backend\app\services\category_jobs.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.hooks import run_after_commit
+from app.db.session import AsyncSessionLocal
+from app.models import Category, ExpenseItem
+from app.models.incomes import IngresoItem
+from app.models.jobs import CategoryJob
+from app.services.audit import log_activity, audit_data
+from app.services.category_catalog import category_catalog
+from app.services.category_suggest import category_suggestions
+from app.services.report_cache import report_cache
+
+logger = logging.getLogger(__name__)
+
+# Orden de las fases de un trabajo
+PHASES = ("expenses", "incomes", "finalize")
+_ITEM_TABLES = {"expenses": ExpenseItem, "incomes": IngresoItem}
+
+# Trabajos que este proceso está ejecutando (evita lanzar dos veces el mismo)
+_running: Set[UUID] = set()
+# Referencias fuertes a las tareas (asyncio solo guarda referencias débiles)
+_tasks: Set[asyncio.Task] = set()
+
+
+async def enqueue_job(db: AsyncSession, kind: str, source_ids: List[UUID], target_id: UUID, created_by: Optional[UUID]) -> CategoryJob:
+    """
+    Registra el trabajo en la transacción de la request (NO lo arranca).
+    Arrancarlo con start_job desde BackgroundTasks: corre después del commit.
+    """
+    job = CategoryJob(
+        kind=kind,
+        status="pending",
+        created_by=created_by,
+        source_ids=list(source_ids),
+        target_id=target_id,
+        phase=PHASES[0],
+        source_pos=0,
+        moved_expenses=0,
+        moved_incomes=0,
+        chunks=0,
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+
+async def find_category_job(db: AsyncSession, category_id: UUID, include_finished: bool = False) -> Optional[CategoryJob]:
+    """Último trabajo que tiene a la categoría como origen (por defecto, solo pendiente o en curso)."""
+    stmt = select(CategoryJob).where(CategoryJob.source_ids.any(category_id))
+    if not include_finished:
+        stmt = stmt.where(CategoryJob.status.in_(("pending", "running")))
+    return (await db.execute(stmt.order_by(CategoryJob.created_at.desc()).limit(1))).scalars().first()
+
+
+async def start_job(job_id: UUID) -> None:
+    """
+    Lanza el trabajo en una tarea aparte (no bloquea la request).
+    Es async para que BackgroundTasks la ejecute en el event loop y no en un hilo.
+    """
+    if job_id in _running:
+        return
+    task = asyncio.create_task(run_job(job_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.CATEGORY_JOB_STALE_SECONDS)
+
+
+async def _claim(job_id: UUID) -> bool:
+    """
+    Toma el trabajo si está pendiente o si su latido se quedó viejo (proceso caído).
+    Un UPDATE condicional: si dos procesos compiten, solo uno recibe la fila.
+    """
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            update(CategoryJob)
+            .where(
+                CategoryJob.id == job_id,
+                or_(
+                    CategoryJob.status == "pending",
+                    and_(CategoryJob.status == "running", CategoryJob.updated_at < _stale_before()),
+                ),
+            )
+            .values(status="running", updated_at=datetime.utcnow())
+            .returning(CategoryJob.id)
+        )
+        claimed = (await db.execute(stmt)).scalar_one_or_none()
+        await db.commit()
+        return claimed is not None
+
+
+async def _move_chunk(db: AsyncSession, job: CategoryJob) -> None:
+    """
+    Mueve un lote de items de la categoría origen en curso y avanza el punto de reanudación.
+    El conteo sale del propio UPDATE ... RETURNING (sin COUNT aparte).
+    """
+    model = _ITEM_TABLES[job.phase]
+    source_id = job.source_ids[job.source_pos]
+
+    batch = (
+        select(model.id)
+        .where(model.category_id == source_id)
+        .order_by(model.id)
+        .limit(settings.CATEGORY_JOB_CHUNK_SIZE)
+    )
+    if job.cursor is not None:
+        batch = batch.where(model.id > job.cursor)
+
+    stmt = (
+        update(model)
+        .where(model.id.in_(batch.scalar_subquery()))
+        .values(category_id=job.target_id)
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+    moved = (await db.execute(stmt)).scalars().all()
+
+    if job.phase == "expenses":
+        job.moved_expenses += len(moved)
+    else:
+        job.moved_incomes += len(moved)
+
+    if len(moved) >= settings.CATEGORY_JOB_CHUNK_SIZE:
+        job.cursor = max(moved)
+    elif job.cursor is not None:
+        # Última pasada desde el inicio: recoge items que se colaron detrás del cursor
+        job.cursor = None
+    else:
+        # Categoría vacía: siguiente origen o siguiente fase
+        job.source_pos += 1
+        if job.source_pos >= len(job.source_ids):
+            job.phase = PHASES[PHASES.index(job.phase) + 1]
+            job.source_pos = 0
+
+
+async def _finalize(db: AsyncSession, job: CategoryJob) -> None:
+    if job.kind == "BULK_DELETE":
+        await db.execute(delete(Category).where(Category.id.in_(job.source_ids)))
+
+    job.status = "done"
+    job.finished_at = datetime.utcnow()
+    await log_activity(
+        db, job.created_by or "system", f"CATEGORY_JOB_{job.kind}", "SYSTEM",
+        details=f"Trabajo {job.id}: {len(job.source_ids)} categorías -> {job.target_id}. "
+                f"Movió {job.moved_expenses} gastos, {job.moved_incomes} ingresos en {job.chunks} lotes.",
+        data=audit_data("category_job", job.id, entity_ids=job.source_ids, target_id=job.target_id,
+                        moved_expenses=job.moved_expenses, moved_incomes=job.moved_incomes)
+    )
+
+
+async def run_job(job_id: UUID) -> None:
+    """
+    Ejecuta el trabajo lote a lote. Cada lote es su propia transacción (bloqueos cortos)
+    y guarda el avance junto con el cambio, así que reanudar nunca repite ni pierde filas.
+    """
+    if job_id in _running:
+        return
+    _running.add(job_id)
+    try:
+        if not await _claim(job_id):
+            return
+
+        while True:
+            async with AsyncSessionLocal() as db:
+                # FOR UPDATE: si otro proceso retomó el mismo trabajo, los lotes se serializan
+                job = await db.get(CategoryJob, job_id, with_for_update=True)
+                if job is None or job.status != "running":
+                    return
+
+                if job.phase == "finalize":
+                    await _finalize(db, job)
+                    await db.commit()
+                    run_after_commit(db)
+                    if job.kind == "BULK_DELETE":
+                        category_catalog.invalidate()
+                    # Los items cambiaron de categoría: el índice se reconstruye al próximo uso
+                    category_suggestions.invalidate()
+                    logger.info(
+                        "Trabajo de categorías %s terminado (%s gastos, %s ingresos)", job_id, job.moved_expenses, job.moved_incomes,
+                        extra={"event": "category_job.done", "job_id": str(job_id), "kind": job.kind, "chunks": job.chunks}
+                    )
+                    return
+
+                await _move_chunk(db, job)
+                job.chunks += 1
+                job.updated_at = datetime.utcnow()
+                await db.commit()
+                # Los items cambiaron de categoría (puede haber varios usuarios en el lote)
+                report_cache.invalidate()
+
+            # Cede el turno a las requests entre lote y lote
+            await asyncio.sleep(settings.CATEGORY_JOB_CHUNK_PAUSE)
+
+    except Exception as e:
+        logger.exception("Trabajo de categorías %s falló", job_id, extra={"event": "category_job.failed", "job_id": str(job_id)})
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(CategoryJob)
+                .where(CategoryJob.id == job_id)
+                .values(status="failed", error=str(e)[:500], updated_at=datetime.utcnow())
+            )
+            await log_activity(db, "system", "ERROR_CATEGORY_JOB", "SYSTEM", details=f"Trabajo {job_id}: {str(e)}",
+                               data=audit_data("category_job", job_id), error=e)
+            await db.commit()
+            run_after_commit(db)
+    finally:
+        _running.discard(job_id)
+
+
+async def restart_job(db: AsyncSession, job: CategoryJob) -> bool:
+    """
+    Reinicio idempotente: un trabajo terminado o en marcha (latido fresco) no se toca.
+    Uno fallido o huérfano vuelve a 'pending' y sigue desde su punto de reanudación.
+    :return: True si hay que lanzarlo (start_job tras el commit).
+    """
+    if job.status == "done":
+        return False
+    if job.status == "running" and job.updated_at >= _stale_before():
+        return False
+    job.status = "pending"
+    job.error = None
+    job.updated_at = datetime.utcnow()
+    await db.flush()
+    return True
+
+
+async def supervise_jobs() -> None:
+    """
+    Bucle de fondo del proceso: retoma trabajos pendientes o huérfanos
+    (p. ej. tras un reinicio en mitad de una fusión).
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = select(CategoryJob.id).where(
+                    or_(
+                        CategoryJob.status == "pending",
+                        and_(CategoryJob.status == "running", CategoryJob.updated_at < _stale_before()),
+                    )
+                )
+                job_ids = (await db.execute(stmt)).scalars().all()
+            for job_id in job_ids:
+                await start_job(job_id)
+        except Exception as e:
+            logger.warning("Supervisor de trabajos de categorías: %s", e, extra={"event": "category_job.supervisor_error"})
+        await asyncio.sleep(settings.CATEGORY_JOB_STALE_SECONDS / 2)
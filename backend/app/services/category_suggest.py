@@ -0,0 +1,208 @@
+#backend\app\services\category_suggest.py
+import math
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.hooks import after_commit, after_rollback
+from app.models import Expense, ExpenseItem
+from app.models.incomes import Ingreso, IngresoItem
+from app.services.category_catalog import category_catalog, find_global_by_name
+from app.services.utils import GLOBAL_OTHERS_NAME
+
+# Clave en session.info con los items escritos en la request (se aprenden tras el commit)
+SUGGEST_PENDING_KEY = "category_suggest_pending"
+
+KINDS = ("expense", "income")
+
+_TOKEN_RE = re.compile(r"[a-z0-9ñ]+")
+_STOPWORDS = frozenset({
+    "de", "del", "la", "las", "el", "los", "un", "una", "y", "o", "en", "con", "para", "por", "al", "a",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin acentos (conserva la ñ), sin números sueltos ni palabras vacías."""
+    text = unicodedata.normalize("NFKD", (text or "").lower().replace("ñ", "\0"))
+    text = "".join(c for c in text if not unicodedata.combining(c)).replace("\0", "ñ")
+    return list(dict.fromkeys(
+        t for t in _TOKEN_RE.findall(text)
+        if len(t) > 1 and not t.isdigit() and t not in _STOPWORDS
+    ))
+
+
+@dataclass
+class _UserIndex:
+    """token -> {category_id: veces que un item con ese token fue a esa categoría}, por tipo."""
+    loaded_at: float
+    others_id: Optional[UUID]
+    tokens: Dict[str, Dict[str, Dict[UUID, int]]] = field(
+        default_factory=lambda: {kind: defaultdict(lambda: defaultdict(int)) for kind in KINDS}
+    )
+    items: Dict[str, int] = field(default_factory=lambda: {kind: 0 for kind in KINDS})
+
+    def learn(self, kind: str, text: str, category_id: Optional[UUID], count: int = 1) -> None:
+        if category_id is None or category_id == self.others_id:
+            return
+        index = self.tokens[kind]
+        for token in tokenize(text):
+            index[token][category_id] += count
+        self.items[kind] += count
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    category_id: UUID
+    score: float  # 0..1
+
+
+class CategorySuggestIndex:
+    """
+    Índice en memoria token -> frecuencia por categoría, por usuario y tipo (gasto/ingreso).
+
+    - Se construye una vez por usuario con un GROUP BY (nombre, categoría) de su historial
+      y luego se actualiza en cada escritura confirmada (record -> apply_changes).
+    - Sugerir solo recorre los tokens del texto: nunca consulta los movimientos.
+    - Los items en "Otros" no enseñan nada (es el destino por defecto, no una elección).
+    - Borrados/ediciones no se restan: el TTL reconstruye el índice y acota la deriva.
+      Los trabajos de categorías (fusiones) lo invalidan entero.
+    """
+
+    def __init__(self, ttl: float, max_users: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users: "OrderedDict[UUID, _UserIndex]" = OrderedDict()
+        # Escrituras aprendidas sin índice cargado: invalida una construcción en curso
+        self._generations: Dict[UUID, int] = {}
+
+    async def _build(self, db: AsyncSession, user_id: UUID) -> _UserIndex:
+        others_id = await _others_id(db)
+        index = _UserIndex(loaded_at=time.monotonic(), others_id=others_id)
+        sources = (
+            ("expense", ExpenseItem.name, ExpenseItem.category_id, Expense, ExpenseItem.expense_id == Expense.id, Expense.user_id),
+            ("income", IngresoItem.descripcion, IngresoItem.category_id, Ingreso, IngresoItem.ingreso_id == Ingreso.id, Ingreso.user_id),
+        )
+        for kind, text_col, cat_col, parent, join_on, owner in sources:
+            stmt = (
+                select(text_col, cat_col, func.count())
+                .join(parent, join_on)
+                .where(owner == user_id, cat_col.is_not(None))
+                .group_by(text_col, cat_col)
+            )
+            if others_id:
+                stmt = stmt.where(cat_col != others_id)
+            for text, category_id, count in await db.execute(stmt):
+                index.learn(kind, text, category_id, count)
+        return index
+
+    async def _for_user(self, db: AsyncSession, user_id: UUID) -> _UserIndex:
+        index = self._users.get(user_id)
+        if index and time.monotonic() - index.loaded_at < self.ttl:
+            self._users.move_to_end(user_id)
+            return index
+
+        generation = self._generations.get(user_id, 0)
+        index = await self._build(db, user_id)
+        if self._generations.get(user_id, 0) == generation:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return index
+
+    async def suggest(self, db: AsyncSession, user_id: UUID, kind: str, text: str, limit: int = 3) -> List[Suggestion]:
+        """
+        Categorías probables para el texto de un item.
+        score = media, ponderada por idf, de P(categoría | token) sobre los tokens conocidos.
+        Solo devuelve categorías activas del catálogo del usuario.
+        """
+        index = await self._for_user(db, user_id)
+        tokens = index.tokens[kind]
+        total_items = index.items[kind]
+
+        scores: Dict[UUID, float] = defaultdict(float)
+        weight_sum = 0.0
+        for token in tokenize(text):
+            by_category = tokens.get(token)
+            if not by_category:
+                continue
+            token_total = sum(by_category.values())
+            idf = math.log(1 + total_items / token_total)
+            weight_sum += idf
+            for category_id, count in by_category.items():
+                scores[category_id] += idf * count / token_total
+        if not weight_sum:
+            return []
+
+        catalog, _ = await category_catalog.for_user(db, user_id)
+        ranked = sorted(
+            (Suggestion(cid, round(score / weight_sum, 4)) for cid, score in scores.items()
+             if cid in catalog and catalog[cid].is_active),
+            key=lambda s: -s.score,
+        )
+        return ranked[:limit]
+
+    def learn(self, user_id: UUID, entries: List[Tuple[str, str, Optional[UUID]]]) -> None:
+        # Una construcción en curso no vio estas filas: que no se guarde
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        index = self._users.get(user_id)
+        if index is None:
+            return
+        for kind, text, category_id in entries:
+            index.learn(kind, text, category_id)
+
+    def invalidate(self) -> None:
+        self._users.clear()
+
+
+async def _others_id(db: AsyncSession) -> Optional[UUID]:
+    entry = find_global_by_name(await category_catalog.global_entries(db), GLOBAL_OTHERS_NAME)
+    return entry.id if entry else None
+
+
+async def auto_category(db: AsyncSession, user_id: UUID, kind: str, text: str) -> Optional[UUID]:
+    """
+    Categoría para un item que llegó sin category_id, si la auto-asignación está activa
+    y la sugerencia es lo bastante segura. None = usar "Otros".
+    """
+    if not settings.CATEGORY_AUTO_ASSIGN:
+        return None
+    suggestions = await category_suggestions.suggest(db, user_id, kind, text, limit=1)
+    if suggestions and suggestions[0].score >= settings.CATEGORY_AUTO_ASSIGN_MIN_SCORE:
+        return suggestions[0].category_id
+    return None
+
+
+def record(db: AsyncSession, user_id: UUID, kind: str, text: str, category_id: Optional[UUID]) -> None:
+    """Anota un item escrito en la request; se aprende tras el commit (ver apply_changes)."""
+    db.info.setdefault(SUGGEST_PENDING_KEY, []).append((user_id, kind, text, category_id))
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso."""
+    pending = db.info.pop(SUGGEST_PENDING_KEY, None)
+    if not pending:
+        return
+    by_user: Dict[UUID, List[Tuple[str, str, Optional[UUID]]]] = defaultdict(list)
+    for user_id, kind, text, category_id in pending:
+        by_user[user_id].append((kind, text, category_id))
+    for user_id, entries in by_user.items():
+        category_suggestions.learn(user_id, entries)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback."""
+    db.info.pop(SUGGEST_PENDING_KEY, None)
+
+
+category_suggestions = CategorySuggestIndex(settings.CATEGORY_SUGGEST_TTL, settings.CATEGORY_SUGGEST_MAX_USERS)
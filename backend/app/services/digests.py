@@ -0,0 +1,166 @@
+#backend\app\services\digests.py
+import asyncio
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.models.gastos import Expense, ExpenseItem, Category
+from app.models.incomes import Ingreso
+from app.services.telegram_sender import TelegramSender
+
+PERIODS = {"daily": 1, "weekly": 7}
+
+
+@dataclass
+class Recipient:
+    user_id: uuid.UUID
+    chat_id: int
+    first_name: Optional[str]
+
+
+@dataclass
+class DigestSummary:
+    expenses_count: int = 0
+    expenses_total: float = 0.0
+    incomes_total: float = 0.0
+    top_category: Optional[str] = None
+    top_category_total: float = 0.0
+
+
+def period_bounds(period: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Rango [inicio, fin) en UTC que termina a las 00:00 de hoy."""
+    if period not in PERIODS:
+        raise ValueError(f"Periodo no soportado: {period}")
+    now = now or datetime.now(timezone.utc)
+    end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return end - timedelta(days=PERIODS[period]), end
+
+
+async def fetch_recipient_batch(
+    db: AsyncSession, batch_size: int, after_id: Optional[uuid.UUID] = None
+) -> List[Recipient]:
+    """
+    Siguiente lote de usuarios con Telegram vinculado por keyset (id > after_id).
+    A diferencia de OFFSET, cada lote cuesta lo mismo sin importar lo avanzado del recorrido.
+    """
+    query = (
+        select(User.id, User.telegram_chat_id, User.first_name)
+        .where(User.telegram_chat_id.is_not(None), User.is_active.is_(True))
+        .order_by(User.id)
+        .limit(batch_size)
+    )
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+
+    rows = (await db.execute(query)).all()
+    return [Recipient(r.id, r.telegram_chat_id, r.first_name) for r in rows]
+
+
+async def summarize_batch(
+    db: AsyncSession, user_ids: List[uuid.UUID], start: datetime, end: datetime
+) -> Dict[uuid.UUID, DigestSummary]:
+    """Resúmenes de TODO el lote con tres consultas agregadas (GROUP BY user_id)."""
+    summaries: Dict[uuid.UUID, DigestSummary] = {uid: DigestSummary() for uid in user_ids}
+
+    # 1. Gastos del periodo
+    expenses_q = (
+        select(Expense.user_id, func.count(Expense.id), func.coalesce(func.sum(Expense.total), 0))
+        .where(Expense.user_id.in_(user_ids), Expense.date >= start, Expense.date < end)
+        .group_by(Expense.user_id)
+    )
+    for user_id, count, total in (await db.execute(expenses_q)).all():
+        summaries[user_id].expenses_count = count
+        summaries[user_id].expenses_total = float(total)
+
+    # 2. Ingresos del periodo
+    incomes_q = (
+        select(Ingreso.user_id, func.coalesce(func.sum(Ingreso.monto_total), 0))
+        .where(Ingreso.user_id.in_(user_ids), Ingreso.fecha >= start, Ingreso.fecha < end)
+        .group_by(Ingreso.user_id)
+    )
+    for user_id, total in (await db.execute(incomes_q)).all():
+        summaries[user_id].incomes_total = float(total)
+
+    # 3. Categoría con más gasto por usuario (ROW_NUMBER sobre el total por categoría)
+    category_total = func.sum(ExpenseItem.amount * ExpenseItem.quantity)
+    ranked = (
+        select(
+            Expense.user_id.label("user_id"),
+            Category.name.label("name"),
+            category_total.label("total"),
+            func.row_number().over(
+                partition_by=Expense.user_id, order_by=category_total.desc()
+            ).label("rn"),
+        )
+        .join(ExpenseItem, ExpenseItem.expense_id == Expense.id)
+        .join(Category, Category.id == ExpenseItem.category_id)
+        .where(Expense.user_id.in_(user_ids), Expense.date >= start, Expense.date < end)
+        .group_by(Expense.user_id, Category.name)
+        .subquery()
+    )
+    top_q = select(ranked.c.user_id, ranked.c.name, ranked.c.total).where(ranked.c.rn == 1)
+    for user_id, name, total in (await db.execute(top_q)).all():
+        summaries[user_id].top_category = name
+        summaries[user_id].top_category_total = float(total)
+
+    return summaries
+
+
+def format_digest(period: str, recipient: Recipient, summary: DigestSummary) -> str:
+    title = "📅 Resumen de ayer" if period == "daily" else "📆 Resumen de la semana"
+    name = escape(recipient.first_name or "")
+    lines = [f"{title}{', ' + name if name else ''}", ""]
+
+    if summary.expenses_count == 0:
+        lines.append("💸 No registraste gastos en este periodo.")
+    else:
+        lines.append(f"💸 Gastos: <b>${summary.expenses_total:,.2f}</b> ({summary.expenses_count} registros)")
+    lines.append(f"💰 Ingresos: <b>${summary.incomes_total:,.2f}</b>")
+    if summary.top_category:
+        lines.append(
+            f"🏷️ Mayor categoría: {escape(summary.top_category)} (${summary.top_category_total:,.2f})"
+        )
+    return "\n".join(lines)
+
+
+async def send_digests(
+    session_factory: Callable[[], AsyncSession],
+    sender: TelegramSender,
+    period: str,
+    batch_size: int,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Envía el resumen del periodo a todos los usuarios vinculados.
+    - Cada lote abre una sesión corta (destinatarios + resúmenes) y la cierra antes
+      de enviar: el envío, limitado por el rate limit de Telegram, no retiene conexiones.
+    - Mientras se envía un lote ya se está consultando el siguiente.
+    """
+    start, end = period_bounds(period, now)
+    recipients_total = 0
+    pending_send = None
+    last_id = None
+
+    while True:
+        async with session_factory() as db:
+            batch = await fetch_recipient_batch(db, batch_size, last_id)
+            if not batch:
+                break
+            summaries = await summarize_batch(db, [r.user_id for r in batch], start, end)
+        messages = [(r.chat_id, format_digest(period, r, summaries[r.user_id])) for r in batch]
+        recipients_total += len(batch)
+        last_id = batch[-1].user_id
+
+        if pending_send is not None:
+            await pending_send
+        pending_send = asyncio.ensure_future(sender.send_many(messages))
+
+    if pending_send is not None:
+        await pending_send
+    return recipients_total
@@ -0,0 +1,109 @@
+#backend\app\services\expense_dedupe.py
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, exists, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Expense
+
+# skip: no crea el duplicado y devuelve el gasto existente
+# warn: lo crea y lo señala (duplicate_of)
+# allow: lo crea sin señalarlo
+DuplicatePolicy = Literal["skip", "warn", "allow"]
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join((name or "").casefold().split())
+
+
+def expense_fingerprint(user_id: UUID, when: datetime, items: list) -> str:
+    """
+    Huella de un gasto: usuario + intervalo de fecha (UTC, EXPENSE_FINGERPRINT_BUCKET_SECONDS)
+    + total + items (nombre normalizado, importe, cantidad) ordenados.
+    El orden de los items, mayúsculas y espacios no cambian la huella.
+    """
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    bucket = int(when.timestamp()) // settings.EXPENSE_FINGERPRINT_BUCKET_SECONDS
+    total = sum(item.amount * item.quantity for item in items)
+    lines = sorted(f"{_normalize_name(item.name)}|{item.amount:.2f}|{item.quantity}" for item in items)
+    raw = "\n".join([str(user_id), str(bucket), f"{total:.2f}", *lines])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class InsertOutcome:
+    expense_id: UUID
+    created: bool
+    # Gasto ya existente con la misma huella (solo con skip/warn)
+    duplicate_of: Optional[UUID] = None
+
+
+async def insert_expenses(db: AsyncSession, rows: List[dict], policy: DuplicatePolicy) -> List[InsertOutcome]:
+    """
+    Inserta las cabeceras de gasto ('rows': id, user_id, date, total, notes, fingerprint)
+    en un solo INSERT ... ON CONFLICT DO NOTHING RETURNING contra ux_expenses_user_id_fingerprint.
+    - La comprobación de duplicado es la propia inserción (una sonda al índice único):
+      sin carreras entre requests concurrentes ni escaneos previos.
+    - Duplicados dentro del mismo lote también chocan (con la fila insertada antes).
+    - Con warn/allow los duplicados se insertan después sin huella, así el original
+      sigue siendo el que detecta futuros reintentos.
+    Devuelve un resultado por fila, en el mismo orden.
+    """
+    stmt = (
+        pg_insert(Expense)
+        .values(rows)
+        .on_conflict_do_nothing(
+            index_elements=["user_id", "fingerprint"], index_where=Expense.fingerprint.is_not(None)
+        )
+        .returning(Expense.id)
+    )
+    inserted = set((await db.execute(stmt)).scalars().all())
+    conflicts = [row for row in rows if row["id"] not in inserted]
+    if not conflicts:
+        return [InsertOutcome(row["id"], created=True) for row in rows]
+
+    existing: Dict[str, UUID] = dict(
+        (await db.execute(
+            select(Expense.fingerprint, Expense.id).where(
+                Expense.user_id == conflicts[0]["user_id"],
+                Expense.fingerprint.in_({row["fingerprint"] for row in conflicts}),
+            )
+        )).all()
+    )
+    if policy != "skip":
+        await db.execute(pg_insert(Expense).values([{**row, "fingerprint": None} for row in conflicts]))
+
+    outcomes = []
+    for row in rows:
+        if row["id"] in inserted:
+            outcomes.append(InsertOutcome(row["id"], created=True))
+        elif policy == "skip":
+            duplicate_of = existing[row["fingerprint"]]
+            outcomes.append(InsertOutcome(duplicate_of, created=False, duplicate_of=duplicate_of))
+        else:
+            duplicate_of = existing[row["fingerprint"]] if policy == "warn" else None
+            outcomes.append(InsertOutcome(row["id"], created=True, duplicate_of=duplicate_of))
+    return outcomes
+
+
+async def refresh_fingerprint(db: AsyncSession, expense_id: UUID, user_id: UUID, fingerprint: str) -> None:
+    """
+    Tras editar un gasto: guarda su nueva huella salvo que ya la tenga otro gasto
+    (en ese caso queda sin huella; la edición no debe fallar por parecerse a otro).
+    """
+    taken = exists().where(
+        Expense.user_id == user_id, Expense.fingerprint == fingerprint, Expense.id != expense_id
+    )
+    await db.execute(
+        update(Expense)
+        .where(Expense.id == expense_id)
+        .values(fingerprint=case((taken, None), else_=fingerprint))
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,173 @@
+#backend\app\services\idempotency.py
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.hooks import after_commit, after_rollback
+from app.models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Clave en session.info con las respuestas guardadas en la request (pasan al LRU tras el commit)
+IDEMPOTENCY_PENDING_KEY = "idempotency_pending"
+_MAX_KEY_LENGTH = 255
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    body: Any
+    expires_at: datetime
+
+
+class IdempotencyCache:
+    """
+    LRU en memoria del worker: (user_id, clave) -> respuesta ya confirmada.
+    Solo entra lo confirmado (apply_changes), así que un acierto se puede repetir
+    sin tocar la BD. Si no está aquí, manda la tabla idempotency_keys.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[UUID, str], StoredResponse]" = OrderedDict()
+
+    def get(self, user_id: UUID, key: str) -> Optional[StoredResponse]:
+        stored = self._entries.get((user_id, key))
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            del self._entries[(user_id, key)]
+            return None
+        self._entries.move_to_end((user_id, key))
+        return stored
+
+    def put(self, user_id: UUID, key: str, stored: StoredResponse) -> None:
+        self._entries[(user_id, key)] = stored
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def request_hash(scope: str, payload: BaseModel, *params: Any) -> str:
+    """Huella de la petición: endpoint + parámetros de query + cuerpo validado."""
+    raw = "\n".join([scope, *(str(p) for p in params), payload.model_dump_json()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _lock_id(user_id: UUID, key: str) -> int:
+    # pg_advisory_xact_lock recibe un bigint
+    digest = hashlib.sha256(f"{user_id}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def _replay(stored: StoredResponse, req_hash: str) -> JSONResponse:
+    if stored.request_hash != req_hash:
+        raise HTTPException(
+            status_code=422,
+            detail=f"La cabecera {IDEMPOTENCY_HEADER} ya se usó con una petición distinta"
+        )
+    return JSONResponse(
+        content=stored.body, status_code=stored.status_code, headers={"Idempotent-Replayed": "true"}
+    )
+
+
+async def replay_or_lock(db: AsyncSession, user_id: UUID, key: Optional[str], req_hash: str) -> Optional[JSONResponse]:
+    """
+    Llamar al inicio de un alta con Idempotency-Key.
+    - Clave ya vista: devuelve la respuesta original (sin escribir nada).
+    - Clave nueva: toma un advisory lock de transacción sobre (usuario, clave) y devuelve None.
+      Un duplicado concurrente espera en el lock hasta el commit del primero y entonces
+      encuentra la fila y repite su respuesta.
+    Sin cabecera no hace nada.
+    """
+    if key is None:
+        return None
+    if not key or len(key) > _MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} debe tener entre 1 y {_MAX_KEY_LENGTH} caracteres")
+
+    stored = idempotency_cache.get(user_id, key)
+    if stored:
+        return _replay(stored, req_hash)
+
+    await db.execute(select(func.pg_advisory_xact_lock(_lock_id(user_id, key))))
+    row = (await db.execute(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.utcnow(),
+        )
+    )).scalars().first()
+    if row is None:
+        return None
+
+    stored = StoredResponse(row.request_hash, row.status_code, row.response, row.expires_at)
+    idempotency_cache.put(user_id, key, stored)
+    return _replay(stored, req_hash)
+
+
+async def remember_response(
+    db: AsyncSession, user_id: UUID, key: Optional[str], req_hash: str, status_code: int, response: Any
+) -> None:
+    """
+    Guarda la respuesta del alta en la misma transacción (se confirma o se descarta con ella).
+    Un error nunca llega aquí: la clave queda libre para reintentar.
+    """
+    if key is None:
+        return
+    body = jsonable_encoder(response)
+    expires_at = datetime.utcnow() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    values = dict(request_hash=req_hash, status_code=status_code, response=body, expires_at=expires_at)
+    # Upsert: una fila vencida aún no purgada se reutiliza
+    await db.execute(
+        pg_insert(IdempotencyKey)
+        .values(user_id=user_id, key=key, created_at=datetime.utcnow(), **values)
+        .on_conflict_do_update(index_elements=["user_id", "key"], set_=values)
+    )
+    db.info.setdefault(IDEMPOTENCY_PENDING_KEY, []).append(
+        (user_id, key, StoredResponse(req_hash, status_code, body, expires_at))
+    )
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso."""
+    for user_id, key, stored in db.info.pop(IDEMPOTENCY_PENDING_KEY, None) or []:
+        idempotency_cache.put(user_id, key, stored)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback."""
+    db.info.pop(IDEMPOTENCY_PENDING_KEY, None)
+
+
+async def run_prune_loop() -> None:
+    """Bucle de fondo del proceso: borra las claves vencidas."""
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_PRUNE_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()))
+                await db.commit()
+        except Exception as e:
+            logger.warning("Purga de Idempotency-Key falló: %s", e, extra={"event": "idempotency.prune_error"})
+
+
+idempotency_cache = IdempotencyCache(settings.IDEMPOTENCY_CACHE_MAX_ENTRIES)
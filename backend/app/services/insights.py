@@ -0,0 +1,238 @@
+#backend\app\services\insights.py
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import select, func, cast, literal, Date
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.gastos import Expense, ExpenseItem
+
+# Ventanas de las medias móviles (días)
+SHORT_WINDOW = 7
+LONG_WINDOW = 30
+# Días de la serie de tendencia devuelta
+TREND_DAYS = 90
+# Historia mínima cargada: cubre "mismo periodo del año pasado" aunque el usuario sea nuevo
+_MIN_HISTORY_DAYS = 400
+
+
+@dataclass
+class ExpenseHistory:
+    """
+    Historial de gastos de un usuario en arrays (un elemento por ExpenseItem).
+    'ago' = días antes de 'today' (fecha local); 'cat' = índice en 'categories'.
+    """
+    today: date
+    ago: np.ndarray          # int32
+    cat: np.ndarray          # int32
+    amount: np.ndarray       # float64 (amount * quantity)
+    categories: List[Optional[UUID]]
+    # ids de los items de los últimos 'lookback' días, en el mismo orden que sus posiciones
+    recent_ids: List[UUID]
+    lookback: int
+
+
+@dataclass
+class CategoryInsight:
+    category_id: Optional[UUID]
+    avg_daily_7: float
+    avg_daily_30: float
+    month_to_date: float
+    projected_month_end: float
+    same_period_last_year: float
+
+
+@dataclass
+class Anomaly:
+    item_id: UUID
+    category_id: Optional[UUID]
+    amount: float
+    category_mean: float
+    z_score: float
+    days_ago: int
+
+
+@dataclass
+class InsightsResult:
+    today: date
+    days_in_month: int
+    trend_days: np.ndarray    # fechas (datetime64[D])
+    trend_total: np.ndarray
+    trend_ma7: np.ndarray
+    trend_ma30: np.ndarray
+    totals: CategoryInsight   # category_id=None: todas las categorías
+    categories: List[CategoryInsight]
+    anomalies: List[Anomaly]
+
+
+# ============================================================================
+#  CARGA (una sola consulta; la BD devuelve arrays, no filas)
+# ============================================================================
+
+async def load_history(
+    db: AsyncSession, user_id: UUID, tz: str, today: date, category_ids: List[UUID]
+) -> ExpenseHistory:
+    """
+    Trae todos los items del usuario hasta hoy (fecha local) como arrays paralelos.
+    - Todos los array_agg consumen las filas en el mismo orden, así que quedan alineados.
+    - El índice de categoría sale de un join con 'category_ids' (el catálogo en memoria):
+      sin ordenar ni numerar filas en la BD. El índice 0 es "sin categoría".
+    """
+    lookback = settings.INSIGHTS_ANOMALY_LOOKBACK_DAYS
+    end = datetime.combine(today + timedelta(days=1), time(), tzinfo=ZoneInfo(tz))
+
+    ago = (literal(today, Date) - cast(func.timezone(tz, Expense.date), Date)).label("ago")
+    catalog = (
+        func.unnest(cast(category_ids, ARRAY(PG_UUID(as_uuid=True))))
+        .table_valued("id", with_ordinality="idx")
+        .render_derived(name="catalog")
+    )
+    stmt = (
+        select(
+            func.array_agg(ago),
+            func.array_agg(func.coalesce(catalog.c.idx, 0)),
+            func.array_agg(ExpenseItem.amount * ExpenseItem.quantity),
+            func.array_agg(ExpenseItem.id).filter(ago <= lookback),
+        )
+        .select_from(Expense)
+        .join(ExpenseItem, ExpenseItem.expense_id == Expense.id)
+        .outerjoin(catalog, catalog.c.id == ExpenseItem.category_id)
+        .where(Expense.user_id == user_id, Expense.date < end)
+    )
+    ago_values, cat, amount, recent_ids = (await db.execute(stmt)).one()
+
+    return ExpenseHistory(
+        today=today,
+        ago=np.asarray(ago_values or [], dtype=np.int32),
+        cat=np.asarray(cat or [], dtype=np.int32),
+        amount=np.asarray(amount or [], dtype=np.float64),
+        categories=[None, *category_ids],
+        recent_ids=list(recent_ids or []),
+        lookback=lookback,
+    )
+
+
+# ============================================================================
+#  CÁLCULO (vectorizado: ningún bucle de Python recorre items ni días)
+# ============================================================================
+
+def _window_sums(prefix: np.ndarray, end_idx: np.ndarray, window: int) -> np.ndarray:
+    """Suma de las filas (end_idx - window, end_idx] usando sumas prefijas (prefix[0] = 0)."""
+    start_idx = np.maximum(end_idx + 1 - window, 0)
+    return prefix[end_idx + 1] - prefix[start_idx]
+
+
+def _year_ago(d: date) -> date:
+    try:
+        return d.replace(year=d.year - 1)
+    except ValueError:  # 29 de febrero
+        return d.replace(year=d.year - 1, day=28)
+
+
+def compute_insights(history: ExpenseHistory) -> InsightsResult:
+    today = history.today
+    n_cats = len(history.categories)
+    n_days = max(int(history.ago.max(initial=0)) + 1, _MIN_HISTORY_DAYS)
+
+    # Matriz día x categoría (fila n_days-1 = hoy). add.at acumula varios items del mismo día.
+    day_idx = (n_days - 1) - history.ago
+    daily = np.zeros((n_days, n_cats), dtype=np.float64)
+    np.add.at(daily, (day_idx, history.cat), history.amount)
+
+    # Sumas prefijas: cualquier ventana de días es una resta
+    prefix = np.zeros((n_days + 1, n_cats), dtype=np.float64)
+    np.cumsum(daily, axis=0, out=prefix[1:])
+    total_prefix = prefix.sum(axis=1)
+
+    today_idx = n_days - 1
+    month_start = today.replace(day=1)
+    month_start_idx = today_idx - (today - month_start).days
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    days_in_month = (next_month - month_start).days
+    days_left = days_in_month - today.day
+
+    # --- Tendencia: total diario y medias móviles de los últimos TREND_DAYS ---
+    trend_idx = np.arange(today_idx - TREND_DAYS + 1, today_idx + 1)
+    trend_total = total_prefix[trend_idx + 1] - total_prefix[trend_idx]
+    trend_ma7 = _window_sums(total_prefix, trend_idx, SHORT_WINDOW) / SHORT_WINDOW
+    trend_ma30 = _window_sums(total_prefix, trend_idx, LONG_WINDOW) / LONG_WINDOW
+    trend_days = np.datetime64(today, "D") - (today_idx - trend_idx).astype("timedelta64[D]")
+
+    # --- Por categoría (vectores de n_cats) ---
+    end = np.array([today_idx])
+    avg7 = _window_sums(prefix, end, SHORT_WINDOW)[0] / SHORT_WINDOW
+    avg30 = _window_sums(prefix, end, LONG_WINDOW)[0] / LONG_WINDOW
+    mtd = prefix[today_idx + 1] - prefix[month_start_idx]
+    # Proyección a fin de mes: lo gastado + ritmo de los últimos 30 días x días restantes
+    projected = mtd + avg30 * days_left
+
+    # Mismo periodo (1..día de hoy) del mismo mes del año pasado
+    ly_end_idx = today_idx - (today - _year_ago(today)).days
+    ly_start_idx = today_idx - (today - _year_ago(month_start)).days
+    last_year = prefix[ly_end_idx + 1] - prefix[ly_start_idx]
+
+    categories = [
+        CategoryInsight(cid, float(a7), float(a30), float(m), float(p), float(ly))
+        for cid, a7, a30, m, p, ly in zip(history.categories, avg7, avg30, mtd, projected, last_year)
+    ]
+    totals = CategoryInsight(
+        None, float(avg7.sum()), float(avg30.sum()), float(mtd.sum()), float(projected.sum()), float(last_year.sum())
+    )
+
+    return InsightsResult(
+        today=today,
+        days_in_month=days_in_month,
+        trend_days=trend_days,
+        trend_total=trend_total,
+        trend_ma7=trend_ma7,
+        trend_ma30=trend_ma30,
+        totals=totals,
+        categories=categories,
+        anomalies=_anomalies(history),
+    )
+
+
+def _anomalies(history: ExpenseHistory) -> List[Anomaly]:
+    """
+    Items recientes con importe inusualmente alto para su categoría:
+    z = (importe - media de la categoría) / desviación típica de la categoría.
+    Solo categorías con historial suficiente (INSIGHTS_ANOMALY_MIN_ITEMS).
+    """
+    n_cats = len(history.categories)
+    if n_cats == 0:
+        return []
+    x, cat = history.amount, history.cat
+
+    counts = np.bincount(cat, minlength=n_cats)
+    sums = np.bincount(cat, weights=x, minlength=n_cats)
+    sq_sums = np.bincount(cat, weights=x * x, minlength=n_cats)
+    safe_counts = np.maximum(counts, 1)
+    mean = sums / safe_counts
+    std = np.sqrt(np.maximum(sq_sums / safe_counts - mean * mean, 0.0))
+
+    recent = np.flatnonzero(history.ago <= history.lookback)
+    rc = cat[recent]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (x[recent] - mean[rc]) / std[rc]
+    flagged = (counts[rc] >= settings.INSIGHTS_ANOMALY_MIN_ITEMS) & (std[rc] > 0) & (z >= settings.INSIGHTS_ANOMALY_Z)
+
+    # Posición k dentro de 'recent' == posición k en recent_ids
+    positions = np.flatnonzero(flagged)
+    positions = positions[np.argsort(-z[positions], kind="stable")][: settings.INSIGHTS_MAX_ANOMALIES]
+    return [
+        Anomaly(
+            item_id=history.recent_ids[k],
+            category_id=history.categories[rc[k]],
+            amount=float(x[recent[k]]),
+            category_mean=float(mean[rc[k]]),
+            z_score=float(z[k]),
+            days_ago=int(history.ago[recent[k]]),
+        )
+        for k in positions
+    ]
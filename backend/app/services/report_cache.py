@@ -0,0 +1,97 @@
+#backend\app\services\report_cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.hooks import after_commit, after_rollback
+
+# Clave en session.info con los usuarios cuyos movimientos cambiaron en la request
+REPORT_CHANGES_KEY = "report_cache_changes"
+# Marca "cambió algo de varios usuarios" (p. ej. un lote de un trabajo de categorías)
+_ALL = "__all__"
+
+
+class ReportCache:
+    """
+    Resultados de reportes por usuario (series temporales, etc.), en memoria del worker.
+
+    Mismo esquema de invalidación que el catálogo de categorías:
+    - Cada usuario tiene un número de versión; las escrituras de gastos/ingresos lo marcan
+      en la sesión (mark_changed) y sube SOLO tras el commit (deps.get_db -> apply_changes).
+    - Una entrada se guarda con la versión leída ANTES de calcularla: si una escritura
+      confirmó mientras tanto, la entrada nace vieja y se descarta en la siguiente lectura.
+    - El TTL acota lo desactualizado que puede estar otro worker/proceso.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._global_version = 0
+        self._user_versions: Dict[UUID, int] = {}
+        self._entries: "OrderedDict[Tuple[UUID, Hashable], Tuple[Tuple[int, int], float, Any]]" = OrderedDict()
+
+    def version(self, user_id: UUID) -> Tuple[int, int]:
+        return self._global_version, self._user_versions.get(user_id, 0)
+
+    def get(self, user_id: UUID, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            return None
+        version, stored_at, value = entry
+        if version != self.version(user_id) or time.monotonic() - stored_at >= self.ttl:
+            del self._entries[(user_id, key)]
+            return None
+        self._entries.move_to_end((user_id, key))
+        return value
+
+    def put(self, db: AsyncSession, user_id: UUID, key: Hashable, value: Any, version: Tuple[int, int]) -> None:
+        """Guarda 'value' calculado con la versión 'version' (tomada antes de consultar)."""
+        # Si la propia sesión trae escrituras sin confirmar, lo leído no es lo confirmado
+        if db.info.get(REPORT_CHANGES_KEY):
+            return
+        self._entries[(user_id, key)] = (version, time.monotonic(), value)
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids=None) -> None:
+        """Sube versiones: de los usuarios dados o, sin argumentos, de todos."""
+        if user_ids is None:
+            self._global_version += 1
+            self._entries.clear()
+            return
+        for uid in user_ids:
+            self._user_versions[uid] = self._user_versions.get(uid, 0) + 1
+
+
+def mark_changed(db: AsyncSession, user_id: Optional[UUID] = None) -> None:
+    """
+    Anota en la sesión que cambiaron movimientos del usuario (None: de varios usuarios).
+    La invalidación se aplica tras el commit de la request (ver apply_changes).
+    """
+    db.info.setdefault(REPORT_CHANGES_KEY, set()).add(user_id if user_id is not None else _ALL)
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso: invalida los reportes de lo que la request modificó."""
+    changes = db.info.pop(REPORT_CHANGES_KEY, None)
+    if not changes:
+        return
+    if _ALL in changes:
+        report_cache.invalidate()
+    else:
+        report_cache.invalidate(changes)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback: los cambios nunca existieron."""
+    db.info.pop(REPORT_CHANGES_KEY, None)
+
+
+report_cache = ReportCache(settings.REPORT_CACHE_TTL, settings.REPORT_CACHE_MAX_ENTRIES)
@@ -0,0 +1,151 @@
+#backend\app\services\sessions.py
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core.config import settings
+from app.models.user import User, RefreshToken, RevokedToken
+from app.services.token_revocation import mark_revoked
+
+
+@dataclass
+class IssuedTokens:
+    access_token: str
+    refresh_token: str
+    expires_in: int  # segundos de vida del access token
+
+
+def _refresh_lifetime(remember_me: bool) -> timedelta:
+    days = settings.REFRESH_TOKEN_EXPIRE_DAYS_LONG if remember_me else settings.REFRESH_TOKEN_EXPIRE_DAYS
+    return timedelta(days=days)
+
+
+async def _issue(db: AsyncSession, user_id: uuid.UUID, family_id: uuid.UUID, remember_me: bool) -> tuple:
+    now = datetime.utcnow()
+    access_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    jti = uuid.uuid4().hex
+    access_token = security.create_access_token(
+        subject=str(user_id), expires_delta=access_delta, jti=jti, session_id=str(family_id)
+    )
+    raw_refresh = security.new_refresh_token()
+    row = RefreshToken(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=security.hash_refresh_token(raw_refresh),
+        access_jti=jti,
+        access_expires_at=now + access_delta,
+        remember_me=remember_me,
+        created_at=now,
+        expires_at=now + _refresh_lifetime(remember_me),
+    )
+    db.add(row)
+    tokens = IssuedTokens(access_token, raw_refresh, int(access_delta.total_seconds()))
+    return tokens, row
+
+
+async def start_session(db: AsyncSession, user: User, remember_me: bool = False) -> IssuedTokens:
+    """Login: nueva familia de refresh tokens + access token de vida corta."""
+    tokens, _ = await _issue(db, user.id, uuid.uuid4(), remember_me)
+    return tokens
+
+
+async def _revoke_access(db: AsyncSession, user_id: uuid.UUID, jti: str, expires_at: datetime) -> None:
+    """Anota el jti (si el token aún no expiró) en BD; a la lista en memoria pasa tras el commit."""
+    if expires_at <= datetime.utcnow():
+        return
+    await db.merge(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=datetime.utcnow()))
+    mark_revoked(db, jti, expires_at)
+
+
+async def revoke_family(db: AsyncSession, family_id: uuid.UUID) -> int:
+    """Cierra una sesión: revoca todos sus refresh tokens y el último access token emitido."""
+    now = datetime.utcnow()
+    rows = (await db.execute(
+        select(RefreshToken).where(RefreshToken.family_id == family_id)
+    )).scalars().all()
+    for row in rows:
+        await _revoke_access(db, row.user_id, row.access_jti, row.access_expires_at)
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    return len(rows)
+
+
+async def revoke_user_sessions(db: AsyncSession, user_id: uuid.UUID) -> int:
+    """Cerrar sesión en todos los dispositivos."""
+    families = (await db.execute(
+        select(RefreshToken.family_id)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .distinct()
+    )).scalars().all()
+    for family_id in families:
+        await revoke_family(db, family_id)
+    return len(families)
+
+
+class RefreshError(Exception):
+    """Refresh token inválido. 'reused' indica reuso de un token ya rotado (posible robo)."""
+
+    def __init__(self, detail: str, reused: bool = False, user_id: Optional[uuid.UUID] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.reused = reused
+        self.user_id = user_id
+
+
+async def _rotated_recently(db: AsyncSession, row: RefreshToken, now: datetime) -> bool:
+    """
+    ¿Token rotado hace menos de REFRESH_TOKEN_REUSE_GRACE_SECONDS y con la sesión aún viva?
+    Es el caso de dos pestañas que renuevan a la vez con el mismo token, no un robo.
+    Un token revocado por logout no tiene replaced_by; la familia sigue viva si algún token no fue revocado.
+    """
+    grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+    if row.replaced_by is None or now - row.revoked_at > grace:
+        return False
+    alive = exists().where(RefreshToken.family_id == row.family_id, RefreshToken.revoked_at.is_(None))
+    return bool((await db.execute(select(alive))).scalar())
+
+
+async def rotate_session(db: AsyncSession, raw_refresh: str) -> IssuedTokens:
+    """
+    Canjea un refresh token por un par nuevo (rotación).
+    - El usado queda revocado y enlazado a su reemplazo.
+    - Si llega uno ya revocado, se revoca toda la familia (el token se filtró), salvo que
+      se haya rotado hace un instante (ver _rotated_recently): entonces se emite otro par
+      de la misma familia y el reemplazo ya emitido sigue válido.
+    :raises RefreshError:
+    """
+    now = datetime.utcnow()
+    stmt = (
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == security.hash_refresh_token(raw_refresh))
+        .with_for_update()
+    )
+    row = (await db.execute(stmt)).scalars().first()
+    if row is None:
+        raise RefreshError("Refresh token inválido")
+
+    if row.revoked_at is not None and not await _rotated_recently(db, row, now):
+        await revoke_family(db, row.family_id)
+        raise RefreshError("Refresh token reutilizado: sesión revocada", reused=True, user_id=row.user_id)
+
+    if row.expires_at <= now:
+        raise RefreshError("Refresh token expirado")
+
+    user = await db.get(User, row.user_id)
+    if user is None or not user.is_active:
+        raise RefreshError("Usuario inactivo")
+
+    tokens, new_row = await _issue(db, row.user_id, row.family_id, row.remember_me)
+    if row.revoked_at is None:
+        row.revoked_at = now
+        row.replaced_by = new_row.id
+    return tokens
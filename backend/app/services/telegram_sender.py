@@ -0,0 +1,157 @@
+#backend\app\services\telegram_sender.py
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+
+class TokenBucket:
+    """
+    Token bucket simple para asyncio.
+    'rate' tokens por segundo con ráfagas de hasta 'capacity'.
+    Por defecto sin ráfagas: los envíos salen espaciados de forma uniforme.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Comprobar y descontar sin 'await' en medio: atómico dentro del event loop
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramSender:
+    """
+    Envía mensajes al Bot API respetando los límites de Telegram:
+    - Global: TELEGRAM_GLOBAL_RATE mensajes/segundo (token bucket).
+    - Por chat: como mínimo TELEGRAM_PER_CHAT_INTERVAL segundos entre mensajes.
+    - 429: se pausa TODO el envío durante 'retry_after', se baja el ritmo
+      global un 20% y se reintenta.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        api_url: Optional[str] = None,
+        global_rate: Optional[float] = None,
+        per_chat_interval: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_retries: int = 5,
+    ):
+        self.token = token or settings.TELEGRAM_TOKEN
+        if not self.token:
+            raise ValueError("TELEGRAM_TOKEN no configurado")
+        # TELEGRAM_API_URL vacío en el .env compartido = API oficial
+        self.api_url = (api_url or settings.TELEGRAM_API_URL or "https://api.telegram.org").rstrip("/")
+        self.bucket = TokenBucket(global_rate or settings.TELEGRAM_GLOBAL_RATE)
+        self.per_chat_interval = (
+            per_chat_interval if per_chat_interval is not None else settings.TELEGRAM_PER_CHAT_INTERVAL
+        )
+        self.concurrency = concurrency or settings.TELEGRAM_SEND_CONCURRENCY
+        self.max_retries = max_retries
+
+        self.stats: Counter = Counter()
+        self._chat_next: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=f"{self.api_url}/bot{self.token}",
+            limits=limits,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def _wait_turn(self, chat_id: int):
+        # 1. Intervalo mínimo por chat (se reserva el hueco antes de dormir)
+        now = time.monotonic()
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+        # 2. Pausa global tras un 429 + límite global.
+        #    Si llega un 429 mientras esperábamos token, volvemos a esperar la pausa.
+        while True:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.bucket.acquire()
+            if time.monotonic() >= self._paused_until:
+                return
+
+    async def send_message(self, chat_id: int, text: str) -> bool:
+        """Envía un mensaje con reintentos. Devuelve True si Telegram lo aceptó."""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_turn(chat_id)
+            try:
+                resp = await self._client.post(
+                    "/sendMessage",
+                    json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
+                )
+            except httpx.HTTPError:
+                self.stats["network_error"] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            if resp.status_code == 200:
+                self.stats["sent"] += 1
+                return True
+
+            if resp.status_code == 429:
+                # Telegram indica cuánto esperar; pausamos a todos los envíos
+                try:
+                    retry_after = resp.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                self.stats["rate_limited"] += 1
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    # Primer 429 de la racha: los envíos en vuelo no vuelven a bajar el ritmo
+                    self.bucket.rate = max(1.0, self.bucket.rate * 0.8)
+                self._paused_until = max(self._paused_until, now + retry_after)
+                continue
+
+            if resp.status_code >= 500:
+                self.stats["server_error"] += 1
+                await asyncio.sleep(min(2 ** attempt, 30))
+                continue
+
+            # 400/403: chat inexistente o bot bloqueado -> no tiene sentido reintentar
+            self.stats["rejected"] += 1
+            return False
+
+        self.stats["failed"] += 1
+        return False
+
+    async def send_many(self, messages: Iterable[Tuple[int, str]]):
+        """Envía un lote de (chat_id, texto) con concurrencia acotada."""
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _send(chat_id: int, text: str):
+            async with sem:
+                await self.send_message(chat_id, text)
+
+        await asyncio.gather(*(_send(chat_id, text) for chat_id, text in messages))
+        # El intervalo por chat solo importa mientras el lote está en vuelo
+        now = time.monotonic()
+        self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
@@ -0,0 +1,103 @@
+#backend\app\services\token_revocation.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.hooks import after_commit, after_rollback
+from app.models.user import RevokedToken, RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Refresh tokens vencidos se conservan un tiempo (detección de reuso / auditoría) y luego se borran
+_REFRESH_RETENTION = timedelta(days=7)
+# Clave en session.info con los jti revocados en la request (pasan a la lista tras el commit)
+REVOCATION_PENDING_KEY = "revoked_jtis_pending"
+
+
+class RevocationList:
+    """
+    Copia en memoria de los jti revocados que aún no expiraron.
+
+    - get_current_user consulta solo este dict: revocar no añade una query por request.
+    - Las revocaciones hechas en este proceso se anotan tras el commit (mark_revoked -> apply_changes).
+    - Las de otros procesos llegan con sync() cada TOKEN_REVOCATION_SYNC_SECONDS
+      (lectura incremental por revoked_at, con solape para no perder filas confirmadas tarde).
+    - Solo hay jti de access tokens de vida corta, así que el conjunto se mantiene pequeño.
+    """
+
+    def __init__(self):
+        self._jtis: Dict[str, datetime] = {}
+        self._watermark: Optional[datetime] = None
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        self._jtis[jti] = expires_at
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._jtis
+
+    def __len__(self) -> int:
+        return len(self._jtis)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Trae las revocaciones nuevas y descarta las ya expiradas. Devuelve cuántas leyó."""
+        now = datetime.utcnow()
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).where(RevokedToken.expires_at > now)
+        if self._watermark is not None:
+            overlap = timedelta(seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS * 2)
+            stmt = stmt.where(RevokedToken.revoked_at > self._watermark - overlap)
+
+        rows = (await db.execute(stmt)).all()
+        for jti, expires_at, revoked_at in rows:
+            self._jtis[jti] = expires_at
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        if self._watermark is None:
+            self._watermark = now
+
+        for jti in [j for j, exp in self._jtis.items() if exp <= now]:
+            del self._jtis[jti]
+        return len(rows)
+
+    async def run_sync_loop(self) -> None:
+        """Bucle de fondo del proceso: sincroniza y limpia filas vencidas."""
+        while True:
+            await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.sync(db)
+                    now = datetime.utcnow()
+                    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+                    await db.execute(delete(RefreshToken).where(RefreshToken.expires_at < now - _REFRESH_RETENTION))
+                    await db.commit()
+            except Exception as e:
+                logger.warning("Sincronización de tokens revocados falló: %s", e, extra={"event": "auth.revocation_sync_error"})
+
+
+def mark_revoked(db: AsyncSession, jti: str, expires_at: datetime) -> None:
+    """
+    Anota en la sesión un jti revocado. Entra en la lista del proceso solo tras el commit:
+    si la request hace rollback, la revocación nunca existió (ni en BD ni aquí).
+    """
+    db.info.setdefault(REVOCATION_PENDING_KEY, []).append((jti, expires_at))
+
+
+@after_commit
+def apply_changes(db: AsyncSession) -> None:
+    """Llamar después de un commit exitoso."""
+    for jti, expires_at in db.info.pop(REVOCATION_PENDING_KEY, None) or []:
+        revocation_list.add(jti, expires_at)
+
+
+@after_rollback
+def discard_changes(db: AsyncSession) -> None:
+    """Llamar tras un rollback."""
+    db.info.pop(REVOCATION_PENDING_KEY, None)
+
+
+revocation_list = RevocationList()
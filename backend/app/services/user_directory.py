@@ -0,0 +1,39 @@
+#backend\app\services\user_directory.py
+import asyncio
+import logging
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Identificador fijo del advisory lock de refresco (un solo refresco a la vez entre workers)
+_REFRESH_LOCK_ID = 0x75736572646972  # "userdir"
+
+
+async def refresh(db: AsyncSession) -> bool:
+    """
+    Recalcula la vista user_directory sin bloquear sus lecturas (CONCURRENTLY).
+    Si otro worker ya la está refrescando no hace nada y devuelve False.
+    El llamador confirma la transacción.
+    """
+    locked = (await db.execute(select(func.pg_try_advisory_xact_lock(_REFRESH_LOCK_ID)))).scalar()
+    if not locked:
+        return False
+    await db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY user_directory"))
+    return True
+
+
+async def run_refresh_loop() -> None:
+    """Bucle de fondo del proceso: refresca el directorio cada USER_DIRECTORY_REFRESH_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.USER_DIRECTORY_REFRESH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh(db)
+                await db.commit()
+        except Exception as e:
+            logger.warning("Refresco del directorio de usuarios falló: %s", e, extra={"event": "user_directory.refresh_error"})
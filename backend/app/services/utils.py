@@ -1,36 +1,61 @@
 # backend/app/services/utils.py
-from uuid import UUID
+from typing import Optional, Tuple, List
+from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from fastapi import HTTPException
+from app.core.config import settings
 from app.models import Category  
+from app.services.category_catalog import category_catalog, find_global_by_name, mark_changed
 
-async def get_or_create_category_by_name(db: AsyncSession, name: str = "Otros") -> UUID:
+# Nombre de la categoría global por defecto
+GLOBAL_OTHERS_NAME = "Otros"
+
+
+async def get_or_create_category(db: AsyncSession, name: str, user_id: Optional[UUID] = None) -> UUID:
     """
-    Busca una categoría por su nombre (exacto).
-    Si no existe, la crea y devuelve su ID.
-    
+    Obtiene o crea una categoría (global si user_id es None, privada si no) sin carreras.
+
+    Un solo INSERT ... ON CONFLICT DO NOTHING RETURNING contra el índice único parcial
+    correspondiente (ix_categories_name_global_unique / ix_categories_name_user_unique).
+    Si ya existía, el INSERT no devuelve fila y se hace un SELECT de respaldo.
+
     :param db: Sesión asíncrona de base de datos
-    :param name: Nombre de la categoría a buscar/crear
+    :param name: Nombre exacto de la categoría
+    :param user_id: Dueño de la categoría privada (None = global)
     :return: UUID de la categoría
     """
-    # 1. Buscar existente
-    query = select(Category).where(Category.name == name)
-    result = await db.execute(query)
-    category = result.scalars().first()
+    stmt = pg_insert(Category).values(id=uuid4(), name=name, user_id=user_id, is_active=True)
+    if user_id is None:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["name"], index_where=Category.user_id.is_(None))
+        scope = Category.user_id.is_(None)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["name", "user_id"], index_where=Category.user_id.is_not(None))
+        scope = Category.user_id == user_id
 
-    if category:
-        return category.id
+    new_id = (await db.execute(stmt.returning(Category.id))).scalar_one_or_none()
+    if new_id:
+        return new_id
 
-    # 2. Si no existe, crearla
-    new_category = Category(name=name)
-    db.add(new_category)
-    
-    # Hacemos flush para que SQLAlchemy genere el ID y lo asigne al objeto
-    # sin necesidad de cerrar la transacción principal con commit()
-    await db.flush() 
-    
-    return new_category.id
+    # Ya existía (o la creó otra transacción concurrente que ya confirmó)
+    result = await db.execute(select(Category.id).where(Category.name == name, scope))
+    return result.scalar_one()
+
+
+async def get_global_others_id(db: AsyncSession) -> UUID:
+    """
+    ID de la categoría global "Otros", resuelto desde el catálogo en memoria.
+    Si no existe se crea y se marca el catálogo para invalidarlo tras el commit.
+    """
+    entry = find_global_by_name(await category_catalog.global_entries(db), GLOBAL_OTHERS_NAME)
+    if entry:
+        return entry.id
+
+    new_id = await get_or_create_category(db, GLOBAL_OTHERS_NAME)
+    mark_changed(db)
+    return new_id
 
 
 async def validate_categories_availability(db: AsyncSession, items: list, user_id: UUID) -> None:
@@ -40,6 +65,7 @@ async def validate_categories_availability(db: AsyncSession, items: list, user_i
     
     Esta función es genérica y puede usarse para items de Gastos o Ingresos,
     siempre que los objetos 'item' tengan un atributo 'category_id'.
+    La comprobación se hace contra el catálogo cacheado del usuario (category_catalog).
     
     :param db: Sesión de base de datos
     :param items: Lista de objetos (Pydantic models) que contienen 'category_id'
@@ -55,13 +81,7 @@ async def validate_categories_availability(db: AsyncSession, items: list, user_i
     if not category_ids:  # Todos son null o lista vacía → todo OK
         return
 
-    stmt = select(Category).where(
-        Category.id.in_(category_ids),
-        or_(Category.user_id == user_id, Category.user_id.is_(None))
-    )
-    result = await db.execute(stmt)
-    found_categories = result.scalars().all()
-    found_map = {cat.id: cat for cat in found_categories}
+    found_map = await category_catalog.lookup(db, user_id, category_ids)
 
     for cat_id in category_ids:
         cat = found_map.get(cat_id)
@@ -79,3 +99,62 @@ async def validate_categories_availability(db: AsyncSession, items: list, user_i
                 status_code=400,
                 detail=f"La categoría '{cat.name}' está desactivada y no puede usarse en nuevos registros."
             )
+
+
+def parse_list_projection(
+    fields: Optional[str],
+    include: Optional[str],
+    allowed_fields: List[str]
+) -> Tuple[List[str], bool]:
+    """
+    Interpreta los parámetros ?fields= e ?include= de los listados.
+
+    - fields: lista separada por comas de columnas de resumen (el 'id' siempre va).
+      Si no viene, se devuelven todas las columnas permitidas.
+    - include: actualmente solo soporta 'items' (carga el detalle completo).
+
+    :return: (columnas_seleccionadas, incluir_items)
+    :raises HTTPException: Si se pide un campo o include desconocido, o fields junto con include=items.
+    """
+    includes = {part.strip() for part in (include or "").split(",") if part.strip()}
+    unknown_includes = includes - {"items"}
+    if unknown_includes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Include no soportado: {', '.join(sorted(unknown_includes))}"
+        )
+
+    # Con include=items se devuelve el gasto/ingreso completo: una proyección no aplicaría
+    if fields and "items" in includes:
+        raise HTTPException(status_code=400, detail="'fields' no se puede combinar con include=items")
+
+    if not fields:
+        return list(allowed_fields), "items" in includes
+
+    selected = []
+    for part in fields.split(","):
+        name = part.strip()
+        if not name or name == "id" or name in selected:
+            continue
+        if name not in allowed_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campo '{name}' no válido. Permitidos: {', '.join(allowed_fields)}"
+            )
+        selected.append(name)
+
+    return selected, "items" in includes
+
+
+def resolve_timezone(tz: Optional[str]) -> str:
+    """
+    Valida el parámetro ?tz= de los reportes (nombre IANA, ej. America/Mexico_City).
+    Sin valor se usa REPORT_DEFAULT_TIMEZONE.
+    :raises HTTPException: Si la zona no existe.
+    """
+    name = tz or settings.REPORT_DEFAULT_TIMEZONE
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Zona horaria desconocida: {name}")
+    return name
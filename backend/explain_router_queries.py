@@ -0,0 +1,307 @@
+#backend\explain_router_queries.py
+"""
+Regresión de planes de consulta de los routers (requiere PostgreSQL).
+
+1. Crea un usuario de prueba (superusuario) con un historial normal y otro usuario
+   de relleno que hace grandes las tablas de gastos, ingresos y bitácora
+   (generate_series); luego ANALYZE.
+2. Recorre los endpoints (lecturas y escrituras) con la app real en proceso
+   y captura cada SELECT/UPDATE/DELETE que emiten.
+3. Hace EXPLAIN (sin ejecutar) de cada sentencia con sus mismos parámetros y
+   falla si algún plan recorre entera (Seq Scan) una tabla grande
+   (>= --min-rows filas estimadas).
+Al final se borran los usuarios y todo lo sembrado.
+
+Uso (desde backend/):
+    python explain_router_queries.py --show-plans
+
+La misma comprobación corre en pytest (tests/test_query_plans.py) si DATABASE_URL
+apunta a PostgreSQL; este script es la versión con volúmenes de producción.
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Aseguramos que el path incluya el directorio actual
+sys.path.append(os.getcwd())
+
+import httpx
+from sqlalchemy import event, text
+
+from app.core.security import create_access_token, get_password_hash
+from app.db.session import engine
+from app.main import app
+
+# Endpoints que no se recorren: lanzan trabajos de fondo sobre categorías globales
+# (fusiones / borrados masivos) o borran usuarios reales
+SKIPPED = [
+    "POST /categories/admin/bulk-delete",
+    "POST /categories/admin/create-global-merge",
+    "DELETE /categories/{category_id}",
+    "DELETE /users/{user_id}",
+]
+
+# (tabla, fragmento de la sentencia) con Seq Scan aceptado a propósito
+ALLOWED_SEQ_SCANS: List[Tuple[str, str]] = [
+    # /categories/admin/all cuenta los items de TODOS los usuarios por categoría: es un
+    # agregado de la tabla entera por definición
+    ("expense_items", "SELECT expense_items.category_id AS category_id, count(expense_items.id) AS count FROM expense_items GROUP BY"),
+    ("ingreso_items", "SELECT ingreso_items.category_id AS category_id, count(ingreso_items.id) AS count FROM ingreso_items GROUP BY"),
+]
+
+_capture = {"label": None, "on": False}
+# sentencia -> (etiqueta del endpoint, parámetros); una entrada por sentencia distinta
+_statements: "OrderedDict[str, Tuple[str, tuple]]" = OrderedDict()
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _record(conn, cursor, statement, parameters, context, executemany):
+    if not _capture["on"] or executemany:
+        return
+    head = statement.lstrip().split(None, 1)[0].upper()
+    if head in ("SELECT", "UPDATE", "DELETE", "WITH") and statement not in _statements:
+        _statements[statement] = (_capture["label"], tuple(parameters or ()))
+
+
+# ============================================================================
+#  SIEMBRA
+# ============================================================================
+
+async def _seed_history(conn, user_id: uuid.UUID, expenses: int, incomes: int, logs: int) -> None:
+    """Historial sintético repartido entre categorías propias del usuario y las globales."""
+    params = {"uid": user_id, "n_exp": expenses, "n_inc": incomes, "n_logs": logs}
+    await conn.execute(text(
+        "INSERT INTO categories (id, name, user_id, is_active) "
+        "SELECT gen_random_uuid(), 'Explain ' || g, :uid, true FROM generate_series(1, 8) g"
+    ), params)
+    await conn.execute(text(
+        "INSERT INTO expenses (id, user_id, date, total, notes) "
+        "SELECT gen_random_uuid(), :uid, now() - (g * interval '17 minutes'), (g % 500) + 1, 'seed' "
+        "FROM generate_series(1, :n_exp) g"
+    ), params)
+    await conn.execute(text(
+        "WITH cats AS (SELECT array_agg(id ORDER BY name) AS ids FROM categories WHERE user_id IS NULL OR user_id = :uid) "
+        "INSERT INTO expense_items (id, expense_id, category_id, name, amount, quantity) "
+        "SELECT gen_random_uuid(), e.id, cats.ids[1 + (e.total::int % cardinality(cats.ids))], "
+        "'item ' || (e.total::int % 50), e.total, 1 "
+        "FROM expenses e, cats WHERE e.user_id = :uid"
+    ), params)
+    await conn.execute(text(
+        "INSERT INTO ingresos (id, user_id, descripcion, fecha, fuente, monto_total, created_at, updated_at) "
+        "SELECT gen_random_uuid(), :uid, 'seed', now() - (g * interval '3 hours'), 'seed', g % 900 + 100, now(), now() "
+        "FROM generate_series(1, :n_inc) g"
+    ), params)
+    await conn.execute(text(
+        "WITH cats AS (SELECT array_agg(id ORDER BY name) AS ids FROM categories WHERE user_id IS NULL OR user_id = :uid) "
+        "INSERT INTO ingreso_items (id, ingreso_id, category_id, descripcion, monto) "
+        "SELECT gen_random_uuid(), i.id, cats.ids[1 + (i.monto_total::int % cardinality(cats.ids))], 'sueldo', i.monto_total "
+        "FROM ingresos i, cats WHERE i.user_id = :uid"
+    ), params)
+    await conn.execute(text(
+        "INSERT INTO audit_logs (id, user_id, action, source, details, timestamp) "
+        "SELECT gen_random_uuid(), :uid, 'SEED', 'WEB', 'seed', now() - (g * interval '1 minute') "
+        "FROM generate_series(1, :n_logs) g"
+    ), params)
+
+
+async def seed(user_ids: List[uuid.UUID], volumes: List[Tuple[int, int, int]]) -> None:
+    """
+    Un usuario por volumen. El primero es el que recorre los endpoints (historial normal);
+    el resto solo hace grandes las tablas, como en producción: las consultas de un usuario
+    deben seguir siendo selectivas.
+    """
+    async with engine.begin() as conn:
+        for user_id, (expenses, incomes, logs) in zip(user_ids, volumes):
+            await conn.execute(text(
+                "INSERT INTO users (id, email, hashed_password, first_name, is_active, is_superuser, created_at) "
+                "VALUES (:uid, :email, :pwd, 'Explain', true, true, now())"
+            ), {"uid": user_id, "email": f"explain-{user_id.hex[:8]}@example.com", "pwd": get_password_hash(uuid.uuid4().hex)})
+            await _seed_history(conn, user_id, expenses, incomes, logs)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("expenses", "expense_items", "ingresos", "ingreso_items", "audit_logs"):
+            await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def cleanup(user_id: uuid.UUID) -> None:
+    async with engine.begin() as conn:
+        p = {"uid": user_id}
+        await conn.execute(text("DELETE FROM expense_items WHERE expense_id IN (SELECT id FROM expenses WHERE user_id = :uid)"), p)
+        await conn.execute(text("DELETE FROM expenses WHERE user_id = :uid"), p)
+        await conn.execute(text("DELETE FROM ingreso_items WHERE ingreso_id IN (SELECT id FROM ingresos WHERE user_id = :uid)"), p)
+        await conn.execute(text("DELETE FROM ingresos WHERE user_id = :uid"), p)
+        for table in ("audit_logs", "refresh_tokens", "idempotency_keys", "categories"):
+            await conn.execute(text(f"DELETE FROM {table} WHERE user_id = :uid"), p)
+        await conn.execute(text("DELETE FROM users WHERE id = :uid"), p)
+
+
+# ============================================================================
+#  RECORRIDO DE ENDPOINTS
+# ============================================================================
+
+async def exercise(user_id: uuid.UUID) -> List[str]:
+    """Llama a los endpoints; devuelve los que no respondieron 2xx."""
+    failures = []
+    headers = {"Authorization": f"Bearer {create_access_token(subject=str(user_id))}"}
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://explain/api/v1", headers=headers) as client:
+        async def call(method: str, route: str, path: Optional[str] = None, **kwargs):
+            _capture["label"] = f"{method} {route}"
+            response = await client.request(method, path or route, **kwargs)
+            if response.status_code >= 300:
+                failures.append(f"{method} {route} -> {response.status_code}")
+            return response
+
+        expense = {"notes": "explain", "items": [{"name": "café", "amount": 10, "quantity": 2}]}
+        income = {"descripcion": "explain", "fecha": "2026-01-01T00:00:00Z", "items": [{"descripcion": "extra", "monto": 50}]}
+
+        await call("GET", "/users/me")
+        await call("GET", "/users/me/logs")
+        await call("GET", "/users/logs/all")
+        await call("GET", "/users/logs/search", params={"action_prefix": "CREATE_", "user_id": str(user_id)})
+        await call("GET", "/users/")
+        await call("GET", "/users/directory", params={"search": "explain"})
+        await call("GET", "/users/{user_id}", f"/users/{user_id}")
+
+        created = (await call("POST", "/expenses/", json=expense, headers={"Idempotency-Key": uuid.uuid4().hex})).json()
+        await call("POST", "/expenses/", params={"on_duplicate": "skip"}, json={**expense, "date": created["date"]})
+        batch = (await call("POST", "/expenses/batch", json={"expenses": [expense, expense]})).json()
+        await call("GET", "/expenses/", params={"limit": 50})
+        await call("GET", "/expenses/", params={"limit": 20, "include": "items"})
+        await call("GET", "/expenses/{expense_id}", f"/expenses/{created['id']}")
+        await call("POST", "/expenses/batch-get", json={"ids": [e["id"] for e in batch]})
+        await call("PUT", "/expenses/{expense_id}", f"/expenses/{created['id']}", json=expense)
+
+        ingreso = (await call("POST", "/incomes/", json=income)).json()
+        await call("GET", "/incomes/")
+        await call("GET", "/incomes/{id}", f"/incomes/{ingreso['id']}")
+        await call("POST", "/incomes/batch-get", json={"ids": [ingreso["id"]]})
+        await call("PUT", "/incomes/{id}", f"/incomes/{ingreso['id']}", json=income)
+
+        category = (await call("POST", "/categories/", json={"name": f"Explain {uuid.uuid4().hex[:6]}"})).json()
+        await call("PUT", "/categories/{category_id}", f"/categories/{category['id']}", json={"name": f"Explain {uuid.uuid4().hex[:6]}"})
+        await call("GET", "/categories/")
+        await call("GET", "/categories/catalog")
+        await call("GET", "/categories/admin/all")
+        await call("GET", "/categories/suggest-for-item", params={"name": "café"})
+        seeded_cat = created["items"][0]["category_id"]
+        await call("GET", "/categories/{category_id}/expenses", f"/categories/{seeded_cat}/expenses")
+        await call("GET", "/categories/{category_id}/incomes", f"/categories/{seeded_cat}/incomes")
+
+        page = (await call("GET", "/transactions/", params={"limit": 50})).json()
+        await call("GET", "/transactions/", params={"limit": 50, "cursor": page.get("next_cursor")})
+        await call("GET", "/transactions/", params={"limit": 50, "category_id": seeded_cat})
+        await call("GET", "/reports/timeseries", params={"granularity": "day"})
+        await call("GET", "/reports/timeseries", params={"granularity": "month", "category_id": seeded_cat})
+        await call("GET", "/insights/")
+
+        await call("POST", "/expenses/batch-delete", json={"ids": [e["id"] for e in batch]})
+        await call("DELETE", "/expenses/{expense_id}", f"/expenses/{created['id']}")
+        await call("DELETE", "/incomes/{id}", f"/incomes/{ingreso['id']}")
+
+    return failures
+
+
+# ============================================================================
+#  EXPLAIN
+# ============================================================================
+
+def _seq_scans(plan: Dict) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def explain_all(min_rows: int, show_plans: bool) -> List[str]:
+    problems = []
+    async with engine.connect() as conn:
+        large = set((await conn.execute(text(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace "
+            "AND reltuples >= :n"
+        ), {"n": min_rows})).scalars().all())
+
+        for statement, (label, parameters) in _statements.items():
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar_one()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            flat = " ".join(statement.split())
+            bad = [
+                table for table in _seq_scans(plan[0]["Plan"])
+                if table in large and not any(t == table and f in flat for t, f in ALLOWED_SEQ_SCANS)
+            ]
+            if not bad:
+                continue
+            problem = f"{label}: Seq Scan en {', '.join(bad)}\n    {flat[:300]}"
+            if show_plans:
+                lines = (await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).scalars().all()
+                problem += "\n" + "\n".join(f"      {line}" for line in lines)
+            problems.append(problem)
+        await conn.rollback()
+    return problems
+
+
+async def check_plans(
+    user_volume: Tuple[int, int, int], bulk_volume: Tuple[int, int, int], min_rows: int, show_plans: bool = False
+) -> Tuple[List[str], List[str]]:
+    """
+    Siembra, recorre los endpoints y hace EXPLAIN de lo capturado; siempre limpia lo sembrado.
+    :return: (endpoints que no respondieron 2xx, planes con Seq Scan sobre una tabla grande)
+    """
+    user_id, bulk_id = uuid.uuid4(), uuid.uuid4()
+    _statements.clear()
+    await seed([user_id, bulk_id], [user_volume, bulk_volume])
+    try:
+        _capture["on"] = True
+        failures = await exercise(user_id)
+        _capture["on"] = False
+        problems = await explain_all(min_rows, show_plans)
+    finally:
+        _capture["on"] = False
+        for uid in (user_id, bulk_id):
+            await cleanup(uid)
+    return failures, problems
+
+
+async def main(user_volume: Tuple[int, int, int], bulk_volume: Tuple[int, int, int], min_rows: int, show_plans: bool) -> None:
+    print(f"Sembrando usuario de prueba {user_volume} y relleno {bulk_volume} (gastos, ingresos, bitácora)...")
+    try:
+        failures, problems = await check_plans(user_volume, bulk_volume, min_rows, show_plans)
+    finally:
+        await engine.dispose()
+
+    print(f"{len(_statements)} sentencias distintas analizadas. Sin recorrer: {', '.join(SKIPPED)}")
+    for failure in failures:
+        print(f"⚠️  {failure}")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Ningún plan recorre entera una tabla grande")
+    sys.exit(1 if problems or failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN de las consultas de los routers")
+    parser.add_argument("--user-expenses", type=int, default=2000)
+    parser.add_argument("--user-incomes", type=int, default=200)
+    parser.add_argument("--user-logs", type=int, default=500)
+    parser.add_argument("--expenses", type=int, default=1000000, help="Relleno (otro usuario)")
+    parser.add_argument("--incomes", type=int, default=200000, help="Relleno (otro usuario)")
+    parser.add_argument("--logs", type=int, default=200000, help="Relleno (otro usuario)")
+    parser.add_argument("--min-rows", type=int, default=10000)
+    parser.add_argument("--show-plans", action="store_true", help="Imprime el plan de cada fallo")
+    args = parser.parse_args()
+    asyncio.run(main(
+        (args.user_expenses, args.user_incomes, args.user_logs),
+        (args.expenses, args.incomes, args.logs),
+        args.min_rows,
+        args.show_plans,
+    ))
@@ -0,0 +1,108 @@
+#backend\send_digests.py
+"""
+Resúmenes de gastos por Telegram (diario / semanal).
+
+Uso (desde backend/):
+    # Envío único (ideal para cron: "5 0 * * *" diario, "10 0 * * 1" semanal)
+    python send_digests.py daily
+    python send_digests.py weekly
+
+    # Proceso residente: diario cada día a las 00:05 UTC y semanal los lunes
+    python send_digests.py loop
+
+    # Benchmark del sender contra el Bot API falso del bot (sin base de datos)
+    #   cd ../bot && python -m tools.fake_bot_api serve --port 8081 --rate-limit 30
+    python send_digests.py bench --recipients 100000 --api-url http://localhost:8081
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+# Aseguramos que el path incluya el directorio actual
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.services.telegram_sender import TelegramSender
+
+
+async def run(period: str):
+    # Importación tardía: el modo 'bench' no necesita base de datos
+    from app.db.session import AsyncSessionLocal
+    from app.services.digests import send_digests
+
+    start = time.perf_counter()
+    async with TelegramSender() as sender:
+        total = await send_digests(AsyncSessionLocal, sender, period, settings.DIGEST_BATCH_SIZE)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Resumen {period}: {total} destinatarios en {elapsed:.1f}s — {dict(sender.stats)}")
+
+
+def _seconds_until(hour: int, minute: int) -> float:
+    now = datetime.now(timezone.utc)
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def loop():
+    print("🕒 Programador de resúmenes iniciado (00:05 UTC)")
+    while True:
+        await asyncio.sleep(_seconds_until(0, 5))
+        periods = ["daily"]
+        if datetime.now(timezone.utc).weekday() == 0:
+            periods.append("weekly")
+        for period in periods:
+            try:
+                await run(period)
+            except Exception as e:
+                print(f"❌ Error enviando resumen {period}: {e}")
+
+
+async def bench(recipients: int, api_url: str, rate: float, per_chat_interval: float):
+    text = "📅 Resumen de ayer\n\n💸 Gastos: <b>$123.45</b> (3 registros)"
+    batch_size = settings.DIGEST_BATCH_SIZE
+
+    start = time.perf_counter()
+    async with TelegramSender(
+        token=settings.TELEGRAM_TOKEN or "123:bench",
+        api_url=api_url,
+        global_rate=rate,
+        per_chat_interval=per_chat_interval,
+    ) as sender:
+        for offset in range(0, recipients, batch_size):
+            chat_ids = range(offset + 1, min(offset + batch_size, recipients) + 1)
+            await sender.send_many((chat_id, text) for chat_id in chat_ids)
+    elapsed = time.perf_counter() - start
+
+    print(f"📨 {recipients} mensajes en {elapsed:.1f}s ({recipients / elapsed:.1f} msg/s, límite {rate}/s)")
+    print(f"   {dict(sender.stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resúmenes de gastos por Telegram")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("daily", help="Envía el resumen de ayer")
+    sub.add_parser("weekly", help="Envía el resumen de los últimos 7 días")
+    sub.add_parser("loop", help="Proceso residente que envía a diario / los lunes")
+
+    p_bench = sub.add_parser("bench", help="Mide el sender contra un Bot API falso")
+    p_bench.add_argument("--recipients", type=int, default=100_000)
+    p_bench.add_argument("--api-url", default="http://localhost:8081")
+    p_bench.add_argument("--rate", type=float, default=settings.TELEGRAM_GLOBAL_RATE)
+    p_bench.add_argument("--per-chat-interval", type=float, default=settings.TELEGRAM_PER_CHAT_INTERVAL)
+
+    args = parser.parse_args()
+    if args.command in ("daily", "weekly"):
+        asyncio.run(run(args.command))
+    elif args.command == "loop":
+        asyncio.run(loop())
+    else:
+        asyncio.run(bench(args.recipients, args.api_url, args.rate, args.per_chat_interval))
+
+
+if __name__ == "__main__":
+    main()
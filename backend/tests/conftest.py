@@ -0,0 +1,25 @@
+#backend\tests\conftest.py
+import os
+import sys
+
+from dotenv import dotenv_values
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings exige estas variables al importarse. Los tests unitarios no abren conexiones,
+# así que bastan valores de relleno; solo se ponen si no vienen del entorno ni del .env
+# (un os.environ de relleno taparía el .env real, que usa test_query_plans.py)
+_env_file = dotenv_values(os.path.join(BACKEND_DIR, "..", ".env"))
+for name, value in {
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "gastos",
+    "SECRET_KEY": "tests",
+    "ADMIN_EMAIL": "admin@example.com",
+    "ADMIN_PASSWORD": "admin",
+}.items():
+    if name not in os.environ and name not in _env_file:
+        os.environ[name] = value
+
+# 'app' (y los scripts de backend/) se importan como en uvicorn/alembic: desde backend/
+sys.path.insert(0, BACKEND_DIR)
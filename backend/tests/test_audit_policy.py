@@ -0,0 +1,37 @@
+#backend\tests\test_audit_policy.py
+from app.services.audit_policy import ALWAYS, AuditPolicy, AuditRule, parse_policy
+
+
+def test_parse_policy_modes():
+    rules = parse_policy("LOGIN_SILENT=coalesce:3600, ERROR_READ_*=coalesce:60,UPDATE_X=sample:0.1,Y=always")
+    assert rules == {
+        "LOGIN_SILENT": AuditRule("coalesce", window=3600),
+        "ERROR_READ_*": AuditRule("coalesce", window=60),
+        "UPDATE_X": AuditRule("sample", rate=0.1),
+        "Y": ALWAYS,
+    }
+
+
+def test_parse_policy_skips_malformed_entries():
+    raw = "A=sample:2,B=coalesce:0,C=coalesce:x,D=nope,=always,E,F=,G=sample:0.5"
+    assert parse_policy(raw) == {"G": AuditRule("sample", rate=0.5)}
+    assert parse_policy("") == {} and parse_policy(None) == {}
+
+
+def test_rule_for_exact_beats_prefix_and_longest_prefix_wins():
+    policy = AuditPolicy(parse_policy("ERROR_*=sample:0.5,ERROR_READ_*=coalesce:60,ERROR_READ_X=always"))
+    assert policy.rule_for("ERROR_READ_X") is ALWAYS
+    assert policy.rule_for("ERROR_READ_Y") == AuditRule("coalesce", window=60)
+    assert policy.rule_for("ERROR_WRITE") == AuditRule("sample", rate=0.5)
+    assert policy.rule_for("LOGIN") is ALWAYS
+    # Resolución memorizada: misma respuesta en la segunda llamada
+    assert policy.rule_for("ERROR_WRITE") == AuditRule("sample", rate=0.5)
+
+
+def test_sampled_out_only_for_sample_rules(monkeypatch):
+    policy = AuditPolicy({})
+    monkeypatch.setattr("app.services.audit_policy.random.random", lambda: 0.3)
+    assert policy.sampled_out(AuditRule("sample", rate=0.2))
+    assert not policy.sampled_out(AuditRule("sample", rate=0.5))
+    assert not policy.sampled_out(AuditRule("coalesce", window=60))
+    assert not policy.sampled_out(ALWAYS)
@@ -0,0 +1,68 @@
+#backend\tests\test_category_suggest.py
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from app.services import category_suggest
+from app.services.category_catalog import CatalogEntry
+from app.services.category_suggest import CategorySuggestIndex, _UserIndex, tokenize
+
+USER = uuid.UUID(int=1)
+FOOD, TRANSPORT, ARCHIVED, OTHERS = (uuid.UUID(int=i) for i in range(10, 14))
+
+
+def test_tokenize_normalizes_and_filters():
+    assert tokenize("Café con LECHE de la esquina") == ["cafe", "leche", "esquina"]
+    assert tokenize("Año 2024: piñata x2") == ["año", "piñata", "x2"]
+    assert tokenize("uber uber UBER") == ["uber"]
+    assert tokenize("") == [] and tokenize(None) == []
+
+
+@pytest.fixture
+def index(monkeypatch):
+    catalog = {
+        FOOD: CatalogEntry(FOOD, "Comida", USER, True),
+        TRANSPORT: CatalogEntry(TRANSPORT, "Transporte", None, True),
+        ARCHIVED: CatalogEntry(ARCHIVED, "Vieja", USER, False),
+    }
+
+    async def for_user(db, user_id, refresh=False):
+        return catalog, "etag"
+
+    monkeypatch.setattr(category_suggest.category_catalog, "for_user", for_user)
+    idx = CategorySuggestIndex(ttl=3600, max_users=10)
+    # Índice ya cargado: suggest no necesita BD
+    user_index = _UserIndex(loaded_at=time.monotonic(), others_id=OTHERS)
+    for text, category_id in [
+        ("café con leche", FOOD), ("café americano", FOOD), ("pan", FOOD),
+        ("uber al centro", TRANSPORT), ("taxi centro", TRANSPORT),
+        ("café viejo", ARCHIVED),
+        ("café suelto", OTHERS),  # "Otros" no enseña
+    ]:
+        user_index.learn("expense", text, category_id)
+    idx._users[USER] = user_index
+    return idx
+
+
+def _suggest(index, text, kind="expense", limit=3):
+    return asyncio.run(index.suggest(None, USER, kind, text, limit))
+
+
+def test_suggest_ranks_known_tokens(index):
+    suggestions = _suggest(index, "Café")
+    assert [s.category_id for s in suggestions] == [FOOD]  # ARCHIVED inactiva, OTHERS nunca aprendida
+    assert 0 < suggestions[0].score <= 1
+
+    assert _suggest(index, "uber")[0].category_id == TRANSPORT
+
+
+def test_suggest_unknown_text_or_kind_returns_nothing(index):
+    assert _suggest(index, "zapatos") == []
+    assert _suggest(index, "café", kind="income") == []
+
+
+def test_learn_updates_loaded_index(index):
+    index.learn(USER, [("expense", "zapatos deportivos", TRANSPORT)])
+    assert _suggest(index, "zapatos")[0].category_id == TRANSPORT
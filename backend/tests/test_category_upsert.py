@@ -0,0 +1,68 @@
+#backend\tests\test_category_upsert.py
+"""
+Get-or-create concurrente de categorías (ON CONFLICT): N creaciones del MISMO nombre,
+cada una en su propia sesión/transacción, convergen en un solo ID y una sola fila.
+Solo corre si DATABASE_URL apunta a PostgreSQL (ver test_query_plans.py).
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import SQLALCHEMY_DATABASE_URL
+from app.models import Category
+from app.services.utils import get_or_create_category
+
+requires_postgres = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="DATABASE_URL no apunta a PostgreSQL",
+)
+
+CREATES = 200
+CONNECTIONS = 50
+
+
+async def _converge(Session, name: str, user_id) -> tuple:
+    async def one():
+        async with Session() as db:
+            category_id = await get_or_create_category(db, name, user_id)
+            await db.commit()
+            return category_id
+
+    ids = await asyncio.gather(*(one() for _ in range(CREATES)))
+    async with Session() as db:
+        scope = Category.user_id.is_(None) if user_id is None else Category.user_id == user_id
+        rows = (await db.execute(
+            select(func.count()).select_from(Category).where(Category.name == name, scope)
+        )).scalar_one()
+    return len(set(ids)), rows
+
+
+@requires_postgres
+@pytest.mark.parametrize("private", [False, True], ids=["global", "privada"])
+def test_concurrent_creates_converge_on_one_row(private):
+    async def run():
+        engine = create_async_engine(SQLALCHEMY_DATABASE_URL, pool_size=CONNECTIONS, max_overflow=0, pool_timeout=120)
+        Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        name, user_id = f"Upsert-{uuid.uuid4().hex[:8]}", uuid.uuid4() if private else None
+        try:
+            if user_id:
+                async with engine.begin() as conn:
+                    await conn.execute(text(
+                        "INSERT INTO users (id, email, hashed_password, first_name, is_active, is_superuser, created_at) "
+                        "VALUES (:uid, :email, 'x', 'Upsert', true, false, now())"
+                    ), {"uid": user_id, "email": f"upsert-{user_id.hex[:8]}@example.com"})
+            return await _converge(Session, name, user_id)
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(delete(Category).where(Category.name == name))
+                if user_id:
+                    await conn.execute(text("DELETE FROM users WHERE id = :uid"), {"uid": user_id})
+            await engine.dispose()
+
+    distinct_ids, rows = asyncio.run(run())
+    assert (distinct_ids, rows) == (1, 1)
@@ -0,0 +1,63 @@
+#backend\tests\test_cursors.py
+import base64
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routers.transactions import _decode_cursor, _encode_cursor
+from app.api.routers.users import (
+    _decode_audit_cursor, _decode_directory_cursor, _encode_audit_cursor, _encode_directory_cursor,
+)
+
+ID = uuid.UUID(int=42)
+WHEN = datetime(2025, 3, 15, 10, 30, 5, 123456, tzinfo=timezone.utc)
+
+
+def _assert_invalid(decode, *args):
+    with pytest.raises(HTTPException) as exc:
+        decode(*args)
+    assert exc.value.status_code == 400
+
+
+def test_transaction_cursor_round_trip():
+    cursor = _encode_cursor(WHEN, "income", ID)
+    assert "=" not in cursor
+    assert _decode_cursor(cursor) == (WHEN, "income", ID)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "%%%",
+    base64.urlsafe_b64encode(b"2025-01-01|refund|" + str(ID).encode()).decode(),
+    base64.urlsafe_b64encode(b"ayer|expense|" + str(ID).encode()).decode(),
+    base64.urlsafe_b64encode(b"2025-01-01|expense").decode(),
+])
+def test_transaction_cursor_invalid(cursor):
+    _assert_invalid(_decode_cursor, cursor)
+
+
+def test_audit_cursor_round_trip():
+    naive = WHEN.replace(tzinfo=None)
+    assert _decode_audit_cursor(_encode_audit_cursor(naive, ID)) == (naive, ID)
+    _assert_invalid(_decode_audit_cursor, "bm9wZQ")
+
+
+@pytest.mark.parametrize("sort, value", [
+    ("email", "ana@example.com"),
+    ("created_at", datetime(2025, 1, 2, 3, 4, 5)),
+    ("last_activity", None),
+    ("expense_total", Decimal("1234.50")),
+])
+def test_directory_cursor_round_trip(sort, value):
+    cursor = _encode_directory_cursor(sort, "desc", value, ID)
+    assert _decode_directory_cursor(cursor, sort, "desc") == (value, ID)
+
+
+def test_directory_cursor_rejects_other_sort_or_order():
+    cursor = _encode_directory_cursor("email", "asc", "ana@example.com", ID)
+    _assert_invalid(_decode_directory_cursor, cursor, "created_at", "asc")
+    _assert_invalid(_decode_directory_cursor, cursor, "email", "desc")
+    _assert_invalid(_decode_directory_cursor, "no-es-un-cursor", "email", "asc")
@@ -0,0 +1,44 @@
+#backend\tests\test_expense_dedupe.py
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.schemas.gastos import ExpenseItemCreate
+from app.services.expense_dedupe import expense_fingerprint
+
+USER = uuid.UUID(int=1)
+# Inicio exacto de un intervalo: los tests desplazan dentro / fuera de él
+WHEN = datetime.fromtimestamp(
+    1_750_000_000 // settings.EXPENSE_FINGERPRINT_BUCKET_SECONDS * settings.EXPENSE_FINGERPRINT_BUCKET_SECONDS,
+    tz=timezone.utc,
+)
+
+
+def _items(*specs):
+    return [ExpenseItemCreate(name=name, amount=amount, quantity=quantity) for name, amount, quantity in specs]
+
+
+def test_fingerprint_ignores_item_order_case_and_spacing():
+    a = expense_fingerprint(USER, WHEN, _items(("Café", 20, 1), ("pan", 3.5, 2)))
+    b = expense_fingerprint(USER, WHEN, _items(("  PAN ", 3.5, 2), ("café", 20.0, 1)))
+    assert a == b
+
+
+def test_fingerprint_same_bucket_matches_next_bucket_differs():
+    bucket = settings.EXPENSE_FINGERPRINT_BUCKET_SECONDS
+    items = _items(("café", 20, 1))
+    base = expense_fingerprint(USER, WHEN, items)
+    assert expense_fingerprint(USER, WHEN + timedelta(seconds=bucket - 1), items) == base
+    assert expense_fingerprint(USER, WHEN + timedelta(seconds=bucket), items) != base
+
+
+def test_fingerprint_naive_datetime_is_utc():
+    items = _items(("café", 20, 1))
+    assert expense_fingerprint(USER, WHEN.replace(tzinfo=None), items) == expense_fingerprint(USER, WHEN, items)
+
+
+def test_fingerprint_depends_on_user_amount_and_quantity():
+    base = expense_fingerprint(USER, WHEN, _items(("café", 20, 1)))
+    assert expense_fingerprint(uuid.UUID(int=2), WHEN, _items(("café", 20, 1))) != base
+    assert expense_fingerprint(USER, WHEN, _items(("café", 20.01, 1))) != base
+    assert expense_fingerprint(USER, WHEN, _items(("café", 10, 2))) != base
@@ -0,0 +1,127 @@
+#backend\tests\test_insights.py
+"""
+compute_insights / _anomalies (vectorizados) contra una implementación de referencia
+con bucles de Python sobre un historial sintético.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.insights import (
+    ExpenseHistory, compute_insights, LONG_WINDOW, SHORT_WINDOW, TREND_DAYS,
+)
+
+
+def _synthetic_history(today: date, seed: int = 7, n_items: int = 4000, n_days: int = 600) -> ExpenseHistory:
+    rng = np.random.default_rng(seed)
+    categories = [None] + [uuid.UUID(int=i) for i in range(1, 6)]
+    ago = rng.integers(0, n_days, n_items).astype(np.int32)
+    cat = rng.integers(0, len(categories), n_items).astype(np.int32)
+    amount = np.round(rng.lognormal(3, 0.6, n_items), 2)
+    # Algunos importes muy altos recientes: deben salir como anomalías
+    outliers = np.flatnonzero(ago <= 10)[:6]
+    amount[outliers] *= 40
+
+    lookback = settings.INSIGHTS_ANOMALY_LOOKBACK_DAYS
+    recent_ids = [uuid.uuid4() for a in ago if a <= lookback]
+    return ExpenseHistory(
+        today=today, ago=ago, cat=cat, amount=amount,
+        categories=categories, recent_ids=recent_ids, lookback=lookback,
+    )
+
+
+def _year_ago(d: date) -> date:
+    return d.replace(year=d.year - 1) if (d.month, d.day) != (2, 29) else d.replace(year=d.year - 1, day=28)
+
+
+def _reference(history: ExpenseHistory):
+    today = history.today
+    daily = defaultdict(float)
+    for a, c, x in zip(history.ago.tolist(), history.cat.tolist(), history.amount.tolist()):
+        daily[(a, c)] += x
+
+    def window(c, first_ago, last_ago):
+        return sum(daily[(a, c)] for a in range(first_ago, last_ago + 1))
+
+    month_start = today.replace(day=1)
+    days_in_month = ((month_start + timedelta(days=32)).replace(day=1) - month_start).days
+    ly_first = (today - _year_ago(today)).days
+    ly_last = (today - _year_ago(month_start)).days
+
+    per_cat = []
+    for c in range(len(history.categories)):
+        avg7 = window(c, 0, SHORT_WINDOW - 1) / SHORT_WINDOW
+        avg30 = window(c, 0, LONG_WINDOW - 1) / LONG_WINDOW
+        mtd = window(c, 0, today.day - 1)
+        per_cat.append((avg7, avg30, mtd, mtd + avg30 * (days_in_month - today.day), window(c, ly_first, ly_last)))
+
+    all_cats = range(len(history.categories))
+    day_total = lambda a: sum(daily[(a, c)] for c in all_cats)
+    trend = [day_total(a) for a in range(TREND_DAYS - 1, -1, -1)]
+    ma7 = [sum(day_total(a + k) for k in range(SHORT_WINDOW)) / SHORT_WINDOW for a in range(TREND_DAYS - 1, -1, -1)]
+    ma30 = [sum(day_total(a + k) for k in range(LONG_WINDOW)) / LONG_WINDOW for a in range(TREND_DAYS - 1, -1, -1)]
+
+    # Anomalías: media y desviación típica (poblacional) por categoría
+    values = defaultdict(list)
+    for c, x in zip(history.cat.tolist(), history.amount.tolist()):
+        values[c].append(x)
+    stats = {}
+    for c, xs in values.items():
+        mean = sum(xs) / len(xs)
+        stats[c] = (len(xs), mean, (sum((x - mean) ** 2 for x in xs) / len(xs)) ** 0.5)
+
+    flagged = []
+    k = 0
+    for a, c, x in zip(history.ago.tolist(), history.cat.tolist(), history.amount.tolist()):
+        if a > history.lookback:
+            continue
+        count, mean, std = stats[c]
+        if count >= settings.INSIGHTS_ANOMALY_MIN_ITEMS and std > 0 and (x - mean) / std >= settings.INSIGHTS_ANOMALY_Z:
+            flagged.append((history.recent_ids[k], (x - mean) / std))
+        k += 1
+    flagged.sort(key=lambda f: -f[1])
+    return per_cat, (trend, ma7, ma30, days_in_month), flagged[: settings.INSIGHTS_MAX_ANOMALIES]
+
+
+@pytest.mark.parametrize("today", [date(2025, 3, 15), date(2024, 2, 29), date(2025, 12, 31)])
+def test_compute_insights_matches_loop_reference(today):
+    history = _synthetic_history(today)
+    result = compute_insights(history)
+    per_cat, (trend, ma7, ma30, days_in_month), anomalies = _reference(history)
+
+    assert result.days_in_month == days_in_month
+    for insight, expected in zip(result.categories, per_cat):
+        got = (insight.avg_daily_7, insight.avg_daily_30, insight.month_to_date,
+               insight.projected_month_end, insight.same_period_last_year)
+        assert got == pytest.approx(expected)
+    assert result.totals.month_to_date == pytest.approx(sum(e[2] for e in per_cat))
+
+    np.testing.assert_allclose(result.trend_total, trend, atol=1e-9)
+    np.testing.assert_allclose(result.trend_ma7, ma7, atol=1e-9)
+    np.testing.assert_allclose(result.trend_ma30, ma30, atol=1e-9)
+    assert result.trend_days[-1] == np.datetime64(today, "D")
+    assert len(result.trend_days) == TREND_DAYS
+
+    assert anomalies, "el historial sintético debe producir anomalías"
+    assert [a.item_id for a in result.anomalies] == [item_id for item_id, _ in anomalies]
+    assert [a.z_score for a in result.anomalies] == pytest.approx([z for _, z in anomalies])
+
+
+def test_compute_insights_empty_history():
+    history = ExpenseHistory(
+        today=date(2025, 6, 10),
+        ago=np.array([], dtype=np.int32),
+        cat=np.array([], dtype=np.int32),
+        amount=np.array([], dtype=np.float64),
+        categories=[None],
+        recent_ids=[],
+        lookback=settings.INSIGHTS_ANOMALY_LOOKBACK_DAYS,
+    )
+    result = compute_insights(history)
+    assert result.totals.projected_month_end == 0
+    assert result.anomalies == []
+    assert not result.trend_total.any()
@@ -0,0 +1,50 @@
+#backend\tests\test_query_plans.py
+"""
+Regresión de planes de consulta (explain_router_queries.py) con volúmenes de test.
+Solo corre si DATABASE_URL apunta a PostgreSQL; la app se conecta con los POSTGRES_*
+de Settings, que deben señalar a la misma base (con las migraciones aplicadas).
+"""
+import asyncio
+import os
+
+import pytest
+
+import explain_router_queries as plans
+
+requires_postgres = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="DATABASE_URL no apunta a PostgreSQL",
+)
+
+# (gastos, ingresos, bitácora): usuario que recorre los endpoints y relleno de otro usuario.
+# El relleno supera MIN_ROWS: las tablas cuentan como grandes y un Seq Scan sobre ellas falla.
+USER_VOLUME = (100, 30, 100)
+BULK_VOLUME = (100_000, 20_000, 20_000)
+MIN_ROWS = 10_000
+
+
+def test_seq_scans_walks_nested_plans():
+    plan = {
+        "Node Type": "Hash Join",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "categories"},
+            {"Node Type": "Hash", "Plans": [
+                {"Node Type": "Index Scan", "Relation Name": "expenses"},
+                {"Node Type": "Seq Scan", "Relation Name": "expense_items"},
+            ]},
+        ],
+    }
+    assert plans._seq_scans(plan) == ["categories", "expense_items"]
+
+
+@requires_postgres
+def test_router_queries_do_not_seq_scan_large_tables():
+    async def run():
+        try:
+            return await plans.check_plans(USER_VOLUME, BULK_VOLUME, MIN_ROWS, show_plans=True)
+        finally:
+            await plans.engine.dispose()
+
+    failures, problems = asyncio.run(run())
+    assert not failures, "\n".join(failures)
+    assert not problems, "\n".join(problems)
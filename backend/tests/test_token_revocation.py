@@ -0,0 +1,38 @@
+#backend\tests\test_token_revocation.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.db.hooks import run_after_commit, run_after_rollback
+from app.services import token_revocation
+from app.services.token_revocation import RevocationList, mark_revoked
+
+
+@pytest.fixture
+def revocations(monkeypatch):
+    revocations = RevocationList()
+    monkeypatch.setattr(token_revocation, "revocation_list", revocations)
+    return revocations
+
+
+def _session():
+    # Los hooks solo usan session.info
+    return SimpleNamespace(info={})
+
+
+def test_revocation_applies_only_after_commit(revocations):
+    db = _session()
+    mark_revoked(db, "jti-1", datetime.utcnow() + timedelta(minutes=5))
+    assert not revocations.is_revoked("jti-1")
+
+    run_after_commit(db)
+    assert revocations.is_revoked("jti-1")
+
+
+def test_rollback_discards_pending_revocations(revocations):
+    db = _session()
+    mark_revoked(db, "jti-1", datetime.utcnow() + timedelta(minutes=5))
+    run_after_rollback(db)
+    run_after_commit(db)  # la sesión se reutiliza: lo descartado no reaparece
+    assert not revocations.is_revoked("jti-1")
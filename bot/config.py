@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from pathlib import Path
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     # Token del bot (lo toma de TELEGRAM_TOKEN)
@@ -11,6 +12,69 @@ class Settings(BaseSettings):
 
     LOG_LEVEL: str = "INFO"
 
+    # === CLIENTE HTTP DEL BACKEND ===
+    API_TIMEOUT_TOTAL: float = 10.0
+    API_TIMEOUT_CONNECT: float = 3.0
+    API_POOL_LIMIT: int = 100
+    API_POOL_LIMIT_PER_HOST: int = 30
+    API_DNS_CACHE_TTL: int = 300
+    # Reintentos (solo llamadas idempotentes) con backoff exponencial + jitter
+    API_RETRY_ATTEMPTS: int = 3
+    API_RETRY_BASE_DELAY: float = 0.2
+    # Circuit breaker: fallos consecutivos para abrir y segundos abierto
+    API_BREAKER_THRESHOLD: int = 5
+    API_BREAKER_COOLDOWN: float = 30.0
+
+    # === MODO DE RECEPCIÓN DE UPDATES ===
+    # "polling": un solo proceso (desarrollo local)
+    # "webhook": servidor aiohttp detrás del túnel; admite varias réplicas
+    BOT_MODE: Literal["polling", "webhook"] = "polling"
+
+    # URL pública (túnel) a la que Telegram enviará los updates, sin el path
+    WEBHOOK_URL: Optional[str] = Field(None, validation_alias="TELEGRAM_WEBHOOK_URL")
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    # Se envía a Telegram en setWebhook y se valida en cada request
+    # (cabecera X-Telegram-Bot-Api-Secret-Token). Obligatorio en modo webhook
+    WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    # Solo una réplica necesita registrar el webhook; el resto puede desactivarlo
+    WEBHOOK_SET_ON_STARTUP: bool = True
+
+    # Workers que procesan updates en paralelo (un chat siempre cae en el mismo worker)
+    WEBHOOK_WORKERS: int = 8
+    WEBHOOK_QUEUE_SIZE: int = 1000
+
+    # Servidor Bot API alternativo (ej: fake local para pruebas/benchmarks)
+    TELEGRAM_API_URL: Optional[str] = None
+
+    # === PERSISTENCIA DE SESIONES (FSM) ===
+    # "sqlite" para local / una réplica, "redis" para varias réplicas
+    FSM_STORAGE: Literal["memory", "sqlite", "redis"] = "sqlite"
+    FSM_SQLITE_PATH: str = "bot_fsm.sqlite3"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # === REUTILIZACIÓN DEL JWT ===
+    # Se reutiliza el token guardado hasta que le queden menos de N segundos
+    JWT_REFRESH_MARGIN_SECONDS: int = 60
+    # Si le quedan menos de N segundos, se renueva en segundo plano
+    JWT_PROACTIVE_REFRESH_SECONDS: int = 300
+
+    # === REGISTRO RÁPIDO DE GASTOS (write-behind) ===
+    # Los gastos se acumulan por chat y se envían juntos tras N segundos sin actividad
+    EXPENSE_QUEUE_PATH: str = "bot_expense_queue.sqlite3"
+    EXPENSE_FLUSH_QUIET_SECONDS: float = 3.0
+    EXPENSE_FLUSH_MAX_BATCH: int = 20
+    EXPENSE_FLUSH_RETRY_SECONDS: float = 30.0
+
+    # === "📊 Ver Mis Gastos" ===
+    # Gastos pedidos al backend por llamada; se paginan en el bot sin volver a consultar
+    EXPENSE_LIST_WINDOW: int = 50
+    EXPENSE_LIST_PAGE_SIZE: int = 10
+    # Vida de la caché de páginas por chat y nº máximo de chats en memoria
+    EXPENSE_LIST_CACHE_TTL: float = 120.0
+    EXPENSE_LIST_CACHE_MAX_CHATS: int = 1000
+
     model_config = SettingsConfigDict(
         # Ruta al .env global en la raíz del proyecto
         env_file=Path(__file__).parent.parent / ".env",
@@ -1,28 +1,34 @@
 #bot\handlers\auth.py
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardRemove
-from aiogram.filters import Command
+from aiogram.types import Message, ReplyKeyboardRemove, ErrorEvent
+from aiogram.filters import Command, ExceptionTypeFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 # Importamos el nuevo menú
 from keyboards.reply import kb_request_phone, kb_main_menu
 from services.api_client import api_client
+from services.session import session_manager
+from services.resilience import BackendUnavailable
 
 router = Router()
 
 class AuthStates(StatesGroup):
     waiting_for_email = State()
 
+# ⚠️ Backend caído / circuito abierto: respondemos rápido en lugar de colgar el handler
+@router.error(ExceptionTypeFilter(BackendUnavailable), F.update.message.as_("message"))
+async def handle_backend_unavailable(event: ErrorEvent, message: Message):
+    await message.answer("⚠️ El servicio no está disponible en este momento. Intenta de nuevo en unos minutos.")
+
 @router.message(Command("start"))
 async def cmd_start(message: Message, state: FSMContext):
     chat_id = message.chat.id
     
-    # 1. Login Silencioso
-    user_data = await api_client.login_silent(chat_id)
+    # 1. Sesión guardada (o login silencioso si el JWT expiró)
+    user_data = await session_manager.get_session(state, chat_id)
     
     if user_data:
-        await state.update_data(jwt_token=user_data["access_token"])
         # ✅ Mostramos el Menú Principal
         await message.answer(
             f"👋 ¡Hola de nuevo {user_data['user_name']}!\n¿Qué deseas hacer hoy?",
@@ -44,6 +50,7 @@ async def cmd_start(message: Message, state: FSMContext):
 async def cmd_logout(message: Message, state: FSMContext):
     chat_id = message.chat.id
     
+    session_manager.forget(chat_id)
     await state.clear()
     success = await api_client.unlink_account(chat_id)
     
@@ -93,7 +100,7 @@ async def handle_email(message: Message, state: FSMContext):
     )
     
     if response and "access_token" in response:
-        await state.update_data(jwt_token=response["access_token"])
+        await session_manager.save_login(state, response)
         
         # ✅ Login exitoso -> Mostrar Menú Principal
         await message.answer(
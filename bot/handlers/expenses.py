@@ -0,0 +1,180 @@
+#bot\handlers\expenses.py
+import re
+from typing import Optional, Tuple
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery, ErrorEvent, InlineKeyboardMarkup
+from aiogram.filters import Command, ExceptionTypeFilter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from config import settings
+from keyboards.reply import kb_main_menu
+from services.api_client import api_client
+from services.expense_pages import ExpenseWindow, expense_pages, paginate_window
+from services.expense_queue import expense_queue, describe_entry
+from services.resilience import BackendUnavailable
+from services.session import session_manager
+
+router = Router()
+
+class ExpenseStates(StatesGroup):
+    quick_entry = State()
+
+# "Tacos 85", "Uber $120.50", "85 tacos"
+_AMOUNT = r"\$?\s*(?P<amount>\d+(?:[.,]\d{1,2})?)"
+_NAME_THEN_AMOUNT = re.compile(rf"^(?P<name>.+?)\s+{_AMOUNT}$")
+_AMOUNT_THEN_NAME = re.compile(rf"^{_AMOUNT}\s+(?P<name>.+)$")
+
+def parse_expense_text(text: str) -> Optional[Tuple[str, float]]:
+    """Extrae (descripción, monto) de un mensaje de registro rápido."""
+    text = text.strip()
+    match = _NAME_THEN_AMOUNT.match(text) or _AMOUNT_THEN_NAME.match(text)
+    if not match:
+        return None
+    amount = float(match.group("amount").replace(",", "."))
+    if amount <= 0:
+        return None
+    return match.group("name").strip(), amount
+
+@router.message(F.text == "💰 Registrar Gasto")
+async def cmd_register_expense(message: Message, state: FSMContext):
+    session = await session_manager.get_session(state, message.chat.id)
+    if not session:
+        await message.answer("🔒 Primero inicia sesión con /start.")
+        return
+
+    await state.set_state(ExpenseStates.quick_entry)
+    await message.answer(
+        "✍️ Escribe cada gasto en un mensaje, por ejemplo:\n"
+        "`Tacos 85`\n`Uber $120.50`\n\n"
+        "Puedes mandar varios seguidos. Usa /listo para terminar.",
+        parse_mode="Markdown"
+    )
+
+@router.message(ExpenseStates.quick_entry, Command("listo"))
+async def cmd_done(message: Message, state: FSMContext):
+    await state.set_state(None)
+    await message.answer("👌 Listo. ¿Qué más deseas hacer?", reply_markup=kb_main_menu())
+
+@router.message(ExpenseStates.quick_entry, F.text)
+async def handle_quick_entry(message: Message, state: FSMContext):
+    parsed = parse_expense_text(message.text)
+    if not parsed:
+        await message.answer("🤔 No entendí. Usa el formato `Descripción Monto` (ej: `Tacos 85`).", parse_mode="Markdown")
+        return
+
+    name, amount = parsed
+    payload = {
+        "notes": name,
+        # Fecha del mensaje, no del envío al backend (que puede ser segundos después)
+        "date": message.date.isoformat(),
+        "items": [{"name": name, "amount": amount, "quantity": 1}],
+    }
+
+    # 1. Primero al diario (durable), 2. luego confirmamos en el chat
+    entry_id = await expense_queue.enqueue(message.chat.id, message.from_user.id, payload)
+    ack = await message.answer(f"⏳ {describe_entry(payload)}")
+    await expense_queue.confirm(message.chat.id, message.from_user.id, entry_id, ack.message_id)
+
+
+# ============================================================================
+# 📊 VER MIS GASTOS (paginado con teclado inline, editando el mismo mensaje)
+# ============================================================================
+class ExpensePage(CallbackData, prefix="exp"):
+    action: str = "page"  # "page" | "refresh"
+    window: int = 0       # bloque del backend (EXPENSE_LIST_WINDOW gastos)
+    chunk: int = 0        # página dentro del bloque (-1 = la última)
+    number: int = 1       # número de página mostrado al usuario
+
+async def _load_window(state: FSMContext, chat_id: int, window: int) -> Optional[ExpenseWindow]:
+    """Bloque desde la caché del chat o, si no está, desde el backend."""
+    entry = expense_pages.get(chat_id, window)
+    if entry:
+        return entry
+
+    session = await session_manager.get_session(state, chat_id)
+    if not session:
+        return None
+    size = settings.EXPENSE_LIST_WINDOW
+    # Pedimos uno de más para saber si hay otro bloque sin hacer un COUNT
+    rows = await api_client.list_expenses(session["access_token"], skip=window * size, limit=size + 1)
+    if rows is None:
+        return None
+    return expense_pages.put(chat_id, window, rows[:size], has_more=len(rows) > size)
+
+async def _render_page(
+    state: FSMContext, chat_id: int, window: int, chunk: int, number: int
+) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    entry = await _load_window(state, chat_id, window)
+    if entry is None:
+        return None
+
+    pages = paginate_window(entry)
+    builder = InlineKeyboardBuilder()
+    if not pages:
+        text = "📭 Aún no tienes gastos registrados." if window == 0 else "📭 No hay más gastos."
+        builder.button(text="🔄 Actualizar", callback_data=ExpensePage(action="refresh"))
+        return text, builder.as_markup()
+
+    if chunk < 0 or chunk >= len(pages):
+        chunk = len(pages) - 1
+    text = f"📊 <b>Tus gastos</b> — página {number}\n\n" + "\n".join(pages[chunk])
+
+    buttons = 0
+    if chunk > 0:
+        builder.button(text="◀️ Anterior", callback_data=ExpensePage(window=window, chunk=chunk - 1, number=number - 1))
+        buttons += 1
+    elif window > 0:
+        builder.button(text="◀️ Anterior", callback_data=ExpensePage(window=window - 1, chunk=-1, number=number - 1))
+        buttons += 1
+
+    if chunk + 1 < len(pages):
+        builder.button(text="Siguiente ▶️", callback_data=ExpensePage(window=window, chunk=chunk + 1, number=number + 1))
+        buttons += 1
+    elif entry.has_more:
+        builder.button(text="Siguiente ▶️", callback_data=ExpensePage(window=window + 1, chunk=0, number=number + 1))
+        buttons += 1
+
+    builder.button(text="🔄 Actualizar", callback_data=ExpensePage(action="refresh"))
+    builder.adjust(buttons or 1, 1)
+    return text, builder.as_markup()
+
+@router.message(F.text == "📊 Ver Mis Gastos")
+async def cmd_list_expenses(message: Message, state: FSMContext):
+    # Al abrir la vista siempre se muestran datos frescos
+    expense_pages.invalidate(message.chat.id)
+    rendered = await _render_page(state, message.chat.id, window=0, chunk=0, number=1)
+    if not rendered:
+        await message.answer("🔒 Primero inicia sesión con /start.")
+        return
+
+    text, markup = rendered
+    await message.answer(text, reply_markup=markup, parse_mode="HTML")
+
+@router.callback_query(ExpensePage.filter())
+async def on_expense_page(callback: CallbackQuery, callback_data: ExpensePage, state: FSMContext):
+    chat_id = callback.message.chat.id
+    if callback_data.action == "refresh":
+        expense_pages.invalidate(chat_id)
+
+    rendered = await _render_page(state, chat_id, callback_data.window, callback_data.chunk, callback_data.number)
+    if not rendered:
+        await callback.answer("🔒 Tu sesión expiró. Usa /start.", show_alert=True)
+        return
+
+    text, markup = rendered
+    try:
+        # Editamos el mismo mensaje en lugar de mandar uno nuevo
+        await callback.message.edit_text(text, reply_markup=markup, parse_mode="HTML")
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+@router.error(ExceptionTypeFilter(BackendUnavailable), F.update.callback_query.as_("callback"))
+async def handle_backend_unavailable_callback(event: ErrorEvent, callback: CallbackQuery):
+    await callback.answer("⚠️ El servicio no está disponible. Intenta de nuevo en unos minutos.", show_alert=True)
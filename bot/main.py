@@ -1,31 +1,62 @@
 import asyncio
 import logging
+from aiohttp import web
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from config import settings
-from handlers import auth
+from handlers import auth, expenses
 from services.api_client import api_client
+from services.storage import build_storage, build_events_isolation
+from services.expense_queue import expense_queue
+from webhook import build_webhook_app
 
 logging.basicConfig(level=logging.INFO)
 
 async def on_startup():
-    print(f"🚀 Bot iniciado. Conectando a API: {settings.API_URL}")
+    print(f"🚀 Bot iniciado ({settings.BOT_MODE}). Conectando a API: {settings.API_URL}")
 
 async def on_shutdown():
     await api_client.close()
     print("🛑 Bot detenido")
 
-async def main():
-    bot = Bot(token=settings.BOT_TOKEN)
-    dp = Dispatcher()
+def build_bot() -> Bot:
+    # Permite apuntar a un Bot API local (fake o self-hosted) para pruebas
+    session = None
+    if settings.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+    return Bot(token=settings.BOT_TOKEN, session=session)
+
+def build_dispatcher() -> Dispatcher:
+    # FSM persistente: el JWT y el estado sobreviven reinicios (y se comparten entre réplicas con Redis)
+    storage = build_storage()
+    dp = Dispatcher(storage=storage, events_isolation=build_events_isolation(storage))
     
     dp.include_router(auth.router)
+    dp.include_router(expenses.router)
     dp.startup.register(on_startup)
+    dp.startup.register(expense_queue.start)
+    dp.shutdown.register(expense_queue.close)
     dp.shutdown.register(on_shutdown)
+    return dp
+
+async def run_polling():
+    bot = build_bot()
+    dp = build_dispatcher()
 
     # Elimina webhooks pendientes si los hubiera (útil para local)
     await bot.delete_webhook(drop_pending_updates=True)
     
     await dp.start_polling(bot)
 
+def run_webhook():
+    bot = build_bot()
+    dp = build_dispatcher()
+    app = build_webhook_app(dp, bot)
+    web.run_app(app, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if settings.BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(run_polling())
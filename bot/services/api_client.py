@@ -1,71 +1,178 @@
 #bot\services\api_client.py
+import asyncio
 import aiohttp
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Tuple, List
 from config import settings
+from services.resilience import BackendUnavailable, CircuitBreaker, LatencyMetrics, backoff_delay
 
 logger = logging.getLogger(__name__)
 
+# Códigos que indican un problema transitorio del backend/proxy
+RETRYABLE_STATUS = {502, 503, 504}
+
 class BackendClient:
     def __init__(self):
         self.base_url = settings.API_URL
         self.session = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.API_BREAKER_THRESHOLD,
+            cooldown=settings.API_BREAKER_COOLDOWN,
+        )
+        self.metrics = LatencyMetrics()
 
     async def get_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            # Pool compartido: keep-alive, límite por host y caché de DNS
+            connector = aiohttp.TCPConnector(
+                limit=settings.API_POOL_LIMIT,
+                limit_per_host=settings.API_POOL_LIMIT_PER_HOST,
+                ttl_dns_cache=settings.API_DNS_CACHE_TTL,
+                keepalive_timeout=30,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=settings.API_TIMEOUT_TOTAL,
+                connect=settings.API_TIMEOUT_CONNECT,
+            )
+            self.session = aiohttp.ClientSession(
+                base_url=self.base_url,
+                connector=connector,
+                timeout=timeout,
+            )
         return self.session
 
     async def close(self):
         if self.session:
             await self.session.close()
+        logger.info(f"📈 Métricas backend: {self.metrics.snapshot()}")
+
+    async def _request(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        idempotent: bool = False,
+    ) -> Tuple[int, Any]:
+        """
+        Ejecuta una petición con circuit breaker, reintentos y métricas.
+
+        :return: (status, body_json_o_None) para cualquier respuesta < 500
+        :raises BackendUnavailable: red/timeout/5xx tras agotar reintentos, o circuito abierto
+        """
+        attempts = settings.API_RETRY_ATTEMPTS if idempotent else 1
+        session = await self.get_session()
+        last_error = None
+
+        for attempt in range(attempts):
+            # Sin await entre el estado y allow(): si está half-open, esta es la prueba
+            is_probe = self.breaker.state == "half-open"
+            if not self.breaker.allow():
+                raise BackendUnavailable(f"{name}: circuito abierto")
+
+            start = time.perf_counter()
+            ok = False
+            recorded = False
+            try:
+                async with session.request(method, path, json=json, headers=headers) as resp:
+                    if resp.status >= 500:
+                        last_error = f"HTTP {resp.status}"
+                        self.breaker.record_failure()
+                        recorded = True
+                        if resp.status not in RETRYABLE_STATUS:
+                            raise BackendUnavailable(f"{name}: {last_error}")
+                    else:
+                        try:
+                            body = await resp.json(content_type=None)
+                        except ValueError:
+                            body = None
+                        ok = True
+                        self.breaker.record_success()
+                        recorded = True
+                        return resp.status, body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = repr(e)
+                self.breaker.record_failure()
+                recorded = True
+            finally:
+                self.metrics.observe(name, (time.perf_counter() - start) * 1000, ok)
+                # Cancelación u otro error inesperado: sin liberar, el circuito quedaría
+                # half-open con la prueba "en vuelo" para siempre
+                if is_probe and not recorded:
+                    self.breaker.release_probe()
+
+            if attempt + 1 < attempts:
+                await asyncio.sleep(backoff_delay(attempt, settings.API_RETRY_BASE_DELAY))
+
+        logger.error(f"Error {name}: {last_error}")
+        raise BackendUnavailable(f"{name}: {last_error}")
 
     async def check_phone(self, phone: str) -> bool:
         """Paso 1: Verificar si existe el teléfono"""
-        session = await self.get_session()
-        try:
-            # IMPORTANTE: Usar json=payload, no data=payload
-            async with session.post(f"{self.base_url}/api/v1/telegram/check-phone", json={"phone": phone}) as resp:
-                return resp.status == 200
-        except Exception as e:
-            logger.error(f"Error check_phone: {e}")
-            return False
+        status, body = await self._request(
+            "check_phone", "POST", "/api/v1/telegram/check-phone",
+            json={"phone": phone}, idempotent=True,
+        )
+        return status == 200 and bool(body and body.get("exists"))
 
     async def login_secure(self, phone: str, email: str, chat_id: int) -> Optional[Dict]:
         """Paso 2: Login con validación completa"""
-        session = await self.get_session()
         payload = {"phone": phone, "email": email, "telegram_chat_id": chat_id}
-        try:
-            async with session.post(f"{self.base_url}/api/v1/telegram/login-secure", json=payload) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                return None
-        except Exception as e:
-            logger.error(f"Error login_secure: {e}")
-            return None
+        status, body = await self._request(
+            "login_secure", "POST", "/api/v1/telegram/login-secure", json=payload,
+        )
+        return body if status == 200 else None
 
     async def login_silent(self, chat_id: int) -> Optional[Dict]:
         """Paso 3: Login automático por ID"""
-        session = await self.get_session()
-        try:
-            async with session.post(f"{self.base_url}/api/v1/telegram/login-silent", json={"telegram_chat_id": chat_id}) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                return None
-        except Exception as e:
-            logger.error(f"Error login_silent: {e}")
-            return None
+        # Repetirlo solo emite otro token: seguro de reintentar
+        status, body = await self._request(
+            "login_silent", "POST", "/api/v1/telegram/login-silent",
+            json={"telegram_chat_id": chat_id}, idempotent=True,
+        )
+        return body if status == 200 else None
 
     # ✅ NUEVO MÉTODO: Logout / Desvincular
     async def unlink_account(self, chat_id: int) -> bool:
         """Llama al backend para borrar la vinculación de Telegram"""
-        session = await self.get_session()
-        try:
-            # Reutilizamos el schema TelegramLoginRequest que solo pide telegram_chat_id
-            async with session.post(f"{self.base_url}/api/v1/telegram/unlink", json={"telegram_chat_id": chat_id}) as resp:
-                return resp.status == 200
-        except Exception as e:
-            logger.error(f"Error unlink_account: {e}")
-            return False
+        # Reutilizamos el schema TelegramLoginRequest que solo pide telegram_chat_id
+        status, _ = await self._request(
+            "unlink_account", "POST", "/api/v1/telegram/unlink",
+            json={"telegram_chat_id": chat_id},
+        )
+        return status == 200
+
+    async def create_expenses_batch(
+        self, token: str, expenses: List[Dict], idempotency_key: str, on_duplicate: str = "warn"
+    ) -> Optional[List[Dict]]:
+        """
+        Crea varios gastos en una sola petición/transacción del backend.
+        Con Idempotency-Key es seguro reintentar: un reenvío devuelve la respuesta original.
+        La clave debe ser la fijada con el lote en el diario (ExpenseJournal.claim_batch),
+        no una calculada en cada intento. on_duplicate forma parte de la petición: la misma
+        clave siempre debe ir con la misma política (ver PendingBatch).
+        """
+        status, body = await self._request(
+            "create_expenses_batch", "POST", f"/api/v1/expenses/batch?on_duplicate={on_duplicate}",
+            json={"expenses": expenses, "source": "TELEGRAM"},
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": idempotency_key},
+            idempotent=True,
+        )
+        if status == 201:
+            return body
+        logger.warning(f"create_expenses_batch rechazado ({status}): {body}")
+        return None
+
+    async def list_expenses(self, token: str, skip: int, limit: int) -> Optional[List[Dict]]:
+        """Listado resumido (solo cabeceras) de los gastos del usuario, del más reciente al más antiguo"""
+        status, body = await self._request(
+            "list_expenses", "GET",
+            f"/api/v1/expenses/?skip={skip}&limit={limit}&fields=date,total,notes,items_count",
+            headers={"Authorization": f"Bearer {token}"}, idempotent=True,
+        )
+        return body if status == 200 else None
 
 api_client = BackendClient()
@@ -0,0 +1,92 @@
+#bot\services\expense_pages.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from html import escape
+from typing import Dict, List, Optional
+
+from config import settings
+
+# Límite de Telegram para el texto de un mensaje
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Margen para la cabecera de la página
+_HEADER_RESERVE = 200
+_NOTES_MAX_CHARS = 80
+
+
+@dataclass
+class ExpenseWindow:
+    """Bloque de gastos traído del backend en una sola llamada."""
+    fetched_at: float
+    rows: List[Dict]
+    has_more: bool
+
+
+class ExpensePageCache:
+    """
+    Caché en memoria, por chat, de los bloques de gastos ya consultados.
+    Los toques de "Siguiente/Anterior" se sirven desde aquí mientras no expire.
+    LRU por chat para acotar la memoria.
+    """
+
+    def __init__(self, ttl: float, max_chats: int):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[int, Dict[int, ExpenseWindow]]" = OrderedDict()
+
+    def get(self, chat_id: int, window: int) -> Optional[ExpenseWindow]:
+        windows = self._chats.get(chat_id)
+        if not windows:
+            return None
+        self._chats.move_to_end(chat_id)
+        entry = windows.get(window)
+        if entry and time.monotonic() - entry.fetched_at < self.ttl:
+            return entry
+        windows.pop(window, None)
+        return None
+
+    def put(self, chat_id: int, window: int, rows: List[Dict], has_more: bool) -> ExpenseWindow:
+        entry = ExpenseWindow(time.monotonic(), rows, has_more)
+        self._chats.setdefault(chat_id, {})[window] = entry
+        self._chats.move_to_end(chat_id)
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return entry
+
+    def invalidate(self, chat_id: int):
+        """Se llama al abrir la vista o al registrar gastos nuevos."""
+        self._chats.pop(chat_id, None)
+
+
+def format_expense_line(row: Dict) -> str:
+    date = datetime.fromisoformat(row["date"]).strftime("%d/%m/%Y") if row.get("date") else "—"
+    notes = (row.get("notes") or "Sin descripción").strip()
+    if len(notes) > _NOTES_MAX_CHARS:
+        notes = notes[:_NOTES_MAX_CHARS - 1] + "…"
+    items = row.get("items_count") or 0
+    return f"📅 {date} · <b>${row.get('total') or 0:,.2f}</b> · {escape(notes)} ({items} ítems)"
+
+
+def chunk_lines(lines: List[str], max_items: int, max_chars: int = TELEGRAM_MESSAGE_LIMIT - _HEADER_RESERVE) -> List[List[str]]:
+    """Agrupa líneas en páginas de hasta 'max_items' líneas sin pasar de 'max_chars'."""
+    pages: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        extra = len(line) + 1
+        if current and (len(current) >= max_items or size + extra > max_chars):
+            pages.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += extra
+    if current:
+        pages.append(current)
+    return pages
+
+
+def paginate_window(entry: ExpenseWindow) -> List[List[str]]:
+    return chunk_lines([format_expense_line(r) for r in entry.rows], settings.EXPENSE_LIST_PAGE_SIZE)
+
+
+expense_pages = ExpensePageCache(settings.EXPENSE_LIST_CACHE_TTL, settings.EXPENSE_LIST_CACHE_MAX_CHATS)
@@ -0,0 +1,319 @@
+#bot\services\expense_queue.py
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+
+from config import settings
+from services.api_client import api_client
+from services.expense_pages import expense_pages
+from services.resilience import BackendUnavailable
+from services.session import session_manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingExpense:
+    id: int
+    chat_id: int
+    user_id: int
+    payload: Dict
+    ack_message_id: Optional[int]
+
+
+@dataclass
+class PendingBatch:
+    key: str
+    attempt: int  # envíos previos del lote (0 = primero)
+    entries: List[PendingExpense]
+
+    @property
+    def on_duplicate(self) -> str:
+        # Primer envío: warn (dos "café 20" seguidos pueden ser gastos reales). Reintentos: skip,
+        # así lo que ya confirmó un intento anterior se devuelve aunque la clave haya caducado
+        return "warn" if self.attempt == 0 else "skip"
+
+    @property
+    def idempotency_key(self) -> str:
+        # La huella de la petición incluye on_duplicate: cada política usa su propia clave,
+        # derivada de la fijada, y los reintentos comparten siempre la misma
+        return self.key if self.attempt == 0 else f"{self.key}-retry"
+
+
+class ExpenseJournal:
+    """
+    Diario en SQLite de los gastos pendientes de enviar.
+    Cada entrada se escribe aquí ANTES de confirmarla al usuario,
+    así sobrevive a un reinicio del bot.
+    Antes del primer envío, las entradas de un lote se fijan (batch_id + Idempotency-Key):
+    los reintentos reenvían exactamente esas filas con la clave del lote.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_expenses ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " chat_id INTEGER NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " ack_message_id INTEGER,"
+            " created_at REAL NOT NULL,"
+            " batch_id TEXT,"
+            " idempotency_key TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0"
+            ")"
+        )
+        # Diarios creados antes de fijar los lotes
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pending_expenses)")}
+        for column, ddl in (
+            ("batch_id", "TEXT"),
+            ("idempotency_key", "TEXT"),
+            ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE pending_expenses ADD COLUMN {column} {ddl}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_pending_chat ON pending_expenses (chat_id, id)")
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _add(self, chat_id: int, user_id: int, payload: Dict) -> int:
+        cur = self._conn.execute(
+            "INSERT INTO pending_expenses (chat_id, user_id, payload, created_at) VALUES (?, ?, ?, ?)",
+            (chat_id, user_id, json.dumps(payload), time.time()),
+        )
+        self._conn.commit()
+        return cur.lastrowid
+
+    def _set_ack(self, entry_id: int, message_id: int):
+        self._conn.execute("UPDATE pending_expenses SET ack_message_id = ? WHERE id = ?", (message_id, entry_id))
+        self._conn.commit()
+
+    def _claim_batch(self, chat_id: int, limit: int) -> Optional[PendingBatch]:
+        columns = (
+            "SELECT id, chat_id, user_id, payload, ack_message_id, batch_id, idempotency_key, attempts"
+            " FROM pending_expenses "
+        )
+        # 1) Un lote ya fijado (envío anterior fallido o interrumpido) se reintenta tal cual
+        rows = self._conn.execute(
+            columns + "WHERE batch_id = (SELECT batch_id FROM pending_expenses"
+            " WHERE chat_id = ? AND batch_id IS NOT NULL ORDER BY id LIMIT 1) ORDER BY id",
+            (chat_id,),
+        ).fetchall()
+        if not rows:
+            # 2) Lote nuevo con lo confirmado; se fija antes de enviarlo
+            rows = self._conn.execute(
+                columns + "WHERE chat_id = ? AND ack_message_id IS NOT NULL AND batch_id IS NULL ORDER BY id LIMIT ?",
+                (chat_id, limit),
+            ).fetchall()
+            if not rows:
+                return None
+            entries = [PendingExpense(r[0], r[1], r[2], json.loads(r[3]), r[4]) for r in rows]
+            key, batch_id = batch_idempotency_key(chat_id, entries), uuid.uuid4().hex
+            self._conn.executemany(
+                "UPDATE pending_expenses SET batch_id = ?, idempotency_key = ? WHERE id = ?",
+                [(batch_id, key, e.id) for e in entries],
+            )
+            batch = PendingBatch(key, 0, entries)
+        else:
+            entries = [PendingExpense(r[0], r[1], r[2], json.loads(r[3]), r[4]) for r in rows]
+            batch_id = rows[0][5]
+            batch = PendingBatch(rows[0][6], rows[0][7], entries)
+        # Se cuenta antes de enviar: un envío cortado por un reinicio también cuenta como intento
+        self._conn.execute("UPDATE pending_expenses SET attempts = attempts + 1 WHERE batch_id = ?", (batch_id,))
+        self._conn.commit()
+        return batch
+
+    def _count(self, chat_id: int) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pending_expenses WHERE chat_id = ?", (chat_id,)).fetchone()[0]
+
+    def _delete(self, ids: List[int]):
+        self._conn.executemany("DELETE FROM pending_expenses WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+
+    def _pending_chats(self) -> List[Tuple[int, int]]:
+        # Entradas que quedaron sin confirmar por un reinicio: se envían igual (0 = sin mensaje que editar)
+        self._conn.execute("UPDATE pending_expenses SET ack_message_id = 0 WHERE ack_message_id IS NULL")
+        self._conn.commit()
+        return self._conn.execute("SELECT DISTINCT chat_id, user_id FROM pending_expenses").fetchall()
+
+    async def add(self, chat_id: int, user_id: int, payload: Dict) -> int:
+        return await self._run(self._add, chat_id, user_id, payload)
+
+    async def set_ack(self, entry_id: int, message_id: int):
+        await self._run(self._set_ack, entry_id, message_id)
+
+    async def claim_batch(self, chat_id: int, limit: int) -> Optional[PendingBatch]:
+        """Lote a enviar: el fijado pendiente o uno nuevo (como mucho 'limit'). Cuenta el intento."""
+        return await self._run(self._claim_batch, chat_id, limit)
+
+    async def count(self, chat_id: int) -> int:
+        return await self._run(self._count, chat_id)
+
+    async def delete(self, ids: List[int]):
+        await self._run(self._delete, ids)
+
+    async def pending_chats(self) -> List[Tuple[int, int]]:
+        return await self._run(self._pending_chats)
+
+    async def close(self):
+        await self._run(self._conn.close)
+
+
+def batch_idempotency_key(chat_id: int, entries: List[PendingExpense]) -> str:
+    """Clave del lote (entradas y contenido); se calcula una vez y se guarda al fijarlo."""
+    raw = json.dumps([chat_id, [[e.id, e.payload] for e in entries]], sort_keys=True)
+    return "tg-" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def describe_entry(payload: Dict) -> str:
+    item = payload["items"][0]
+    return f"{item['name']} — ${item['amount']:.2f}"
+
+
+class ExpenseWriteBehind:
+    """
+    Cola write-behind de gastos por chat.
+    - Cada entrada se guarda en el diario y se confirma con "⏳".
+    - Tras EXPENSE_FLUSH_QUIET_SECONDS sin nuevas entradas (o al llegar a
+      EXPENSE_FLUSH_MAX_BATCH) se envía todo en un solo POST /expenses/batch.
+    - Al terminar, cada mensaje "⏳" se edita a "✅", "⚠️" (posible duplicado) o "❌".
+    """
+
+    def __init__(self):
+        self.quiet_seconds = settings.EXPENSE_FLUSH_QUIET_SECONDS
+        self.max_batch = settings.EXPENSE_FLUSH_MAX_BATCH
+        self.retry_seconds = settings.EXPENSE_FLUSH_RETRY_SECONDS
+        self.journal: Optional[ExpenseJournal] = None
+        self.bot: Optional[Bot] = None
+        self.dispatcher: Optional[Dispatcher] = None
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def start(self, bot: Bot, dispatcher: Dispatcher):
+        """Startup del Dispatcher: abre el diario y reprograma lo que quedó pendiente."""
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.journal = ExpenseJournal(settings.EXPENSE_QUEUE_PATH)
+
+        pending = await self.journal.pending_chats()
+        for chat_id, user_id in pending:
+            self._arm(chat_id, user_id, delay=0)
+        if pending:
+            logger.info(f"♻️ Reanudando gastos pendientes de {len(pending)} chats")
+
+    async def close(self):
+        # Lo pendiente sigue en el diario; se enviará en el próximo arranque
+        for task in list(self._timers.values()):
+            task.cancel()
+        if self.journal:
+            await self.journal.close()
+
+    async def enqueue(self, chat_id: int, user_id: int, payload: Dict) -> int:
+        """Guarda la entrada en el diario (durable). El envío se programa en confirm()."""
+        return await self.journal.add(chat_id, user_id, payload)
+
+    async def confirm(self, chat_id: int, user_id: int, entry_id: int, ack_message_id: int):
+        """Asocia el mensaje "⏳" a la entrada y (re)arma la ventana de envío."""
+        await self.journal.set_ack(entry_id, ack_message_id)
+        # Si ya hay un envío en curso, lo acumulado se despacha al terminar ese envío
+        flushing = self._locks[chat_id].locked()
+        if not flushing and await self.journal.count(chat_id) >= self.max_batch:
+            self._arm(chat_id, user_id, delay=0)
+        else:
+            self._arm(chat_id, user_id, delay=self.quiet_seconds)
+
+    def _arm(self, chat_id: int, user_id: int, delay: float):
+        # Reinicia la ventana de silencio; un flush ya en curso no se interrumpe
+        timer = self._timers.pop(chat_id, None)
+        if timer:
+            timer.cancel()
+        self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id, user_id, delay))
+
+    async def _flush_later(self, chat_id: int, user_id: int, delay: float):
+        await asyncio.sleep(delay)
+        if self._timers.get(chat_id) is asyncio.current_task():
+            del self._timers[chat_id]
+        try:
+            await self.flush(chat_id, user_id)
+        except Exception:
+            logger.exception(f"Error enviando gastos del chat {chat_id}")
+
+    async def _edit_ack(self, entry: PendingExpense, text: str):
+        if not entry.ack_message_id:  # 0 = recuperada tras reinicio, sin "⏳" que editar
+            return
+        try:
+            await self.bot.edit_message_text(text=text, chat_id=entry.chat_id, message_id=entry.ack_message_id)
+        except Exception as e:
+            logger.debug(f"No se pudo editar confirmación {entry.ack_message_id}: {e}")
+
+    async def flush(self, chat_id: int, user_id: int):
+        async with self._locks[chat_id]:
+            batch = await self.journal.claim_batch(chat_id, self.max_batch)
+            if batch is None:
+                return
+            entries = batch.entries
+
+            state = FSMContext(
+                storage=self.dispatcher.storage,
+                key=StorageKey(bot_id=self.bot.id, chat_id=chat_id, user_id=user_id),
+            )
+            try:
+                token = await session_manager.get_token(state, chat_id)
+                created = None
+                if token:
+                    created = await api_client.create_expenses_batch(
+                        token, [e.payload for e in entries], batch.idempotency_key, batch.on_duplicate
+                    )
+            except BackendUnavailable as e:
+                # El lote sigue fijado: el reintento reenvía las mismas filas (con skip, lo que
+                # ya se confirmó vuelve como el gasto existente) y lo que llegue mientras tanto
+                # va en el lote siguiente
+                logger.warning(f"Backend no disponible, reintento en {self.retry_seconds}s: {e}")
+                self._arm(chat_id, user_id, delay=self.retry_seconds)
+                return
+
+            await self.journal.delete([e.id for e in entries])
+
+            if created is None:
+                for entry in entries:
+                    await self._edit_ack(entry, f"❌ {describe_entry(entry.payload)} (no se pudo registrar)")
+            else:
+                # Los listados en caché de este chat ya no incluyen lo recién creado
+                expense_pages.invalidate(chat_id)
+                # La respuesta trae un gasto por entrada, en el mismo orden
+                for entry, expense in zip(entries, created):
+                    if expense.get("duplicate_of") == expense.get("id"):
+                        # skip: ya existía (p. ej. lo confirmó un intento anterior); no se creó otro
+                        await self._edit_ack(entry, f"✅ {describe_entry(entry.payload)} (ya registrado)")
+                    elif expense.get("duplicate_of"):
+                        await self._edit_ack(entry, f"⚠️ {describe_entry(entry.payload)} (posible duplicado)")
+                    else:
+                        await self._edit_ack(entry, f"✅ {describe_entry(entry.payload)}")
+
+            # Si la ráfaga superó el tamaño de lote, seguimos con el resto; lo que llegó
+            # mientras se reintentaba un lote fijado sale en la siguiente ventana
+            remaining = await self.journal.count(chat_id)
+            if remaining >= self.max_batch:
+                self._arm(chat_id, user_id, delay=0)
+            elif remaining:
+                self._arm(chat_id, user_id, delay=self.quiet_seconds)
+
+
+expense_queue = ExpenseWriteBehind()
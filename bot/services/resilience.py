@@ -0,0 +1,99 @@
+#bot\services\resilience.py
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict
+
+
+class BackendUnavailable(Exception):
+    """El backend no respondió (timeout, red, 5xx) o el circuito está abierto."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simple:
+    - closed: todo pasa; N fallos consecutivos lo abren.
+    - open: falla rápido durante 'cooldown' segundos.
+    - half-open: deja pasar una petición de prueba; si va bien se cierra.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """La petición de prueba terminó sin resultado (ej: cancelada): otra podrá probar."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # Reabrimos (o abrimos) y reiniciamos el enfriamiento
+            self.opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 5.0) -> float:
+    """Backoff exponencial con 'full jitter': uniforme en [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        avg = self.total_ms / self.calls if self.calls else 0.0
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(avg, 2),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class LatencyMetrics:
+    """Latencia y errores por método del cliente (en memoria del proceso)."""
+
+    def __init__(self):
+        self.methods: Dict[str, MethodStats] = defaultdict(MethodStats)
+
+    def observe(self, method: str, elapsed_ms: float, ok: bool) -> None:
+        stats = self.methods[method]
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if not ok:
+            stats.errors += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.as_dict() for name, stats in self.methods.items()}
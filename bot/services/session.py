@@ -0,0 +1,110 @@
+#bot\services\session.py
+import asyncio
+import base64
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from aiogram.fsm.context import FSMContext
+
+from config import settings
+from services.api_client import api_client
+from services.resilience import BackendUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+def _jwt_exp(token: str) -> Optional[float]:
+    """Lee el claim 'exp' del JWT (sin verificar firma: eso lo hace el backend)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+class SessionManager:
+    """
+    Reutiliza el JWT guardado en el FSM en lugar de pedir uno nuevo en cada /start.
+    - Token vigente: se devuelve sin tocar el backend.
+    - Token cerca de expirar: se devuelve y se renueva en segundo plano.
+    - Token expirado o ausente: login silencioso (bloqueante).
+    """
+
+    def __init__(self):
+        # Renovaciones en curso por chat (evita logins duplicados)
+        self._refreshing: Dict[int, asyncio.Task] = {}
+
+    async def save_login(self, state: FSMContext, login_data: Dict) -> None:
+        await state.update_data(
+            jwt_token=login_data["access_token"],
+            jwt_exp=_jwt_exp(login_data["access_token"]),
+            user_name=login_data.get("user_name"),
+        )
+
+    async def _login(self, state: FSMContext, chat_id: int) -> Optional[Dict]:
+        user_data = await api_client.login_silent(chat_id)
+        if user_data:
+            await self.save_login(state, user_data)
+        return user_data
+
+    async def _refresh_quietly(self, state: FSMContext, chat_id: int) -> Optional[Dict]:
+        # La renovación en segundo plano no debe romper nada si el backend cae:
+        # el token actual sigue siendo válido un rato más
+        try:
+            return await self._login(state, chat_id)
+        except BackendUnavailable as e:
+            logger.warning(f"Renovación de JWT pospuesta para chat {chat_id}: {e}")
+            return None
+
+    def _schedule_refresh(self, state: FSMContext, chat_id: int) -> None:
+        if chat_id in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh_quietly(state, chat_id))
+        self._refreshing[chat_id] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(chat_id, None))
+
+    async def get_session(self, state: FSMContext, chat_id: int) -> Optional[Dict]:
+        """
+        Devuelve {'access_token', 'user_name'} o None si el chat no está vinculado.
+        """
+        data = await state.get_data()
+        token = data.get("jwt_token")
+        exp = data.get("jwt_exp")
+
+        if token and exp:
+            remaining = exp - time.time()
+            if remaining > settings.JWT_REFRESH_MARGIN_SECONDS:
+                if remaining < settings.JWT_PROACTIVE_REFRESH_SECONDS:
+                    self._schedule_refresh(state, chat_id)
+                return {"access_token": token, "user_name": data.get("user_name") or "Usuario"}
+
+        # Si ya hay una renovación en vuelo la esperamos en vez de lanzar otra
+        pending = self._refreshing.get(chat_id)
+        if pending:
+            # shield: si forget() cancela la renovación, este handler no se cancela con ella
+            try:
+                refreshed = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # el cancelado es este handler, no la renovación
+                refreshed = None
+            if refreshed:
+                return refreshed
+
+        return await self._login(state, chat_id)
+
+    async def get_token(self, state: FSMContext, chat_id: int) -> Optional[str]:
+        session = await self.get_session(state, chat_id)
+        return session["access_token"] if session else None
+
+    def forget(self, chat_id: int) -> None:
+        """Cancela una renovación pendiente (ej: al desvincular)."""
+        task = self._refreshing.pop(chat_id, None)
+        if task:
+            task.cancel()
+
+
+session_manager = SessionManager()
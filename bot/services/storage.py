@@ -0,0 +1,97 @@
+#bot\services\storage.py
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, BaseEventIsolation, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, DisabledEventIsolation
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Storage FSM persistente en un archivo SQLite (pensado para desarrollo local
+    o una sola réplica). Las operaciones bloqueantes se ejecutan en un hilo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT NOT NULL DEFAULT '{}'"
+            ")"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        # Una sola conexión: serializamos el acceso
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _upsert(self, column: str, key: str, value: Optional[str]):
+        self._conn.execute(
+            f"INSERT INTO fsm (key, {column}) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}",
+            (key, value),
+        )
+        self._conn.commit()
+
+    def _select(self, column: str, key: str) -> Optional[str]:
+        row = self._conn.execute(f"SELECT {column} FROM fsm WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._run(self._upsert, "state", self.key_builder.build(key), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._run(self._select, "state", self.key_builder.build(key))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._run(self._upsert, "data", self.key_builder.build(key), json.dumps(dict(data)))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        raw = await self._run(self._select, "data", self.key_builder.build(key))
+        return json.loads(raw) if raw else {}
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+
+
+def build_storage() -> BaseStorage:
+    """Crea el storage FSM configurado (FSM_STORAGE = memory | sqlite | redis)."""
+    if settings.FSM_STORAGE == "redis":
+        # Import perezoso: 'redis' solo es necesario en este modo
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        logger.info(f"💾 FSM en Redis: {settings.REDIS_URL}")
+        return RedisStorage.from_url(
+            settings.REDIS_URL,
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+        )
+
+    if settings.FSM_STORAGE == "sqlite":
+        logger.info(f"💾 FSM en SQLite: {settings.FSM_SQLITE_PATH}")
+        return SQLiteStorage(settings.FSM_SQLITE_PATH)
+
+    logger.warning("⚠️ FSM en memoria: las sesiones se pierden al reiniciar")
+    return MemoryStorage()
+
+
+def build_events_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """Con Redis, aísla eventos del mismo chat entre réplicas; en otro caso no hace falta."""
+    if settings.FSM_STORAGE == "redis":
+        return storage.create_isolation()
+    return DisabledEventIsolation()
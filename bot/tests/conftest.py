@@ -0,0 +1,15 @@
+#bot\tests\conftest.py
+import os
+import sys
+
+from dotenv import dotenv_values
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# config.Settings exige el token al importarse; los tests no hablan con Telegram ni con el
+# backend, así que basta un valor de relleno si no viene del entorno ni del .env global
+if "TELEGRAM_TOKEN" not in os.environ and "TELEGRAM_TOKEN" not in dotenv_values(os.path.join(BOT_DIR, "..", ".env")):
+    os.environ["TELEGRAM_TOKEN"] = "1:tests"
+
+# Los módulos del bot se importan como en main.py: desde bot/
+sys.path.insert(0, BOT_DIR)
@@ -0,0 +1,174 @@
+#bot\tests\test_expense_queue.py
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from services import expense_queue as queue_module
+from services.expense_queue import ExpenseJournal, ExpenseWriteBehind
+from services.resilience import BackendUnavailable
+
+CHAT_ID = 7
+USER_ID = 70
+
+
+def _payload(name: str, amount: float) -> dict:
+    return {"items": [{"name": name, "amount": amount}]}
+
+
+class _FakeBackend:
+    """
+    POST /expenses/batch: repite la respuesta por Idempotency-Key y, con skip, devuelve
+    el gasto existente de misma huella (aquí: nombre y monto) en lugar de crear otro.
+    """
+
+    def __init__(self):
+        self.created = []
+        self.responses = {}
+        self.calls = []
+        self.timeouts_after_commit = 0
+
+    def _insert(self, expense, on_duplicate):
+        item = expense["items"][0]
+        existing = next((e for e in self.created if e["fingerprint"] == (item["name"], item["amount"])), None)
+        if existing and on_duplicate == "skip":
+            return {**existing, "duplicate_of": existing["id"]}
+        row = {"id": len(self.created) + 1, "notes": item["name"], "fingerprint": (item["name"], item["amount"])}
+        self.created.append(row)
+        return {**row, "duplicate_of": existing["id"] if existing and on_duplicate == "warn" else None}
+
+    async def create_expenses_batch(self, token, expenses, idempotency_key, on_duplicate="warn"):
+        self.calls.append((idempotency_key, on_duplicate))
+        if idempotency_key not in self.responses:
+            self.responses[idempotency_key] = [self._insert(e, on_duplicate) for e in expenses]
+        if self.timeouts_after_commit:
+            # El backend confirmó, pero la respuesta no llegó (timeout de lectura)
+            self.timeouts_after_commit -= 1
+            raise BackendUnavailable("create_expenses_batch: timeout")
+        return self.responses[idempotency_key]
+
+
+class _FakeBot:
+    id = 1
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        self.edits.append((message_id, text))
+
+
+class _FakeDispatcher:
+    storage = MemoryStorage()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = _FakeBackend()
+    monkeypatch.setattr(queue_module, "api_client", backend)
+
+    async def get_token(state, chat_id):
+        return "token"
+
+    monkeypatch.setattr(queue_module.session_manager, "get_token", get_token)
+    return backend
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    def make():
+        queue = ExpenseWriteBehind()
+        queue.journal = ExpenseJournal(str(tmp_path / "queue.sqlite3"))
+        queue.bot = _FakeBot()
+        queue.dispatcher = _FakeDispatcher()
+        # Sin temporizadores: el test decide cuándo se envía
+        queue.armed = []
+        queue._arm = lambda chat_id, user_id, delay: queue.armed.append(delay)
+        return queue
+    return make
+
+
+async def _add(queue, name, amount, message_id):
+    entry_id = await queue.enqueue(CHAT_ID, USER_ID, _payload(name, amount))
+    await queue.confirm(CHAT_ID, USER_ID, entry_id, message_id)
+
+
+def test_retry_after_timeout_resends_the_pinned_batch(backend, make_queue):
+    async def run():
+        queue = make_queue()
+        await _add(queue, "café", 20, message_id=100)
+        await _add(queue, "pan", 15, message_id=101)
+
+        backend.timeouts_after_commit = 1
+        await queue.flush(CHAT_ID, USER_ID)
+        assert queue.armed[-1] == queue.retry_seconds
+
+        # Llega otra entrada mientras se espera el reintento
+        await _add(queue, "taxi", 80, message_id=102)
+
+        await queue.flush(CHAT_ID, USER_ID)  # reintento: solo el lote fijado
+        assert queue.armed[-1] == queue.quiet_seconds  # "taxi" sigue pendiente
+        await queue.flush(CHAT_ID, USER_ID)
+        await queue.journal.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert [e["notes"] for e in backend.created] == ["café", "pan", "taxi"]
+    (first_key, first_policy), (retry_key, retry_policy), (next_key, _) = backend.calls
+    assert (first_policy, retry_policy) == ("warn", "skip")
+    assert retry_key == f"{first_key}-retry" and next_key != first_key
+    assert [text for _, text in queue.bot.edits] == [
+        "✅ café — $20.00 (ya registrado)", "✅ pan — $15.00 (ya registrado)", "✅ taxi — $80.00",
+    ]
+
+
+def test_first_send_warns_about_possible_duplicates(backend, make_queue):
+    async def run():
+        queue = make_queue()
+        await _add(queue, "café", 20, message_id=100)
+        await _add(queue, "café", 20, message_id=101)
+        await queue.flush(CHAT_ID, USER_ID)
+        await queue.journal.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert len(backend.created) == 2
+    assert [text for _, text in queue.bot.edits] == ["✅ café — $20.00", "⚠️ café — $20.00 (posible duplicado)"]
+
+
+def test_retries_share_one_key(backend, make_queue):
+    async def run():
+        queue = make_queue()
+        await _add(queue, "café", 20, message_id=100)
+        backend.timeouts_after_commit = 3
+        for _ in range(4):
+            await queue.flush(CHAT_ID, USER_ID)
+        await queue.journal.close()
+
+    asyncio.run(run())
+    assert len(backend.created) == 1
+    keys = [key for key, _ in backend.calls]
+    assert keys[1] == keys[2] == keys[3] == f"{keys[0]}-retry"
+
+
+
+def test_pinned_batch_survives_a_restart(backend, make_queue):
+    async def run():
+        queue = make_queue()
+        await _add(queue, "café", 20, message_id=100)
+        backend.timeouts_after_commit = 1
+        await queue.flush(CHAT_ID, USER_ID)
+        await queue.journal.close()
+
+        # Reinicio del bot: mismo diario, entradas nuevas no se mezclan con el lote fijado
+        queue = make_queue()
+        await _add(queue, "pan", 15, message_id=101)
+        await queue.flush(CHAT_ID, USER_ID)
+        await queue.flush(CHAT_ID, USER_ID)
+        assert await queue.journal.count(CHAT_ID) == 0
+        await queue.journal.close()
+
+    asyncio.run(run())
+    assert [e["notes"] for e in backend.created] == ["café", "pan"]
+    keys = [key for key, _ in backend.calls]
+    assert keys[1] == f"{keys[0]}-retry" and keys[2] not in keys[:2]
@@ -0,0 +1,39 @@
+#bot\tests\test_webhook.py
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import webhook
+from webhook import SECRET_HEADER, ShardedUpdateQueue, WebhookHandler, build_webhook_app
+
+UPDATE = {"update_id": 1, "message": {"message_id": 1, "date": 0, "chat": {"id": 7, "type": "private"}, "text": "hola"}}
+
+
+def test_webhook_mode_requires_a_secret(monkeypatch):
+    monkeypatch.setattr(webhook.settings, "WEBHOOK_SECRET", None)
+    with pytest.raises(RuntimeError):
+        build_webhook_app(Dispatcher(), Bot(token="1:tests"))
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, 401),
+    ({SECRET_HEADER: "otro"}, 401),
+    ({SECRET_HEADER: "s3cret"}, 200),
+])
+def test_handler_checks_the_secret_header(headers, expected):
+    async def run():
+        bot = Bot(token="1:tests")
+        update_queue = ShardedUpdateQueue(Dispatcher(), bot, workers=1, queue_size=10)
+        app = web.Application()
+        app.router.add_post("/telegram/webhook", WebhookHandler(bot, update_queue, "s3cret").handle)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/telegram/webhook", json=UPDATE, headers=headers)
+        await bot.session.close()
+        return response.status, update_queue.queues[0].qsize()
+
+    status, queued = asyncio.run(run())
+    assert status == expected
+    assert queued == (1 if expected == 200 else 0)
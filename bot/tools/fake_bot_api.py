@@ -0,0 +1,155 @@
+#bot\tools\fake_bot_api.py
+"""
+Servidor falso del Bot API de Telegram + generador de carga para el webhook.
+
+Uso (desde bot/):
+    # 1. Levantar el Bot API falso
+    python -m tools.fake_bot_api serve --port 8081
+
+    # 2. Arrancar el bot apuntando a él
+    TELEGRAM_API_URL=http://localhost:8081 BOT_MODE=webhook \
+    TELEGRAM_WEBHOOK_URL=http://localhost:8080 WEBHOOK_SECRET=dev python main.py
+
+    # 3. Inyectar updates sintéticos al webhook
+    python -m tools.fake_bot_api flood http://localhost:8080/telegram/webhook \
+        --updates 5000 --chats 200 --secret dev
+
+    # Simular los límites de Telegram (429 + retry_after) para medir envíos masivos
+    python -m tools.fake_bot_api serve --port 8081 --rate-limit 30
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+class FakeBotAPI:
+    """Responde a /bot{token}/{method} como lo haría Telegram y lleva estadísticas."""
+
+    def __init__(self, rate_limit: float = 0):
+        self.calls = Counter()
+        self.message_ids = itertools.count(1)
+        # 0 = sin límite; si no, ventana de 1s global + 1 msg/s por chat como Telegram
+        self.rate_limit = rate_limit
+        self.window_start = 0.0
+        self.window_count = 0
+        self.chat_last: dict = {}
+
+    def _throttled(self, chat_id: int) -> bool:
+        now = time.monotonic()
+        if now - self.window_start >= 1:
+            self.window_start, self.window_count = now, 0
+        self.window_count += 1
+        last = self.chat_last.get(chat_id, 0.0)
+        self.chat_last[chat_id] = now
+        return self.window_count > self.rate_limit or now - last < 1
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+
+        if self.rate_limit and method.lower() == "sendmessage" and self._throttled(payload.get("chat_id")):
+            self.calls["429"] += 1
+            return web.json_response(
+                {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                 "parameters": {"retry_after": 1}},
+                status=429,
+            )
+
+        lowered = method.lower()
+        if lowered == "getme":
+            result = BOT_USER
+        elif lowered in ("sendmessage", "editmessagetext"):
+            result = {
+                "message_id": int(payload.get("message_id") or next(self.message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": int(payload.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": payload.get("text", ""),
+            }
+        else:
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.calls))
+
+
+def build_app(rate_limit: float = 0) -> web.Application:
+    api = FakeBotAPI(rate_limit)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    app.router.add_get("/stats", api.stats)
+    return app
+
+
+def _make_update(update_id: int, chat_id: int) -> dict:
+    user = {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": user,
+            "text": "/start",
+        },
+    }
+
+
+async def flood(url: str, updates: int, chats: int, concurrency: int, secret: str | None):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    statuses = Counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def send(i: int):
+            async with sem:
+                async with session.post(url, json=_make_update(i, 1000 + i % chats)) as resp:
+                    statuses[resp.status] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(1, updates + 1)))
+        elapsed = time.perf_counter() - start
+
+    print(f"📨 {updates} updates en {elapsed:.2f}s ({updates / elapsed:.0f} upd/s)")
+    print(f"   Códigos HTTP: {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot API falso de Telegram")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Levanta el servidor falso")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8081)
+    p_serve.add_argument("--rate-limit", type=float, default=0, help="msg/s antes de responder 429")
+
+    p_flood = sub.add_parser("flood", help="Envía updates sintéticos a un webhook")
+    p_flood.add_argument("url")
+    p_flood.add_argument("--updates", type=int, default=1000)
+    p_flood.add_argument("--chats", type=int, default=100)
+    p_flood.add_argument("--concurrency", type=int, default=50)
+    p_flood.add_argument("--secret", default=None)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        web.run_app(build_app(args.rate_limit), host=args.host, port=args.port)
+    else:
+        asyncio.run(flood(args.url, args.updates, args.chats, args.concurrency, args.secret))
+
+
+if __name__ == "__main__":
+    main()
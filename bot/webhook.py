@@ -0,0 +1,160 @@
+#bot\webhook.py
+import asyncio
+import logging
+import secrets
+from typing import Any, Dict, List
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def _shard_key(update: Update) -> int:
+    """
+    Clave para repartir updates entre workers.
+    Usamos el chat (o el usuario) para que los mensajes de un mismo chat
+    se procesen en orden y el FSM no sufra carreras.
+    """
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None and getattr(event, "message", None) is not None:
+        chat = event.message.chat
+    if chat is not None:
+        return chat.id
+
+    from_user = getattr(event, "from_user", None)
+    if from_user is not None:
+        return from_user.id
+
+    return update.update_id
+
+
+class ShardedUpdateQueue:
+    """
+    Cola de updates repartida en N workers.
+    - El request del webhook solo valida y encola: responde 200 de inmediato.
+    - Cada worker consume su propia cola -> orden garantizado por chat,
+      concurrencia entre chats distintos.
+    - La cola vive en memoria y Telegram ya recibió el 200: si el proceso muere (crash, kill -9)
+      se pierde lo encolado sin procesar. Un apagado normal la drena primero (stop).
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, queue_size: int):
+        self.dp = dp
+        self.bot = bot
+        self.queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(max(1, workers))]
+        self.tasks: List[asyncio.Task] = []
+
+    def put(self, update: Update) -> bool:
+        queue = self.queues[_shard_key(update) % len(self.queues)]
+        try:
+            queue.put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                logger.exception(f"Error procesando update {update.update_id}")
+            finally:
+                queue.task_done()
+
+    async def start(self):
+        self.tasks = [asyncio.create_task(self._worker(q)) for q in self.queues]
+        logger.info(f"🧵 {len(self.tasks)} workers de updates iniciados")
+
+    async def stop(self, timeout: float = 10.0):
+        # Intentamos terminar lo encolado antes de cancelar
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ Tiempo agotado drenando la cola de updates")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class WebhookHandler:
+    """Endpoint aiohttp que recibe los updates de Telegram."""
+
+    def __init__(self, bot: Bot, update_queue: ShardedUpdateQueue, secret: str):
+        self.bot = bot
+        self.update_queue = update_queue
+        self.secret = secret
+
+    async def handle(self, request: web.Request) -> web.Response:
+        received = request.headers.get(SECRET_HEADER, "")
+        if not secrets.compare_digest(received, self.secret):
+            return web.Response(status=401)
+
+        try:
+            data: Dict[str, Any] = await request.json()
+            update = Update.model_validate(data, context={"bot": self.bot})
+        except Exception:
+            return web.Response(status=400)
+
+        if not self.update_queue.put(update):
+            # Telegram reintentará más tarde: backpressure natural
+            return web.Response(status=503)
+
+        return web.Response()
+
+
+async def healthz(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """Construye la app aiohttp del modo webhook (sin arrancarla)."""
+    # Sin secreto cualquiera que conozca la URL pública podría inyectar updates
+    if not settings.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET es obligatorio en modo webhook")
+
+    update_queue = ShardedUpdateQueue(
+        dp, bot,
+        workers=settings.WEBHOOK_WORKERS,
+        queue_size=settings.WEBHOOK_QUEUE_SIZE,
+    )
+    handler = WebhookHandler(bot, update_queue, settings.WEBHOOK_SECRET)
+
+    app = web.Application()
+    app.router.add_post(settings.WEBHOOK_PATH, handler.handle)
+    app.router.add_get("/healthz", healthz)
+
+    async def on_startup(app: web.Application):
+        await update_queue.start()
+        if settings.WEBHOOK_SET_ON_STARTUP:
+            if not settings.WEBHOOK_URL:
+                raise RuntimeError("TELEGRAM_WEBHOOK_URL es obligatorio en modo webhook")
+            await bot.set_webhook(
+                url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                secret_token=settings.WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=100,
+            )
+            logger.info(f"🔗 Webhook registrado en {settings.WEBHOOK_URL}{settings.WEBHOOK_PATH}")
+
+    async def on_shutdown(app: web.Application):
+        await update_queue.stop()
+
+    async def on_cleanup(app: web.Application):
+        await bot.session.close()
+
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+
+    # Emite startup/shutdown del Dispatcher (on_startup/on_shutdown de main.py)
+    setup_application(app, dp, bot=bot)
+    return app
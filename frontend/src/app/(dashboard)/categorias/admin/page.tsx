@@ -57,8 +57,31 @@ interface CategoryFormData {
   is_global: boolean; 
 }
 
+// Trabajo en segundo plano que reasigna los registros (DELETE / bulk-delete / fusión)
+interface CategoryJob {
+  id: string;
+  status: "pending" | "running" | "done" | "failed";
+  moved_expenses: number;
+  moved_incomes: number;
+  error?: string | null;
+}
+
 type TabView = "active" | "inactive";
 
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+// Consulta el trabajo hasta que termina (done/failed). null si se agota la espera.
+const waitForCategoryJob = async (jobId: string): Promise<CategoryJob | null> => {
+  const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    const res = await api.get<CategoryJob>(`/categories/jobs/${jobId}`);
+    if (res.data.status === "done" || res.data.status === "failed") return res.data;
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+  return null;
+};
+
 const initialFormData: CategoryFormData = { name: "", is_global: false };
 
 export default function AdminCategoriasPage() {
@@ -171,6 +194,25 @@ export default function AdminCategoriasPage() {
     if (token) fetchCategories();
   }, [fetchCategories, token]);
 
+  // Sigue un trabajo ya aceptado (202) sin bloquear el modal; al terminar recarga los conteos
+  const trackCategoryJob = useCallback(async (jobId: string | null | undefined, doneTitle: string) => {
+    if (!jobId) return;
+    try {
+      const finished = await waitForCategoryJob(jobId);
+      if (!finished) {
+        toast.info({ title: "Reasignación en curso", description: "Sigue en segundo plano; recarga más tarde para ver los conteos." });
+      } else if (finished.status === "failed") {
+        toast.error({ title: "La reasignación falló", description: finished.error || "Puedes reintentarla desde el servidor." });
+      } else {
+        toast.success({ title: doneTitle, description: `${finished.moved_expenses} gastos y ${finished.moved_incomes} ingresos reasignados.` });
+      }
+    } catch (error) {
+      toast.error("No se pudo consultar el estado de la reasignación");
+    } finally {
+      fetchCategories();
+    }
+  }, [toast, fetchCategories]);
+
   // --- HELPERS PARA SELECCIÓN MULTIPLE ---
   // Obtiene todos los IDs reales visibles actualmente (desagrupando los grupos)
   const getAllIdsInView = useMemo(() => {
@@ -220,6 +262,7 @@ export default function AdminCategoriasPage() {
     setIsSubmitting(true);
     try {
         const queryParams = targetCategoryId ? { target_category_id: targetCategoryId } : {};
+        let jobId: string | undefined;
         
         // Bloqueo de soft delete a grupos
         if (currentCategory?.is_grouped && !isHardDelete) {
@@ -230,16 +273,19 @@ export default function AdminCategoriasPage() {
         if (isHardDelete) {
             // Eliminar selección (puede ser 1 o muchos)
             const ids = Array.from(selectedIds);
-            await api.post("/categories/admin/bulk-delete", ids, { params: queryParams });
-            toast.success({ title: "Eliminación Completa", description: `Se eliminaron ${ids.length} categorías permanentemente.` });
+            const res = await api.post<CategoryJob | null>("/categories/admin/bulk-delete", ids, { params: queryParams });
+            toast.info({ title: "Eliminación en Curso", description: `${ids.length} categorías desactivadas; sus registros se reasignan en segundo plano.` });
+            jobId = res.data?.id;
         } else {
-            // Soft delete
+            // Soft delete: 202 + trabajo que mueve sus registros
             if (!currentCategory) return;
-            await api.delete(`/categories/${currentCategory.id}`, { params: queryParams });
-            toast.success({ title: "Categoría Desactivada", description: "Movida a papelera." });
+            const res = await api.delete<CategoryJob>(`/categories/${currentCategory.id}`, { params: queryParams });
+            toast.info({ title: "Categoría Desactivada", description: "Movida a papelera; sus registros se reasignan en segundo plano." });
+            jobId = res.data.id;
         }
         setIsDeleteOpen(false);
         fetchCategories();
+        trackCategoryJob(jobId, isHardDelete ? "Eliminación Completada" : "Reasignación Completada");
     } catch (error: any) {
         toast.error("No se pudo eliminar");
     } finally {
@@ -298,7 +344,13 @@ export default function AdminCategoriasPage() {
       } else {
         if (isGlobalMerge) {
             const res = await api.post("/categories/admin/create-global-merge", { name: formData.name });
-            toast.success({ title: "Fusión Exitosa", description: `Migrados ${res.data.moved_expenses} gastos.` });
+            toast.success({
+                title: "Fusión Iniciada",
+                description: res.data.job_id
+                    ? `${res.data.merged_private_categories} categorías privadas fusionadas; sus registros se migran en segundo plano.`
+                    : "No había categorías privadas que fusionar.",
+            });
+            trackCategoryJob(res.data.job_id, "Fusión Completada");
         } else {
             const payload = { name: formData.name, ...(user?.is_superuser ? { is_global: formData.is_global } : {}) };
             await api.post("/categories/", payload);
@@ -322,7 +322,7 @@ export default function CategoriasPage() {
               onSelect={handleSearchSelect}
               categories={allCategories as unknown as SelectorCategory[]}
               setCategories={setAllCategories as any}
-              fetchUrl="/categories/?status=all"
+              fetchUrl="/categories/catalog?status=all"
               allowReactivatePrompt={true}
               placeholder="Buscar categoría..."
               onReactivateConfirm={reactivateCategory}
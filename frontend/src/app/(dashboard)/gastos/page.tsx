@@ -96,7 +96,7 @@ export default function GastosPage() {
     try {
       setLoading(true);
       const [resExpenses, resCats] = await Promise.all([
-        api.get<Expense[]>("/expenses/"),
+        api.get<Expense[]>("/expenses/?include=items"),
         api.get<Category[]>("/categories/?status=all"),
       ]);
       setExpenses(resExpenses.data);
@@ -563,7 +563,7 @@ export default function GastosPage() {
                             onSelect={(id) => updateItem(idx, "category_id", id)}
                             categories={categories}
                             setCategories={setCategories}
-                            fetchUrl="/categories/?status=all"
+                            fetchUrl="/categories/catalog?status=all"
                             allowReactivatePrompt={true}
                             isModalActionLoading={isModalActionLoading}
                             placeholder="Buscar..."
@@ -91,7 +91,7 @@ export default function IngresosPage() {
     try {
       setLoading(true);
       const [resIngresos, resCats] = await Promise.all([
-        api.get<Ingreso[]>("/incomes/"),
+        api.get<Ingreso[]>("/incomes/?include=items"),
         api.get<CategoryWithStatus[]>("/categories/?status=all"),
       ]);
 
@@ -643,7 +643,7 @@ export default function IngresosPage() {
                     onSelect={(id) => updateItem(idx, "category_id", id)}
                     categories={categories}
                     setCategories={setCategories}
-                    fetchUrl="/categories/?status=all"
+                    fetchUrl="/categories/catalog?status=all"
                     allowReactivatePrompt={true}
                     placeholder="Buscar..."
                   />
@@ -23,6 +23,7 @@ import { toast } from "sonner";
 
 // --- TIPOS ---
 
+// Fila de GET /users/directory (vista materializada: datos + actividad agregada)
 interface User {
   id: string;
   email: string;
@@ -31,8 +32,20 @@ interface User {
   phone: string | null;
   is_active: boolean;
   is_superuser: boolean;
+  telegram_linked: boolean;
+  expense_count: number;
+  income_count: number;
+  last_activity_at: string | null;
 }
 
+interface UserDirectoryPage {
+  items: User[];
+  next_cursor: string | null;
+  refreshed_at: string | null;
+}
+
+const DIRECTORY_PAGE_SIZE = 50;
+
 // Tipo para el formulario (Create/Update)
 interface UserFormData {
   email: string;
@@ -58,6 +71,9 @@ export default function UsuariosPage() {
   const { token } = useAuthStore();
   const [users, setUsers] = useState<User[]>([]);
   const [loading, setLoading] = useState(true);
+  const [search, setSearch] = useState("");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // Estados para Modales
   const [isFormOpen, setIsFormOpen] = useState(false);
@@ -67,11 +83,18 @@ export default function UsuariosPage() {
   const [isSubmitting, setIsSubmitting] = useState(false);
 
   // --- CARGA DE DATOS ---
+  // Directorio paginado por cursor en el servidor; la búsqueda también se resuelve allí
+  const fetchPage = (cursor: string | null) =>
+    api.get<UserDirectoryPage>("/users/directory", {
+      params: { sort: "email", order: "asc", limit: DIRECTORY_PAGE_SIZE, search: search.trim() || undefined, cursor: cursor || undefined },
+    });
+
   const fetchUsers = async () => {
     try {
       setLoading(true);
-      const res = await api.get<User[]>("/users/");
-      setUsers(res.data);
+      const res = await fetchPage(null);
+      setUsers(res.data.items);
+      setNextCursor(res.data.next_cursor);
     } catch (err) {
       console.error(err);
       toast.error("Error cargando usuarios");
@@ -80,9 +103,32 @@ export default function UsuariosPage() {
     }
   };
 
+  const fetchMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await fetchPage(nextCursor);
+      setUsers((prev) => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } catch (err) {
+      console.error(err);
+      toast.error("Error cargando más usuarios");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // El directorio se refresca en segundo plano: tras un cambio se pide refrescarlo ya
+  const reloadAfterChange = async () => {
+    await api.post("/users/directory/refresh").catch(() => {});
+    fetchUsers();
+  };
+
   useEffect(() => {
-    if (token) fetchUsers();
-  }, [token]);
+    if (!token) return;
+    const timer = setTimeout(fetchUsers, 300); // debounce de la búsqueda
+    return () => clearTimeout(timer);
+  }, [token, search]);
 
   // --- HANDLERS ---
 
@@ -137,7 +183,7 @@ export default function UsuariosPage() {
       }
 
       setIsFormOpen(false);
-      fetchUsers(); // Recargar tabla
+      reloadAfterChange(); // Recargar tabla
     } catch (error: any) {
       console.error(error);
       const msg = error.response?.data?.detail || "Error al guardar usuario";
@@ -154,7 +200,7 @@ export default function UsuariosPage() {
       await api.delete(`/users/${currentUser.id}`);
       toast.success("Usuario eliminado/desactivado");
       setIsDeleteOpen(false);
-      fetchUsers();
+      reloadAfterChange();
     } catch (error: any) {
       console.error(error);
       toast.error("No se pudo eliminar el usuario");
@@ -198,6 +244,18 @@ export default function UsuariosPage() {
         <span className="px-2 py-0.5 rounded text-[10px] font-medium bg-gray-100 text-gray-600 border border-gray-200">USER</span>
       )
     },
+    {
+      header: "Actividad",
+      className: "w-40",
+      cell: (user) => (
+        <div className="flex flex-col text-xs">
+          <span>{user.expense_count} gastos · {user.income_count} ingresos</span>
+          <span className="text-muted-foreground">
+            {user.last_activity_at ? new Date(user.last_activity_at).toLocaleDateString("es-MX") : "Sin movimientos"}
+          </span>
+        </div>
+      )
+    },
     {
       header: "Estado",
       accessorKey: "is_active",
@@ -242,6 +300,15 @@ export default function UsuariosPage() {
           </Button>
         </div>
 
+        {/* BÚSQUEDA */}
+        <input
+          type="search"
+          placeholder="Buscar por email, nombre o apellido..."
+          className="w-full sm:max-w-sm p-2 rounded-md border border-border bg-background focus:ring-2 focus:ring-primary/50 outline-none text-sm"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+        />
+
         {/* TABLA */}
         <DataTable 
           columns={columns} 
@@ -268,6 +335,14 @@ export default function UsuariosPage() {
           modalTitle="Detalle Rápido"
         />
 
+        {nextCursor && (
+          <div className="flex justify-center">
+            <Button variant="outline" onClick={fetchMore} disabled={loadingMore}>
+              {loadingMore ? "Cargando..." : "Cargar más"}
+            </Button>
+          </div>
+        )}
+
         {/* --- MODAL FORMULARIO (CREAR / EDITAR) --- */}
         <Modal
           isOpen={isFormOpen}
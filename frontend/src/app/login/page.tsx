@@ -82,8 +82,8 @@ export default function LoginPage() {
         headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
       });
 
-      const { access_token } = response.data;
-      setToken(access_token);
+      const { access_token, refresh_token } = response.data;
+      setToken(access_token, refresh_token);
       
       await useAuthStore.getState().fetchUser();
 
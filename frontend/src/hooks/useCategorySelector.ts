@@ -40,7 +40,7 @@ export function useCategorySelector({
   categories,
   setCategories,
   onSelect,
-  fetchUrl = "/categories/?status=all",
+  fetchUrl = "/categories/catalog?status=all",
   allowReactivatePrompt = true,
   isModalActionLoading = false,
   onReactivateConfirm,
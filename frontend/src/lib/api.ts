@@ -1,5 +1,5 @@
 // frontend\src\lib\api.ts
-import axios from 'axios';
+import axios, { AxiosError, InternalAxiosRequestConfig } from 'axios';
 import { useAuthStore } from '@/store/authStore';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
@@ -26,10 +26,51 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Un solo refresh en vuelo: las requests que fallen a la vez esperan el mismo resultado
+// (el refresh token rota; canjear uno ya rotado fuera del margen del backend revoca la sesión)
+let refreshing: Promise<string | null> | null = null;
+
+const redeemRefreshToken = async (): Promise<string | null> => {
+  // Otra pestaña pudo rotarlo ya: se relee lo persistido antes de canjear
+  const before = useAuthStore.getState().refreshToken;
+  await useAuthStore.persist.rehydrate();
+  const { token, refreshToken, setToken } = useAuthStore.getState();
+  if (!refreshToken) return null;
+  if (refreshToken !== before && token) return token;
+
+  try {
+    const { data } = await axios.post(`${API_URL}/refresh-token`, { refresh_token: refreshToken });
+    setToken(data.access_token, data.refresh_token);
+    return data.access_token as string;
+  } catch {
+    return null;
+  }
+};
+
+const refreshAccessToken = (): Promise<string | null> => {
+  if (!refreshing) {
+    refreshing = redeemRefreshToken().finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+};
+
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error: AxiosError) => {
+    const original = error.config as (InternalAxiosRequestConfig & { _retry?: boolean }) | undefined;
+
     if (error.response?.status === 401 && useAuthStore.getState().isAuth) {
+      // Access token vencido/revocado: se intenta renovar UNA vez y se repite la request
+      if (original && !original._retry) {
+        original._retry = true;
+        const newToken = await refreshAccessToken();
+        if (newToken) {
+          original.headers.Authorization = `Bearer ${newToken}`;
+          return api(original);
+        }
+      }
       const { logout } = useAuthStore.getState();
       logout();
     } 
@@ -16,9 +16,10 @@ interface User {
 
 interface AuthState {
   token: string | null;
+  refreshToken: string | null; // Renueva el access token (de vida corta) sin volver a loguear
   isAuth: boolean;
   user: User | null; // Aquí guardaremos la respuesta de /users/me
-  setToken: (token: string) => void;
+  setToken: (token: string, refreshToken?: string | null) => void;
   logout: () => void;
   fetchUser: () => Promise<void>;
 }
@@ -27,13 +28,20 @@ export const useAuthStore = create<AuthState>()(
   persist(
     (set, get) => ({
       token: null,
+      refreshToken: null,
       isAuth: false,
       user: null,
 
-      setToken: (token: string) => set({ token, isAuth: true }),
+      setToken: (token: string, refreshToken?: string | null) =>
+        set((state) => ({ token, refreshToken: refreshToken ?? state.refreshToken, isAuth: true })),
 
       logout: () => {
-        set({ token: null, isAuth: false, user: null });
+        // Revoca la sesión en el servidor (best-effort: si falla, igual se limpia localmente)
+        const refreshToken = get().refreshToken;
+        if (refreshToken) {
+          api.post("/logout", { refresh_token: refreshToken }).catch(() => {});
+        }
+        set({ token: null, refreshToken: null, isAuth: false, user: null });
         localStorage.removeItem('auth-storage');
       },
 